@@ -1,13 +1,29 @@
-import firebase_admin
-from firebase_admin import credentials, auth
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
-import json
+import threading
+
+# firebase_admin (and google-auth/requests behind it) is imported on first use
+# rather than with the app, keeping it off the cold-start path
+_firebase_lock = threading.Lock()
+_firebase_initialized = False
 
 # Initialize Firebase Admin SDK
 def initialize_firebase():
+    """Initialize the SDK once; called on first token verification or by the startup warm-up"""
+    global _firebase_initialized
+    with _firebase_lock:
+        if _firebase_initialized:
+            return
+        _firebase_initialized = True
+        _initialize_firebase()
+
+def _initialize_firebase():
     try:
+        import firebase_admin
+        # auth is unused here, but loading it now spares the first token verification
+        from firebase_admin import auth, credentials
+        
         # Try to get credentials from environment variable
         firebase_key = os.getenv("FIREBASE_PRIVATE_KEY")
         if firebase_key:
@@ -30,9 +46,6 @@ def initialize_firebase():
     except Exception as e:
         print(f"⚠️ Firebase initialization failed: {e}")
 
-# Call during app startup
-initialize_firebase()
-
 security = HTTPBearer(auto_error=False)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -42,10 +55,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     if not credentials:
         return None
-    
+    return verify_token(credentials.credentials)
+
+def verify_token(token: str):
+    """
+    Verify a Firebase ID token (from a header or a websocket query string).
+    Raises 401 if it is invalid.
+    """
+    initialize_firebase()
     try:
+        from firebase_admin import auth
+        
         # Verify the Firebase ID token
-        decoded_token = auth.verify_id_token(credentials.credentials)
+        decoded_token = auth.verify_id_token(token)
         return {
             "uid": decoded_token["uid"],
             "email": decoded_token.get("email"),
@@ -61,4 +83,15 @@ async def require_auth(user = Depends(get_current_user)):
     """
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
-    return user
\ No newline at end of file
+    return user
+
+def _admin_uids() -> set:
+    return {uid.strip() for uid in os.getenv("ADMIN_UIDS", "").split(",") if uid.strip()}
+
+async def require_admin(user = Depends(require_auth)):
+    """
+    Require an authenticated user whose uid is listed in ADMIN_UIDS.
+    """
+    if user["uid"] not in _admin_uids():
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
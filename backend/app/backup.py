@@ -0,0 +1,57 @@
+import argparse
+import sys
+from .database import create_db_and_tables
+from .services.backup_service import BackupFormatError, export_ndjson, import_ndjson
+
+READ_CHUNK_SIZE = 64 * 1024
+
+def _read_chunks(stream):
+    while True:
+        data = stream.read(READ_CHUNK_SIZE)
+        if not data:
+            return
+        yield data
+
+def export_notes(path: str, compress: bool):
+    with open(path, "wb") as out:
+        for chunk in export_ndjson(compress=compress):
+            out.write(chunk)
+
+def import_notes(path: str) -> int:
+    with open(path, "rb") as source:
+        return import_ndjson(_read_chunks(source))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.backup",
+        description="Stream the notes database to and from NDJSON"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write every note as NDJSON")
+    export_parser.add_argument("path", help="Output file")
+    export_parser.add_argument(
+        "--gzip", action="store_true",
+        help="Compress the output (implied by a .gz file name)"
+    )
+
+    import_parser = subparsers.add_parser("import", help="Load notes from NDJSON (plain or gzip)")
+    import_parser.add_argument("path", help="Input file")
+
+    args = parser.parse_args(argv)
+    create_db_and_tables()
+
+    if args.command == "export":
+        export_notes(args.path, compress=args.gzip or args.path.endswith(".gz"))
+        print(f"✅ Exported notes to {args.path}", file=sys.stderr)
+    else:
+        try:
+            imported = import_notes(args.path)
+        except BackupFormatError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 1
+        print(f"✅ Imported {imported} notes from {args.path}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Run several API workers behind a note-affinity router.
+
+    python -m app.cluster --workers 4 --port 8000
+
+Workers listen on 127.0.0.1 from --worker-port upwards and are restarted if
+they exit. To route to workers managed elsewhere, pass --upstream instead:
+
+    python -m app.cluster --upstream http://10.0.0.5:8000 --upstream http://10.0.0.6:8000
+"""
+from typing import Dict, List
+from .proxy import ClusterProxy
+import argparse
+import asyncio
+import httpx
+import os
+import secrets
+import sys
+import uvicorn
+
+
+class WorkerSupervisor:
+    """Start uvicorn workers, wait until they are ready and restart any that exit"""
+
+    def __init__(self, count: int, base_port: int, env: Dict[str, str]):
+        self.urls = [f"http://127.0.0.1:{base_port + index}" for index in range(count)]
+        self.env = env
+        self._processes: Dict[str, asyncio.subprocess.Process] = {}
+
+    async def start(self):
+        # The first worker creates and migrates the database before the others start
+        await self._spawn(self.urls[0])
+        await self._wait_ready(self.urls[0])
+        for url in self.urls[1:]:
+            await self._spawn(url)
+        for url in self.urls[1:]:
+            await self._wait_ready(url)
+
+    async def _spawn(self, url: str):
+        port = url.rsplit(":", 1)[1]
+        self._processes[url] = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", port,
+            env=self.env,
+        )
+        print(f"🧩 Worker {url} started (pid {self._processes[url].pid})")
+
+    @staticmethod
+    async def _wait_ready(url: str, timeout: float = 60.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        async with httpx.AsyncClient() as client:
+            while asyncio.get_running_loop().time() < deadline:
+                try:
+                    if (await client.get(f"{url}/ready")).status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Worker {url} did not become ready within {timeout:.0f}s")
+
+    async def supervise(self):
+        """Restart exited workers; the router drops and re-adds them via health checks"""
+        while True:
+            await asyncio.sleep(1.0)
+            for url, process in list(self._processes.items()):
+                if process.returncode is not None:
+                    print(f"⚠️ Worker {url} exited with {process.returncode}, restarting")
+                    await self._spawn(url)
+
+    async def stop(self):
+        for process in self._processes.values():
+            if process.returncode is None:
+                process.terminate()
+        for process in self._processes.values():
+            await process.wait()
+
+
+async def serve(args: argparse.Namespace):
+    token = os.getenv("NOTES_CLUSTER_TOKEN") or secrets.token_urlsafe(32)
+    supervisor = None
+    upstreams: List[str] = args.upstream
+    if not upstreams:
+        env = {
+            **os.environ,
+            "NOTES_CLUSTER_TOKEN": token,
+            # Workers share one database: pick up each other's writes for listing
+            "NOTES_INDEX_MAX_AGE": os.getenv("NOTES_INDEX_MAX_AGE", "1"),
+        }
+        supervisor = WorkerSupervisor(args.workers, args.worker_port, env)
+        await supervisor.start()
+        upstreams = supervisor.urls
+
+    proxy = ClusterProxy(upstreams, token=token, replicas=args.replicas)
+    server = uvicorn.Server(uvicorn.Config(proxy, host=args.host, port=args.port, lifespan="on"))
+    print(f"🔀 Routing {args.host}:{args.port} to {len(upstreams)} workers")
+    watchdog = asyncio.create_task(supervisor.supervise()) if supervisor else None
+    try:
+        await server.serve()
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        if supervisor:
+            await supervisor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--worker-port", type=int, default=8100, help="Port of the first worker")
+    parser.add_argument("--upstream", action="append", default=[], help="Route to an existing worker (repeatable)")
+    parser.add_argument("--replicas", type=int, default=160, help="Virtual nodes per worker on the hash ring")
+    args = parser.parse_args()
+
+    if os.getenv("NOTES_STORAGE", "sqlite") != "sqlite" and not args.upstream:
+        parser.error("Cluster workers share the SQLite database; NOTES_STORAGE must be sqlite")
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
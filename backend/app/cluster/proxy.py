@@ -0,0 +1,391 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from .ring import HashRing
+import asyncio
+import httpx
+import json
+import logging
+import re
+import secrets
+import websockets
+
+logger = logging.getLogger(__name__)
+
+# Second path segments under /api/v1/notes that are collection routes, not note ids
+COLLECTION_ROUTES = {"export", "import", "index"}
+
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host",
+}
+
+# "Service restart": the client reconnects and lands on the note's new worker
+CLOSE_MOVED = 1012
+
+_NOTE_HTTP = re.compile(r"^/api/v1/notes/([^/]+)")
+_NOTE_WS = re.compile(r"^/ws/([^/]+)$")
+
+
+def note_key(path: str) -> Optional[str]:
+    """The note a request is about, or None for requests spanning notes"""
+    match = _NOTE_WS.match(path) or _NOTE_HTTP.match(path)
+    if match is None or match.group(1) in COLLECTION_ROUTES:
+        return None
+    return match.group(1)
+
+
+def _ws_url(worker: str) -> str:
+    return "ws" + worker[len("http"):] if worker.startswith("http") else worker
+
+
+class _Tunnel:
+    """A client websocket and its upstream connection(s), one per worker used"""
+
+    def __init__(self, websocket: WebSocket, path: str, query: str):
+        self.websocket = websocket
+        self.path = path
+        self.query = query
+        self.upstreams: Dict[str, websockets.ClientConnection] = {}
+        self.readers: List[asyncio.Task] = []
+        # Notes whose traffic goes through this tunnel
+        self.note_ids: Set[str] = set()
+        self.closing = False
+
+
+class ClusterProxy:
+    """Front router that gives every note a home worker.
+
+    ``/ws/{note_id}`` connections and ``/api/v1/notes/{note_id}...`` requests
+    go to the worker owning the note on a consistent hash ring, so a room's
+    members, live state and debounced saves all live in one process. Requests
+    spanning notes (listing, create, import/export, the notes-index feed) go to
+    the coordinator, the first live worker. A multiplexed ``/ws`` connection
+    is split into one upstream ``/ws`` per worker, routed by each message's
+    ``note_id``.
+
+    Workers are health-checked; when one is added, removed or stops
+    answering, the ring is rebuilt. Sockets of notes that moved are closed
+    with 1012 after their old worker saved pending edits, and reconnect to
+    the new owner.
+    """
+
+    def __init__(self, workers: Iterable[str], token: Optional[str] = None, replicas: int = 160,
+                 health_interval: float = 2.0, max_failures: int = 2,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.workers = [worker.rstrip("/") for worker in workers]
+        self.token = token
+        self.ring = HashRing(self.workers, replicas=replicas)
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.rebalances = 0
+        self._client = client
+        self._tunnels: Set[_Tunnel] = set()
+        self._failures: Counter = Counter()
+        self._health_task: Optional[asyncio.Task] = None
+        self._rebalance_lock = asyncio.Lock()
+        self._settled = asyncio.Event()
+        self._settled.set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))
+        return self._client
+
+    @property
+    def coordinator(self) -> Optional[str]:
+        nodes = self.ring.nodes
+        return nodes[0] if nodes else None
+
+    def worker_for(self, note_id: Optional[str]) -> Optional[str]:
+        return self.ring.node_for(note_id) if note_id else self.coordinator
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            request = Request(scope, receive)
+            response = await self._handle_http(request)
+            await response(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._handle_websocket(WebSocket(scope, receive, send))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._health_task = asyncio.create_task(self._watch_workers())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._health_task:
+                    self._health_task.cancel()
+                for tunnel in list(self._tunnels):
+                    await self._close_tunnel(tunnel, 1001)
+                await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- HTTP ---
+
+    async def _handle_http(self, request: Request) -> Response:
+        path = request.url.path
+        if path == "/cluster/status":
+            return JSONResponse(self.status())
+        if path == "/cluster/workers" and request.method == "PUT":
+            return await self._set_workers_route(request)
+
+        worker = self.worker_for(note_key(path))
+        if worker is None:
+            return JSONResponse({"detail": "No workers available"}, status_code=503)
+
+        headers = [
+            (name, value) for name, value in request.headers.raw
+            if name.decode("latin-1").lower() not in HOP_BY_HOP
+        ]
+        if request.client:
+            headers.append((b"x-forwarded-for", request.client.host.encode()))
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+        upstream_request = self.client.build_request(
+            request.method,
+            httpx.URL(worker + path, query=request.url.query.encode()),
+            headers=headers,
+            content=request.stream() if has_body else None,
+        )
+        try:
+            upstream = await self.client.send(upstream_request, stream=True)
+        except httpx.TransportError as e:
+            logger.warning(f"Worker {worker} unreachable: {e}")
+            return JSONResponse({"detail": "Worker unavailable"}, status_code=502)
+
+        response = StreamingResponse(
+            upstream.aiter_raw(), status_code=upstream.status_code,
+            background=BackgroundTask(upstream.aclose)
+        )
+        response.raw_headers = [
+            (name, value) for name, value in upstream.headers.raw
+            if name.decode("latin-1").lower() not in HOP_BY_HOP
+        ]
+        return response
+
+    async def _set_workers_route(self, request: Request) -> Response:
+        given = request.headers.get("x-cluster-token")
+        if not self.token or not given or not secrets.compare_digest(given, self.token):
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        workers = (await request.json()).get("workers")
+        if not isinstance(workers, list) or not all(isinstance(worker, str) for worker in workers):
+            return JSONResponse({"detail": "Expected {\"workers\": [url, ...]}"}, status_code=400)
+        self.workers = [worker.rstrip("/") for worker in workers]
+        self._failures.clear()
+        moved = await self.rebalance(self.workers)
+        return JSONResponse({**self.status(), "moved_notes": moved})
+
+    def status(self) -> dict:
+        return {
+            "workers": self.workers,
+            "live": self.ring.nodes,
+            "coordinator": self.coordinator,
+            "tunnels": len(self._tunnels),
+            "notes": Counter(self.ring.node_for(note_id) for tunnel in self._tunnels for note_id in tunnel.note_ids),
+            "rebalances": self.rebalances,
+        }
+
+    # --- WebSockets ---
+
+    async def _handle_websocket(self, websocket: WebSocket):
+        # New sockets wait out a rebalance so they reach the notes' new owners
+        await self._settled.wait()
+        path = websocket.url.path
+        tunnel = _Tunnel(websocket, path, websocket.url.query)
+        multiplexed = path == "/ws"
+        note_id = note_key(path)
+        if note_id:
+            tunnel.note_ids.add(note_id)
+
+        worker = self.worker_for(note_id)
+        if worker is None:
+            await websocket.close(code=1013)
+            return
+        try:
+            await self._upstream(tunnel, worker)
+        except websockets.InvalidStatus as e:
+            # The worker refused the handshake (e.g. no access to the note)
+            await websocket.close(code=1008 if e.response.status_code == 403 else 1011)
+            return
+        except OSError as e:
+            logger.warning(f"Worker {worker} unreachable: {e}")
+            await websocket.close(code=1013)
+            return
+
+        await websocket.accept()
+        self._tunnels.add(tunnel)
+        try:
+            while True:
+                text = await websocket.receive_text()
+                if tunnel.closing:
+                    continue
+                if multiplexed:
+                    await self._route_multiplexed(tunnel, text)
+                else:
+                    await tunnel.upstreams[worker].send(text)
+        except WebSocketDisconnect:
+            pass
+        except websockets.ConnectionClosed:
+            await self._close_tunnel(tunnel, CLOSE_MOVED)
+        finally:
+            self._tunnels.discard(tunnel)
+            await self._close_upstreams(tunnel)
+
+    async def _upstream(self, tunnel: _Tunnel, worker: str) -> websockets.ClientConnection:
+        """The tunnel's connection to ``worker``, opened on first use"""
+        upstream = tunnel.upstreams.get(worker)
+        if upstream is None:
+            url = f"{_ws_url(worker)}{tunnel.path}" + (f"?{tunnel.query}" if tunnel.query else "")
+            upstream = await websockets.connect(url, max_size=None, open_timeout=5)
+            tunnel.upstreams[worker] = upstream
+            tunnel.readers.append(asyncio.create_task(self._relay(tunnel, upstream)))
+        return upstream
+
+    async def _route_multiplexed(self, tunnel: _Tunnel, text: str):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            message = None
+        note_id = message.get("note_id") if isinstance(message, dict) else None
+        if not isinstance(note_id, str) or not note_id:
+            # Index subscriptions and malformed messages are the coordinator's
+            note_id = None
+
+        worker = self.worker_for(note_id)
+        try:
+            upstream = await self._upstream(tunnel, worker)
+        except (OSError, websockets.InvalidStatus) as e:
+            logger.warning(f"Worker {worker} unreachable: {e}")
+            await tunnel.websocket.send_text(json.dumps({
+                "type": "error", "note_id": note_id, "message": "Worker unavailable"
+            }))
+            return
+
+        if note_id and message.get("type") == "subscribe":
+            tunnel.note_ids.add(note_id)
+        elif note_id and message.get("type") == "unsubscribe":
+            tunnel.note_ids.discard(note_id)
+        await upstream.send(text)
+
+    async def _relay(self, tunnel: _Tunnel, upstream: websockets.ClientConnection):
+        try:
+            async for frame in upstream:
+                if isinstance(frame, bytes):
+                    await tunnel.websocket.send_bytes(frame)
+                else:
+                    await tunnel.websocket.send_text(frame)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            # The client went away; its receive loop cleans up
+            logger.debug(f"Relay stopped: {e}")
+            return
+        # The worker closed on us (restart, crash): let the client reconnect
+        if not tunnel.closing:
+            await self._close_tunnel(tunnel, CLOSE_MOVED)
+
+    async def _close_upstreams(self, tunnel: _Tunnel):
+        for upstream in list(tunnel.upstreams.values()):
+            await upstream.close()
+        tunnel.upstreams.clear()
+        current = asyncio.current_task()
+        for reader in tunnel.readers:
+            if reader is not current:
+                reader.cancel()
+
+    async def _close_tunnel(self, tunnel: _Tunnel, code: int):
+        if tunnel.closing:
+            return
+        tunnel.closing = True
+        await self._close_upstreams(tunnel)
+        try:
+            await tunnel.websocket.close(code=code)
+        except Exception:
+            pass
+
+    # --- Membership ---
+
+    async def rebalance(self, workers: Iterable[str]) -> int:
+        """Move to a ring of ``workers``, handing over the live notes that change owner"""
+        async with self._rebalance_lock:
+            new_ring = HashRing(workers, replicas=self.ring.replicas)
+            if new_ring.nodes == self.ring.nodes:
+                return 0
+
+            self._settled.clear()
+            try:
+                moved: Dict[str, Set[str]] = {}
+                affected: List[_Tunnel] = []
+                for tunnel in self._tunnels:
+                    notes = {note_id for note_id in tunnel.note_ids
+                             if self.ring.node_for(note_id) != new_ring.node_for(note_id)}
+                    if notes:
+                        affected.append(tunnel)
+                        for note_id in notes:
+                            moved.setdefault(self.ring.node_for(note_id), set()).add(note_id)
+
+                # Stop edits reaching the old owners, let them save, then send clients over
+                for tunnel in affected:
+                    tunnel.closing = True
+                    await self._close_upstreams(tunnel)
+                for worker, note_ids in moved.items():
+                    # A worker that stopped answering has nothing left to save
+                    if not self._failures[worker]:
+                        await self._release(worker, sorted(note_ids))
+
+                logger.info(f"Rebalanced cluster onto {new_ring.nodes}: {sum(map(len, moved.values()))} live notes moved")
+                self.ring = new_ring
+                self.rebalances += 1
+                for tunnel in affected:
+                    try:
+                        await tunnel.websocket.close(code=CLOSE_MOVED)
+                    except Exception:
+                        pass
+                return sum(map(len, moved.values()))
+            finally:
+                self._settled.set()
+
+    async def _release(self, worker: str, note_ids: List[str]):
+        try:
+            response = await self.client.post(
+                f"{worker}/internal/cluster/release",
+                json={"note_ids": note_ids},
+                headers={"x-cluster-token": self.token or ""},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not release {len(note_ids)} notes on {worker}: {e}")
+
+    async def _healthy(self, worker: str) -> bool:
+        try:
+            # /ready rather than /health: workers still starting or already draining get no notes
+            response = await self.client.get(f"{worker}/ready", timeout=2.0)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def check_workers(self):
+        """Drop workers that failed ``max_failures`` checks in a row; re-add recovered ones"""
+        results = await asyncio.gather(*(self._healthy(worker) for worker in self.workers))
+        live = []
+        for worker, healthy in zip(self.workers, results):
+            self._failures[worker] = 0 if healthy else self._failures[worker] + 1
+            if healthy or (worker in self.ring and self._failures[worker] < self.max_failures):
+                live.append(worker)
+        await self.rebalance(live)
+
+    async def _watch_workers(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_workers()
+            except Exception as e:
+                logger.error(f"Worker health check failed: {e}")
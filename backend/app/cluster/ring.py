@@ -0,0 +1,53 @@
+from bisect import bisect_right, insort
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping note ids to workers.
+
+    Each worker is placed on the ring at ``replicas`` pseudo-random points
+    (virtual nodes), which evens out the share of notes per worker. Adding or
+    removing a worker only moves the notes between its points and their
+    neighbours, roughly ``1/N`` of them; everything else keeps its worker.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 160):
+        self.replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        self._nodes: Dict[str, List[int]] = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        points = [_point(f"{node}#{replica}") for replica in range(self.replicas)]
+        self._nodes[node] = points
+        for point in points:
+            insort(self._points, (point, node))
+
+    def remove(self, node: str):
+        if self._nodes.pop(node, None) is not None:
+            self._points = [(point, owner) for point, owner in self._points if owner != node]
+
+    def node_for(self, key: str) -> Optional[str]:
+        """The worker owning ``key``: the first point clockwise from its hash"""
+        if not self._points:
+            return None
+        index = bisect_right(self._points, (_point(key), ""))
+        return self._points[index % len(self._points)][1]
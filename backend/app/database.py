@@ -1,6 +1,9 @@
+from sqlalchemy import event, inspect, text
 from sqlmodel import create_engine, SQLModel
 import os
+import threading
 from pathlib import Path
+from .storage.compression import get_codec
 
 # SQLite URL format: sqlite:///path/to/database.db
 DATABASE_URL = os.getenv(
@@ -23,24 +26,85 @@ def ensure_database_directory():
         db_dir.mkdir(parents=True, exist_ok=True)
         print(f"📁 Database directory ensured: {db_dir.absolute()}")
 
-# Ensure directory exists before creating engine
-ensure_database_directory()
-
-# SQLite-specific engine configuration
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        echo=True,
-        connect_args={"check_same_thread": False}  # Required for SQLite with FastAPI
-    )
-else:
+_engine = None
+_engine_lock = threading.Lock()
+
+def _create_engine():
+    # SQLite-specific engine configuration
+    if DATABASE_URL.startswith("sqlite"):
+        engine = create_engine(
+            DATABASE_URL,
+            echo=True,
+            connect_args={"check_same_thread": False}  # Required for SQLite with FastAPI
+        )
+        
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            configure_sqlite_connection(dbapi_connection)
+        return engine
     # PostgreSQL settings (If we decide to use PostgreSQL in the future)
-    engine = create_engine(DATABASE_URL, echo=True)
+    if get_codec().enabled:
+        # Compressed content is stored as bytes in a TEXT column, which only SQLite accepts
+        raise ValueError("NOTES_COMPRESSION requires the SQLite database; set it to none for other databases")
+    return create_engine(DATABASE_URL, echo=True)
+
+def get_engine():
+    """The application engine, built on first use rather than at import"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                # Ensure directory exists before creating engine
+                ensure_database_directory()
+                _engine = _create_engine()
+    return _engine
+
+def __getattr__(name):
+    # Keeps ``from app.database import engine`` working without building it at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def configure_sqlite_connection(dbapi_connection):
+    """Per-connection SQLite settings the maintenance scheduler relies on"""
+    cursor = dbapi_connection.cursor()
+    # Takes effect on a new database (so it must come before switching to WAL,
+    # which creates the file); existing ones switch on their next VACUUM
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # Readers no longer block the debounced saves; the WAL is checkpointed in the background
+    cursor.execute(f"PRAGMA journal_mode = {os.getenv('SQLITE_JOURNAL_MODE', 'WAL')}")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
+
+def migrate_note_ownership(engine):
+    """Add the owner_uid column and its index to databases created before ownership"""
+    inspector = inspect(engine)
+    if "note" not in inspector.get_table_names():
+        return
+    
+    with engine.begin() as connection:
+        if "owner_uid" not in {column["name"] for column in inspector.get_columns("note")}:
+            connection.execute(text("ALTER TABLE note ADD COLUMN owner_uid VARCHAR"))
+            print("🔑 Added owner_uid column to notes")
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_note_owner_uid_updated_at ON note (owner_uid, updated_at)"
+        ))
+        
+        # Optionally hand notes created before sign-in existed to one account
+        legacy_owner = os.getenv("NOTES_LEGACY_OWNER_UID")
+        if legacy_owner:
+            claimed = connection.execute(
+                text("UPDATE note SET owner_uid = :uid WHERE owner_uid IS NULL"), {"uid": legacy_owner}
+            ).rowcount
+            if claimed:
+                print(f"🔑 Assigned {claimed} unowned notes to {legacy_owner}")
 
-def create_db_and_tables():
-    """Create database tables"""
+def create_db_and_tables(engine=None):
+    """Create database tables (on the application engine unless another is given)"""
+    engine = engine or get_engine()
     try:
         SQLModel.metadata.create_all(engine)
+        migrate_note_ownership(engine)
         print("✅ Database tables created successfully")
     except Exception as e:
         print(f"❌ Error creating database tables: {e}")
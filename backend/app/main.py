@@ -1,18 +1,46 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-from .routers import notes, websockets
+from .routers import admin, cluster, notes, websockets
+from .auth.firebase_auth import initialize_firebase
 from .database import create_db_and_tables
 from .seed import seed_initial_data
+from .services.websocket_service import websocket_service
+from .services.scheduler import scheduler
+from .services.note_service import note_service
+from .services.notes_feed import notes_feed
+from .services.traffic_recorder import recorder
+from .services.maintenance import maintenance
+from .services.spectators import spectators
+from .websocket_manager import manager
+import asyncio
 import os
 
+async def refresh_index_periodically(interval: float):
+    """Bring other workers' writes to notes-list subscribers of this process"""
+    while True:
+        await asyncio.sleep(interval)
+        if notes_feed.subscribers:
+            await asyncio.to_thread(note_service.refresh_if_stale)
+
+async def warm_up(app: FastAPI):
+    """Startup work that need not delay the server from listening; /ready waits for it"""
+    try:
+        await asyncio.to_thread(initialize_firebase)
+    except Exception as e:
+        print(f"⚠️ Warm-up failed: {e}")
+    app.state.status = "ready"
+    print("🟢 Ready to serve traffic")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Starting up Real-Time Notes Pad API...")
+    app.state.status = "starting"
     
     # Create tables
     print("📊 Creating database tables...")
-    create_db_and_tables()
+    create_db_and_tables(getattr(note_service.storage, "engine", None))
     print("✅ Database tables created successfully")
     
     # Skip seeding during tests
@@ -21,9 +49,30 @@ async def lifespan(app: FastAPI):
         seed_initial_data()
         print("✅ Seeding completed")
     
+    print(f"🗂️  Loaded {note_service.load_index()} notes into the list index")
+    notes_feed.bind(asyncio.get_running_loop())
+    if maintenance.start():
+        print("🧹 Database maintenance scheduled")
+    index_refresher = None
+    if note_service.index_max_age:
+        index_refresher = asyncio.create_task(refresh_index_periodically(note_service.index_max_age))
+    warm_up_task = asyncio.create_task(warm_up(app))
     print("🎉 Application startup complete!")
     yield
     print("🛑 Shutting down Real-Time Notes Pad API...")
+    # Take the worker out of rotation before draining it
+    app.state.status = "stopping"
+    warm_up_task.cancel()
+    
+    flushed = await websocket_service.flush_pending_updates()
+    print(f"💾 Flushed {flushed} pending note updates")
+    await maintenance.stop()
+    if index_refresher:
+        index_refresher.cancel()
+    scheduler.cancel_all()
+    notes_feed.unbind()
+    recorder.close()
+    note_service.close()
 
 app = FastAPI(
     title="Real-Time Notes Pad API", 
@@ -40,9 +89,29 @@ app.add_middleware(
 )
 
 app.include_router(notes.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 app.include_router(websockets.router)
+app.include_router(cluster.router)
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    # Unlike /health (the process is up), 503 until startup has finished and again while shutting down
+    status = getattr(request.app.state, "status", "starting")
+    if status != "ready":
+        return JSONResponse(status_code=503, content={"status": status})
+    return {"status": status}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "scheduler": scheduler.stats(),
+        "outbound": manager.stats,
+        "connections": manager.counts(),
+        "notes_feed_subscribers": len(notes_feed.subscribers),
+        "spectators": spectators.stats(),
+        "maintenance": maintenance.metrics()
+    }
@@ -0,0 +1,93 @@
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from typing import Annotated, Literal, Optional, Union
+
+
+class InvalidMessage(ValueError):
+    """A frame that is not a well-formed client message"""
+
+
+class ClientMessage(BaseModel):
+    # Unknown fields (a client-side timestamp, say) are dropped while parsing
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    # Set on multiplexed connections; /ws/{note_id} takes it from the path
+    note_id: Optional[str] = None
+
+
+class ContentChange(ClientMessage):
+    type: Literal["content_change"] = "content_change"
+    content: str = ""
+
+
+class CursorPosition(ClientMessage):
+    type: Literal["cursor_position"] = "cursor_position"
+    position: Optional[int] = None
+
+
+class TypingIndicator(ClientMessage):
+    type: Literal["typing_indicator"] = "typing_indicator"
+    is_typing: bool = False
+
+
+class Subscribe(ClientMessage):
+    type: Literal["subscribe"] = "subscribe"
+
+
+class Unsubscribe(ClientMessage):
+    type: Literal["unsubscribe"] = "unsubscribe"
+
+
+class SubscribeIndex(ClientMessage):
+    type: Literal["subscribe_index"] = "subscribe_index"
+
+
+class UnsubscribeIndex(ClientMessage):
+    type: Literal["unsubscribe_index"] = "unsubscribe_index"
+
+
+class UnknownMessage(ClientMessage):
+    """A message whose type the server does not handle, answered with an error"""
+    type: Optional[str] = None
+
+
+Message = Annotated[
+    Union[ContentChange, CursorPosition, TypingIndicator, Subscribe, Unsubscribe, SubscribeIndex, UnsubscribeIndex],
+    Field(discriminator="type"),
+]
+
+# Built once: parsing and validation then happen in a single pass in pydantic-core
+_adapter = TypeAdapter(Message)
+
+
+def _decoded(error: ValidationError) -> ClientMessage:
+    """Map a validation failure to an unknown message or an InvalidMessage"""
+    first = error.errors(include_url=False)[0]
+    kind = first["type"]
+    if kind == "json_invalid":
+        raise InvalidMessage("Invalid JSON format")
+    if kind in ("union_tag_invalid", "union_tag_not_found"):
+        note_id = first["input"].get("note_id")
+        return UnknownMessage(
+            type=first["ctx"]["tag"] if kind == "union_tag_invalid" else None,
+            note_id=note_id if isinstance(note_id, str) else None,
+        )
+    if kind in ("model_attributes_type", "model_type", "dict_type"):
+        raise InvalidMessage("Message must be a JSON object")
+    field = ".".join(str(part) for part in first["loc"][1:])
+    raise InvalidMessage(f"Invalid {first['loc'][0]} message: {field}: {first['msg']}")
+
+
+def decode_message(data: Union[str, bytes]) -> ClientMessage:
+    """Parse a websocket frame into its typed message"""
+    try:
+        return _adapter.validate_json(data)
+    except ValidationError as error:
+        return _decoded(error)
+
+
+def parse_message(data: dict) -> ClientMessage:
+    """Type an already-parsed message, for callers holding a dict"""
+    try:
+        return _adapter.validate_python(data)
+    except ValidationError as error:
+        return _decoded(error)
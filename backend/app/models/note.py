@@ -1,17 +1,52 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from sqlalchemy.types import Text, TypeDecorator
 from typing import Optional
 from datetime import datetime
 import uuid
+from ..storage.compression import get_codec
+
+class CompressedText(TypeDecorator):
+    """Text column that is compressed at rest and read back as a plain string.
+
+    Compressed values are bound as bytes into a TEXT column, which only SQLite's
+    dynamic typing accepts; ``database`` refuses compression on other dialects.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return get_codec().encode(value)
+
+    def process_result_value(self, value, dialect):
+        return get_codec().decode(value)
 
 class NoteBase(SQLModel):
     title: str
     content: str
 
 class Note(NoteBase, table=True):
+    # Owner-scoped listing reads this index in updated_at order
+    __table_args__ = (Index("ix_note_owner_uid_updated_at", "owner_uid", "updated_at"),)
+
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    content: str = Field(sa_type=CompressedText)
+    # Firebase uid of the creator; None for notes created without signing in
+    owner_uid: Optional[str] = Field(default=None)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
+class NoteShare(SQLModel, table=True):
+    """Grants a user (other than the owner) access to a note"""
+    __table_args__ = (Index("ix_noteshare_uid_note_id", "uid", "note_id"),)
+
+    note_id: str = Field(foreign_key="note.id", primary_key=True)
+    uid: str = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class NoteShareCreate(SQLModel):
+    uid: str
+
 class NoteCreate(NoteBase):
     pass
 
@@ -21,11 +56,13 @@ class NoteUpdate(SQLModel):
 
 class NoteRead(NoteBase):
     id: str
+    owner_uid: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
 class NoteListItem(SQLModel):
     id: str
     title: Optional[str] = None
+    owner_uid: Optional[str] = None
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
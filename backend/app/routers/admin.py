@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Literal
+from ..auth.firebase_auth import require_admin
+from ..services.maintenance import TASKS, maintenance
+from ..services.note_service import note_service
+from ..services.profiler_service import ProfilerBusyError, profiler
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.post("/profile")
+async def profile_server(
+    seconds: float = Query(default=10, gt=0, le=120),
+    interval_ms: float = Query(default=5, ge=1, le=100),
+    format: Literal["json", "collapsed"] = "json"
+):
+    """Sample the running server for a few seconds"""
+    try:
+        report = await profiler.profile(seconds, interval=interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    if format == "collapsed":
+        # Feed straight into flamegraph.pl or speedscope
+        return PlainTextResponse(
+            report["collapsed"] + "\n",
+            headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+        )
+    return report
+
+@router.get("/maintenance")
+async def maintenance_status():
+    """Timings, reclaimed space and file sizes of database maintenance"""
+    return maintenance.stats()
+
+@router.post("/maintenance")
+async def run_maintenance(task: Literal["all", "checkpoint", "vacuum", "optimize", "integrity"] = "all"):
+    """Run maintenance now, regardless of schedule and load"""
+    if maintenance.engine is None:
+        raise HTTPException(status_code=409, detail="Database maintenance needs the SQLite storage backend")
+    return await maintenance.run_all(TASKS if task == "all" else (task,))
+
+@router.get("/notes-index")
+def check_index_consistency():
+    """Compare the in-memory notes index with the database"""
+    return note_service.check_index_consistency()
+
+@router.post("/notes-index/repair")
+def repair_index():
+    """Reload the notes index from the database if it has drifted"""
+    report = note_service.check_index_consistency()
+    if not report["consistent"]:
+        note_service.load_index()
+        report["repaired"] = True
+    return report
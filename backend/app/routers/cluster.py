@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+from ..services.websocket_service import websocket_service
+import os
+import secrets
+
+router = APIRouter(prefix="/internal/cluster", tags=["cluster"], include_in_schema=False)
+
+# Shared by the cluster router and its workers; without it these routes do not exist
+CLUSTER_TOKEN = os.getenv("NOTES_CLUSTER_TOKEN")
+
+class ReleaseRequest(BaseModel):
+    note_ids: List[str]
+
+def require_cluster_token(x_cluster_token: Optional[str] = Header(default=None)):
+    if not CLUSTER_TOKEN or not x_cluster_token or not secrets.compare_digest(x_cluster_token, CLUSTER_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@router.post("/release", dependencies=[Depends(require_cluster_token)])
+async def release_notes(request: ReleaseRequest):
+    """Called by the router before notes move to another worker"""
+    flushed = await websocket_service.release_notes(request.note_ids)
+    return {"released": len(request.note_ids), "flushed": flushed}
@@ -1,35 +1,135 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from ..models.note import Note, NoteCreate, NoteUpdate, NoteListItem
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from ..models.note import Note, NoteCreate, NoteUpdate, NoteListItem, NoteShareCreate
+from ..auth.firebase_auth import get_current_user, require_auth, verify_token
 from ..services.note_service import note_service
+from ..services.websocket_service import websocket_service
+from ..services.spectators import spectators
+from ..services.backup_service import BackupFormatError, NDJSONReader, NoteImporter, export_ndjson
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 
+def _uid(user) -> Optional[str]:
+    return user["uid"] if user else None
+
+def _authorize(note_id: str, user, owner_only: bool = False):
+    """404 for notes the caller cannot see, 403 for owner-only actions by anyone else"""
+    uid = _uid(user)
+    if not note_service.can_access(note_id, uid):
+        raise HTTPException(status_code=404, detail="Note not found")
+    if owner_only and not note_service.is_owner(note_id, uid):
+        raise HTTPException(status_code=403, detail="Only the note's owner can do this")
+
 @router.post("", response_model=Note)
-def create_note(note: NoteCreate):
-    return note_service.create_note(note)
+def create_note(note: NoteCreate, user = Depends(get_current_user)):
+    return note_service.create_note(note, owner_uid=_uid(user))
 
 @router.get("", response_model=List[NoteListItem])
-def get_notes():
-    return note_service.get_all_notes()
+def get_notes(
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    user = Depends(get_current_user)
+):
+    # Signed-in users get their own and shared notes; anonymous callers the unowned ones
+    return note_service.get_all_notes(offset=offset, limit=limit, owner_uid=_uid(user))
+
+@router.get("/export")
+def export_notes(gzip: bool = False, user = Depends(get_current_user)):
+    filename = "notes-export.ndjson.gz" if gzip else "notes-export.ndjson"
+    return StreamingResponse(
+        # The same notes GET /notes lists: the caller's and those shared with them
+        export_ndjson(compress=gzip, owner_uid=_uid(user), scoped=True),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import")
+async def import_notes(request: Request, user = Depends(get_current_user)):
+    reader = NDJSONReader()
+    # Imported notes belong to the caller, who cannot overwrite other users' notes
+    importer = NoteImporter(owner_uid=_uid(user), scoped=True)
+    
+    try:
+        async for data in request.stream():
+            for chunk in importer.add(reader.feed(data)):
+                await run_in_threadpool(importer.write, chunk)
+        for chunk in importer.add(reader.close()):
+            await run_in_threadpool(importer.write, chunk)
+        await run_in_threadpool(importer.write, importer.drain())
+    except BackupFormatError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{e} ({importer.imported} notes imported before the error)"
+        )
+    
+    return {"imported": importer.imported, "skipped": importer.skipped}
 
 @router.get("/{note_id}", response_model=Note)
-def get_note(note_id: str):
+def get_note(note_id: str, user = Depends(get_current_user)):
+    _authorize(note_id, user)
     note = note_service.get_note(note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     return note
 
 @router.put("/{note_id}", response_model=Note)
-def update_note(note_id: str, note_update: NoteUpdate):
-    note = note_service.update_note(note_id, note_update)
+async def update_note(note_id: str, note_update: NoteUpdate, user = Depends(get_current_user)):
+    _authorize(note_id, user)
+    note = await run_in_threadpool(note_service.update_note, note_id, note_update)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
+    # Editors with the note open see the change without reloading
+    await websocket_service.handle_external_update(note, note_update.model_fields_set)
     return note
 
+@router.get("/{note_id}/stream")
+async def stream_note(
+    note_id: str,
+    request: Request,
+    token: Optional[str] = None,
+    user = Depends(get_current_user)
+):
+    """Read-only live view of a note as Server-Sent Events"""
+    # EventSource cannot set headers, so browsers pass the ID token as ?token=
+    if user is None and token:
+        user = verify_token(token)
+    _authorize(note_id, user)
+    
+    async def snapshot():
+        return websocket_service.snapshot(note_id)
+    
+    return StreamingResponse(
+        spectators.stream(note_id, snapshot, last_event_id=request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.delete("/{note_id}")
-def delete_note(note_id: str):
+def delete_note(note_id: str, user = Depends(get_current_user)):
+    # Unowned notes stay deletable by anyone, as before ownership existed
+    _authorize(note_id, user, owner_only=not note_service.is_owner(note_id, None))
     success = note_service.delete_note(note_id)
     if not success:
         raise HTTPException(status_code=404, detail="Note not found")
-    return {"message": "Note deleted successfully"}
\ No newline at end of file
+    return {"message": "Note deleted successfully"}
+
+@router.get("/{note_id}/shares", response_model=List[str])
+def list_shares(note_id: str, user = Depends(require_auth)):
+    _authorize(note_id, user, owner_only=True)
+    return note_service.list_shares(note_id)
+
+@router.post("/{note_id}/shares")
+def share_note(note_id: str, share: NoteShareCreate, user = Depends(require_auth)):
+    _authorize(note_id, user, owner_only=True)
+    if not note_service.share_note(note_id, share.uid):
+        raise HTTPException(status_code=404, detail="Note not found")
+    return {"message": "Note shared successfully"}
+
+@router.delete("/{note_id}/shares/{uid}")
+def unshare_note(note_id: str, uid: str, user = Depends(require_auth)):
+    _authorize(note_id, user, owner_only=True)
+    if not note_service.unshare_note(note_id, uid):
+        raise HTTPException(status_code=404, detail="Share not found")
+    return {"message": "Share removed successfully"}
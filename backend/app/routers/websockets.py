@@ -1,45 +1,114 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query, status
+from typing import Optional
 from ..websocket_manager import manager
 from ..services.websocket_service import websocket_service  # Import the instance, not the class
+from ..services.note_service import note_service
+from ..services.notes_feed import notes_feed
+from ..services.traffic_recorder import recorder
+from ..auth.firebase_auth import verify_token
+from ..models.messages import (
+    ClientMessage, InvalidMessage, Subscribe, SubscribeIndex, Unsubscribe, UnsubscribeIndex, decode_message
+)
 import json
 import logging
+import os
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Upper bound on note rooms a single multiplexed connection may join
+MAX_SUBSCRIPTIONS = int(os.getenv("WS_MAX_SUBSCRIPTIONS", 64))
+
+class _Rejected(Exception):
+    pass
+
+def _uid_from_token(token: Optional[str]) -> Optional[str]:
+    """Browsers cannot set headers on websockets, so the ID token comes as ?token="""
+    if not token:
+        return None
+    try:
+        return verify_token(token)["uid"]
+    except HTTPException:
+        raise _Rejected()
+
+def _can_join(note_id: str, uid: Optional[str]) -> bool:
+    # Rooms for ids without a note stay open, as before ownership existed
+    return note_service.can_access(note_id, uid) or note_service.index.get(note_id) is None
+
+def _list_for(uid: Optional[str]):
+    return lambda: note_service.get_all_notes(owner_uid=uid)
+
+@router.websocket("/ws/notes/index")
+async def notes_index_endpoint(websocket: WebSocket, token: Optional[str] = Query(default=None)):
+    # Streams notes-list diffs so list views don't have to poll GET /api/v1/notes
+    try:
+        uid = _uid_from_token(token)
+    except _Rejected:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await notes_feed.subscribe(websocket, _list_for(uid), scope=uid)
+    
+    try:
+        while True:
+            # Nothing is expected from the client; reading detects the disconnect
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notes_feed.unsubscribe(websocket)
+
+
 @router.websocket("/ws/{note_id}")
 async def websocket_endpoint(
     websocket: WebSocket, 
     note_id: str,
-    user_name: str = Query(default="Anonymous")
+    user_name: str = Query(default="Anonymous"),
+    batch: bool = Query(default=False),
+    token: Optional[str] = Query(default=None)
 ):
-    await manager.connect(websocket, note_id)
+    try:
+        uid = _uid_from_token(token)
+    except _Rejected:
+        # A stale token is refused rather than treated as anonymous
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not _can_join(note_id, uid):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # Clients that pass ?batch=true accept JSON-array frames of coalesced room messages
+    await manager.connect(websocket, note_id, user_name, batch=batch)
     logger.info(f"User {user_name} connected to note {note_id}")
+    recorder.record_join(websocket, note_id, user_name)
     
     try:
+        # Serve live room state (including unsaved edits) without a REST round-trip;
+        # inside the try so a failed send still runs the disconnect cleanup
+        await websocket_service.handle_join(websocket, note_id, user_name)
+        
         while True:
             # Receive text data from WebSocket
             data = await websocket.receive_text()
             logger.info(f"Received message: {data}")
             
             try:
-                # Parse JSON message
-                message_data = json.loads(data)
-                logger.info(f"Parsed message: {message_data}")
+                # Parse and validate in one pass into the message's typed struct
+                message = decode_message(data)
                 
                 # Fix: Use the instance, not the class
                 await websocket_service.handle_message(
                     websocket=websocket,
                     note_id=note_id,
                     user_name=user_name,
-                    message_data=message_data
+                    message_data=message
                 )
                 
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON received: {e}")
+            except InvalidMessage as e:
+                logger.error(f"Invalid message received: {e}")
                 await websocket.send_text(json.dumps({
                     "type": "error",
-                    "message": "Invalid JSON format"
+                    "message": str(e)
                 }))
                 
             except Exception as e:
@@ -52,6 +121,97 @@ async def websocket_endpoint(
     except WebSocketDisconnect:
         logger.info(f"User {user_name} disconnected from note {note_id}")
         manager.disconnect(websocket, note_id)
+        await websocket_service.handle_leave(note_id, user_name)
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}", exc_info=True)
+        manager.disconnect(websocket, note_id)
+        await websocket_service.handle_leave(note_id, user_name)
+    finally:
+        recorder.record_leave(websocket, note_id)
+        recorder.forget(websocket)
+
+
+@router.websocket("/ws")
+async def multiplexed_websocket_endpoint(
+    websocket: WebSocket,
+    user_name: str = Query(default="Anonymous"),
+    batch: bool = Query(default=False),
+    token: Optional[str] = Query(default=None)
+):
+    try:
+        uid = _uid_from_token(token)
+    except _Rejected:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # One socket, many rooms: clients send subscribe/unsubscribe and tag every
+    # message with its note_id; every frame sent back carries a note_id as well
+    await manager.accept(websocket, user_name, batch=batch)
+    logger.info(f"User {user_name} opened a multiplexed connection")
+    
+    try:
+        while True:
+            data = await websocket.receive_text()
+            message = None
+            
+            try:
+                message = decode_message(data)
+                await _handle_multiplexed_message(websocket, user_name, uid, message)
+                
+            except InvalidMessage as e:
+                logger.error(f"Invalid message received: {e}")
+                await websocket.send_text(json.dumps({
+                    "type": "error",
+                    "message": str(e)
+                }))
+                
+            except Exception as e:
+                logger.error(f"Error handling message: {e}", exc_info=True)
+                await websocket.send_text(json.dumps({
+                    "type": "error",
+                    "note_id": message.note_id if message else None,
+                    "message": f"Error processing message: {str(e)}"
+                }))
+                
+    except WebSocketDisconnect:
+        logger.info(f"User {user_name} closed their multiplexed connection")
+        notes_feed.unsubscribe(websocket)
+        await websocket_service.handle_disconnect(websocket, user_name)
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
-        manager.disconnect(websocket, note_id)
\ No newline at end of file
+        notes_feed.unsubscribe(websocket)
+        await websocket_service.handle_disconnect(websocket, user_name)
+
+
+async def _handle_multiplexed_message(websocket: WebSocket, user_name: str, uid: Optional[str], message: ClientMessage):
+    if isinstance(message, SubscribeIndex):
+        await notes_feed.subscribe(websocket, _list_for(uid), scope=uid)
+        return
+    if isinstance(message, UnsubscribeIndex):
+        notes_feed.unsubscribe(websocket)
+        await websocket.send_text(json.dumps({"type": "unsubscribed_index"}))
+        return
+    
+    note_id = message.note_id
+    if not note_id:
+        raise ValueError("Missing note_id")
+    
+    if isinstance(message, Subscribe):
+        if not _can_join(note_id, uid):
+            raise ValueError(f"Note {note_id} not found")
+        if note_id not in manager.get_rooms(websocket) and len(manager.get_rooms(websocket)) >= MAX_SUBSCRIPTIONS:
+            raise ValueError(f"Subscription limit of {MAX_SUBSCRIPTIONS} notes reached")
+        # The snapshot doubles as the subscription acknowledgement
+        await websocket_service.subscribe(websocket, note_id, user_name)
+    elif isinstance(message, Unsubscribe):
+        await websocket_service.unsubscribe(websocket, note_id, user_name)
+        await websocket.send_text(json.dumps({"type": "unsubscribed", "note_id": note_id}))
+    elif note_id not in manager.get_rooms(websocket):
+        raise ValueError(f"Not subscribed to note {note_id}")
+    else:
+        await websocket_service.handle_message(
+            websocket=websocket,
+            note_id=note_id,
+            user_name=user_name,
+            message_data=message
+        )
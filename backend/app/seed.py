@@ -4,10 +4,8 @@ from .models.note import NoteCreate
 def seed_initial_data():
     try:
         print("Checking existing notes...")
-        existing_notes = note_service.get_all_notes()
-        print(f"Found {len(existing_notes)} existing notes")
-        
-        if len(existing_notes) == 0:
+        # An EXISTS query: seeding must not read every note (or build the index) to decide
+        if not note_service.has_notes():
             print("Creating initial note...")
             initial_note = NoteCreate(
                 title="Welcome to Real-Time Notes Pad",
@@ -17,8 +15,6 @@ def seed_initial_data():
             print(f"Created initial note with ID: {created_note.id}")
         else:
             print("Database already has notes, skipping seed")
-            for note in existing_notes:
-                print(f"Existing note: {note.id} - {note.title}")
                 
     except Exception as e:
         print(f"Error during seeding: {e}")
@@ -0,0 +1,198 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import json
+import zlib
+import logging
+from pydantic import ValidationError
+from ..models.note import NoteRead
+from ..services.note_service import note_service
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+EXPORT_BATCH_SIZE = 500
+IMPORT_CHUNK_SIZE = 500
+
+
+class BackupFormatError(ValueError):
+    """Raised when an import stream contains an invalid NDJSON record"""
+
+    def __init__(self, line_number: int, reason: str):
+        super().__init__(f"Invalid record on line {line_number}: {reason}")
+        self.line_number = line_number
+
+
+def _serialize_note(row: Dict[str, Any]) -> bytes:
+    record = {
+        "id": row["id"],
+        "title": row["title"],
+        "content": row["content"],
+        "created_at": row["created_at"].isoformat(),
+        "updated_at": row["updated_at"].isoformat(),
+    }
+    if row.get("owner_uid"):
+        record["owner_uid"] = row["owner_uid"]
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def export_ndjson(
+    compress: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    owner_uid: Optional[str] = None,
+    scoped: bool = False
+) -> Iterator[bytes]:
+    """Yield the notes table (or, when ``scoped``, the notes ``owner_uid`` can list) as NDJSON, optionally gzip-compressed"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer: List[bytes] = []
+
+    for row in note_service.iter_notes(batch_size=batch_size, owner_uid=owner_uid, scoped=scoped):
+        buffer.append(_serialize_note(row))
+        if len(buffer) >= batch_size:
+            chunk = b"".join(buffer)
+            buffer.clear()
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+class NDJSONReader:
+    """Incremental NDJSON parser fed with arbitrary byte chunks.
+
+    Gzip input is detected from the first bytes and decompressed on the fly,
+    so memory use is bounded by the longest single line.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._decompressor: Optional[Any] = None
+        self._sniffed = False
+        self.line_number = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        if not self._sniffed:
+            # Need two bytes to recognise the gzip header
+            if len(self._buffer) + len(data) < 2:
+                self._buffer += data
+                return []
+            data = self._buffer + data
+            self._buffer = b""
+            self._sniffed = True
+            if data.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(wbits=31)
+
+        if self._decompressor:
+            data = self._decompressor.decompress(data)
+
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return self._parse_lines(lines)
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush whatever is left after the last chunk"""
+        tail = self._buffer
+        if self._decompressor:
+            tail += self._decompressor.flush()
+        self._buffer = b""
+        return self._parse_lines(tail.split(b"\n"))
+
+    def _parse_lines(self, lines: Iterable[bytes]) -> List[Dict[str, Any]]:
+        records = []
+        for line in lines:
+            self.line_number += 1
+            if not line.strip():
+                continue
+            records.append(self._parse_record(line))
+        return records
+
+    def _parse_record(self, line: bytes) -> Dict[str, Any]:
+        try:
+            raw = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BackupFormatError(self.line_number, f"invalid JSON ({e.msg})")
+
+        if not isinstance(raw, dict):
+            raise BackupFormatError(self.line_number, "expected a JSON object")
+
+        utc_now = datetime.now(timezone.utc)
+        raw.setdefault("created_at", utc_now)
+        raw.setdefault("updated_at", raw["created_at"])
+
+        try:
+            record = NoteRead.model_validate(raw).model_dump()
+        except ValidationError as e:
+            raise BackupFormatError(self.line_number, str(e.errors()[0]["msg"]))
+        
+        # Timestamps are stored as naive UTC, like the rest of the table
+        for field in ("created_at", "updated_at"):
+            if record[field].tzinfo is not None:
+                record[field] = record[field].astimezone(timezone.utc).replace(tzinfo=None)
+        return record
+
+
+class NoteImporter:
+    """Collect parsed records and write them out in fixed-size chunks.
+
+    A ``scoped`` importer assigns every note to ``owner_uid`` and skips
+    records that would overwrite a note someone else owns.
+    """
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE, owner_uid: Optional[str] = None, scoped: bool = False):
+        self.chunk_size = chunk_size
+        self.owner_uid = owner_uid
+        self.scoped = scoped
+        self.imported = 0
+        self.skipped = 0
+        self._pending: List[Dict[str, Any]] = []
+
+    def add(self, records: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Queue records and return any chunks that are ready to be written"""
+        self._pending.extend(records)
+        ready = []
+        while len(self._pending) >= self.chunk_size:
+            ready.append(self._pending[:self.chunk_size])
+            del self._pending[:self.chunk_size]
+        return ready
+
+    def drain(self) -> List[Dict[str, Any]]:
+        pending, self._pending = self._pending, []
+        return pending
+
+    def write(self, chunk: List[Dict[str, Any]]) -> int:
+        if self.scoped:
+            chunk = self._claim(chunk)
+        count = note_service.import_notes(chunk) if chunk else 0
+        self.imported += count
+        logger.info(f"Imported chunk of {count} notes ({self.imported} total)")
+        return count
+
+    def _claim(self, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        claimed = []
+        for record in chunk:
+            existing = note_service.get_item(record["id"])
+            if existing is not None and existing.owner_uid != self.owner_uid:
+                self.skipped += 1
+                continue
+            claimed.append({**record, "owner_uid": self.owner_uid})
+        return claimed
+
+
+def import_ndjson(chunks: Iterable[bytes], chunk_size: int = IMPORT_CHUNK_SIZE) -> int:
+    """Import an NDJSON (or gzipped NDJSON) byte stream, returning the row count"""
+    reader = NDJSONReader()
+    importer = NoteImporter(chunk_size=chunk_size)
+
+    for data in chunks:
+        for chunk in importer.add(reader.feed(data)):
+            importer.write(chunk)
+
+    for chunk in importer.add(reader.close()):
+        importer.write(chunk)
+    importer.write(importer.drain())
+    return importer.imported
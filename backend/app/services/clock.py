@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+import time
+
+# (whole second, its ISO-8601 prefix); rebuilt at most once a second
+_current = (0, "")
+
+
+def utc_timestamp() -> str:
+    """ISO-8601 UTC time with microseconds, without building a datetime per call.
+
+    Same format as ``datetime.now(timezone.utc).isoformat()``; only the
+    date-and-second prefix is formatted by ``datetime``, once per second.
+    """
+    global _current
+    now = time.time()
+    second = int(now)
+    if second != _current[0]:
+        _current = (second, datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"))
+    return f"{_current[1]}.{int((now - second) * 1_000_000):06d}+00:00"
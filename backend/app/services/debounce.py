@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+import os
+
+
+def _env_seconds(name: str, default_ms: int) -> float:
+    return int(os.getenv(name, default_ms)) / 1000
+
+
+@dataclass(frozen=True)
+class DebouncePolicy:
+    """Decide how long to wait before persisting a note's pending content.
+
+    The quiet window grows with the edit rate of the current burst and with
+    the size of the note, so heavy typing on large notes coalesces into fewer
+    writes. ``max_wait`` caps the time any edit can stay unsaved.
+    """
+
+    min_delay: float = 0.3
+    max_delay: float = 2.0
+    max_wait: float = 5.0
+    # Edits per second at which the quiet window doubles
+    rate_scale: float = 5.0
+    # Content size (characters) at which the quiet window doubles
+    size_scale: int = 64 * 1024
+
+    @classmethod
+    def from_env(cls) -> "DebouncePolicy":
+        return cls(
+            min_delay=_env_seconds("DEBOUNCE_MIN_MS", 300),
+            max_delay=_env_seconds("DEBOUNCE_MAX_MS", 2000),
+            max_wait=_env_seconds("DEBOUNCE_MAX_WAIT_MS", 5000),
+        )
+
+    def quiet_window(self, edit_rate: float, content_size: int) -> float:
+        window = (
+            self.min_delay
+            * (1 + edit_rate / self.rate_scale)
+            * (1 + content_size / self.size_scale)
+        )
+        return max(self.min_delay, min(window, self.max_delay))
+
+    def next_delay(self, now: float, first_pending_at: float, edits: int, content_size: int) -> float:
+        """Seconds from ``now`` until the pending content should be saved"""
+        elapsed = now - first_pending_at
+        edit_rate = (edits - 1) / elapsed if elapsed > 0 else 0.0
+        deadline = min(
+            now + self.quiet_window(edit_rate, content_size),
+            first_pending_at + self.max_wait,
+        )
+        return max(0.0, deadline - now)
@@ -0,0 +1,307 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional
+from sqlalchemy.engine import Connection, Engine
+from .note_service import note_service
+from .websocket_service import websocket_service
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+TASKS = ("checkpoint", "vacuum", "optimize", "integrity")
+
+
+def _env_seconds(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class MaintenancePolicy:
+    """How often each maintenance task runs and when the server counts as busy.
+
+    While busy, the WAL checkpoint falls back to a non-blocking ``PASSIVE``
+    pass and the heavier tasks are deferred, but never by more than
+    ``max_defer``, so a server that is never idle still gets maintained.
+    """
+
+    checkpoint_interval: float = 60.0
+    vacuum_interval: float = 600.0
+    optimize_interval: float = 3600.0
+    integrity_interval: float = 86400.0
+    poll_interval: float = 5.0
+    max_defer: float = 900.0
+    # Pending saves at which the server counts as busy
+    busy_threshold: int = 1
+    # Upper bound on pages freed by one incremental vacuum step
+    vacuum_pages: int = 2000
+    # Free-page ratio that justifies a one-off VACUUM to enable incremental vacuum
+    rebuild_ratio: float = 0.25
+    full_integrity_check: bool = False
+    enabled: bool = True
+
+    @classmethod
+    def from_env(cls) -> "MaintenancePolicy":
+        return cls(
+            enabled=os.getenv("DB_MAINTENANCE", "true").lower() in ("1", "true", "yes"),
+            checkpoint_interval=_env_seconds("DB_CHECKPOINT_INTERVAL", 60),
+            vacuum_interval=_env_seconds("DB_VACUUM_INTERVAL", 600),
+            optimize_interval=_env_seconds("DB_OPTIMIZE_INTERVAL", 3600),
+            integrity_interval=_env_seconds("DB_INTEGRITY_INTERVAL", 86400),
+            max_defer=_env_seconds("DB_MAINTENANCE_MAX_DEFER", 900),
+            busy_threshold=int(os.getenv("DB_MAINTENANCE_BUSY_SAVES", 1)),
+            vacuum_pages=int(os.getenv("DB_VACUUM_PAGES", 2000)),
+            full_integrity_check=os.getenv("DB_INTEGRITY_CHECK", "quick") == "full",
+        )
+
+    def interval(self, task: str) -> float:
+        return getattr(self, f"{task}_interval")
+
+
+def _pragma(connection: Connection, name: str):
+    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def _run_script(connection: Connection, sql: str):
+    # The sqlite3 module steps row-less statements only once, and
+    # incremental_vacuum frees a single page per step; executescript runs them out
+    connection.connection.driver_connection.executescript(sql)
+
+
+def _file_size(path: Optional[str]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+class DatabaseMaintenance:
+    """Keep the SQLite database compact and its query plans fresh.
+
+    A background task wakes every ``poll_interval`` and runs whichever tasks
+    are due, one at a time on a worker thread:
+
+    - ``checkpoint``: ``wal_checkpoint(TRUNCATE)`` folds the WAL back into the
+      database and shrinks it to zero bytes
+    - ``vacuum``: ``incremental_vacuum`` returns free pages to the filesystem
+    - ``optimize``: ``PRAGMA optimize`` re-runs ``ANALYZE`` where stats are stale
+    - ``integrity``: ``quick_check`` (or ``integrity_check``)
+
+    ``load`` reports how many saves are pending; at ``busy_threshold`` or
+    above, the scheduler backs off as described on ``MaintenancePolicy``.
+    """
+
+    def __init__(self, engine: Callable[[], Optional[Engine]], load: Callable[[], int] = lambda: 0,
+                 policy: Optional[MaintenancePolicy] = None):
+        self._engine = engine
+        self._load = load
+        self.policy = policy or MaintenancePolicy.from_env()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._due: Dict[str, float] = {}
+        self._deferred_since: Dict[str, float] = {}
+        self._stats = {task: self._empty_stats() for task in TASKS}
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {
+            "runs": 0,
+            "deferred": 0,
+            "errors": 0,
+            "last_run": None,
+            "last_duration_ms": None,
+            "total_duration_ms": 0.0,
+            "reclaimed_bytes": 0,
+            "last_result": None,
+        }
+
+    @property
+    def engine(self) -> Optional[Engine]:
+        """The engine to maintain, or None when storage is not SQLite"""
+        engine = self._engine()
+        if engine is None or engine.dialect.name != "sqlite":
+            return None
+        return engine
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        if self.running or not self.policy.enabled or self.engine is None:
+            return False
+        now = time.monotonic()
+        # The first checkpoint and optimize come early; the rest wait a full interval
+        self._due = {
+            task: now + min(self.policy.interval(task), self.policy.checkpoint_interval)
+            if task in ("checkpoint", "optimize") else now + self.policy.interval(task)
+            for task in TASKS
+        }
+        self._deferred_since.clear()
+        self._task = asyncio.create_task(self._loop())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def busy(self) -> bool:
+        return self._load() >= self.policy.busy_threshold
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.policy.poll_interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Database maintenance tick failed: {e}")
+
+    async def tick(self, now: Optional[float] = None) -> Dict[str, dict]:
+        """Run every task that is due, deferring heavy ones while busy"""
+        now = time.monotonic() if now is None else now
+        results = {}
+        for task in TASKS:
+            if self._due.get(task, now) > now:
+                continue
+            busy = self.busy()
+            if busy and task != "checkpoint":
+                since = self._deferred_since.setdefault(task, now)
+                if now - since < self.policy.max_defer:
+                    self._stats[task]["deferred"] += 1
+                    self._due[task] = now + self.policy.poll_interval
+                    continue
+            self._deferred_since.pop(task, None)
+            self._due[task] = now + self.policy.interval(task)
+            results[task] = await self.run(task, busy=busy)
+        return results
+
+    async def run(self, task: str, busy: bool = False) -> dict:
+        """Run one task now, on a worker thread; tasks never overlap"""
+        if task not in TASKS:
+            raise ValueError(f"Unknown maintenance task: {task}")
+        engine = self.engine
+        if engine is None:
+            raise RuntimeError("Database maintenance needs the SQLite storage backend")
+
+        async with self._lock:
+            stats = self._stats[task]
+            started = time.perf_counter()
+            try:
+                result = await asyncio.to_thread(getattr(self, f"_{task}"), engine, busy)
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Database maintenance task {task} failed: {e}")
+                raise
+            duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+            stats["runs"] += 1
+            stats["last_run"] = datetime.now(timezone.utc).isoformat()
+            stats["last_duration_ms"] = duration_ms
+            stats["total_duration_ms"] = round(stats["total_duration_ms"] + duration_ms, 3)
+            stats["reclaimed_bytes"] += result.get("reclaimed_bytes", 0)
+            stats["last_result"] = result
+            logger.info(f"Database maintenance {task} took {duration_ms} ms: {result}")
+            return {"task": task, "duration_ms": duration_ms, **result}
+
+    async def run_all(self, tasks: Iterable[str] = TASKS) -> Dict[str, dict]:
+        return {task: await self.run(task) for task in tasks}
+
+    def stats(self) -> dict:
+        engine = self.engine
+        path = engine.url.database if engine is not None else None
+        return {
+            "enabled": engine is not None,
+            "running": self.running,
+            "busy": self.busy(),
+            "database_bytes": _file_size(path),
+            "wal_bytes": _file_size(f"{path}-wal" if path else None),
+            "tasks": self._stats,
+        }
+
+    def metrics(self) -> dict:
+        """Counts and durations only, for the unauthenticated /metrics endpoint"""
+        return {
+            "enabled": self.engine is not None,
+            "running": self.running,
+            "tasks": {
+                task: {key: stats[key] for key in ("runs", "deferred", "errors", "last_duration_ms", "total_duration_ms")}
+                for task, stats in self._stats.items()
+            },
+        }
+
+    @staticmethod
+    def _connect(engine: Engine) -> Connection:
+        # VACUUM and checkpoints cannot run inside a transaction
+        return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def _checkpoint(self, engine: Engine, busy: bool) -> dict:
+        # PASSIVE never waits on readers or writers; TRUNCATE also resets the WAL file
+        mode = "PASSIVE" if busy else "TRUNCATE"
+        wal_path = f"{engine.url.database}-wal" if engine.url.database else None
+        before = _file_size(wal_path)
+        with self._connect(engine) as connection:
+            blocked, wal_pages, checkpointed = connection.exec_driver_sql(
+                f"PRAGMA wal_checkpoint({mode})"
+            ).one()
+        return {
+            "mode": mode,
+            "blocked": bool(blocked),
+            "wal_pages": wal_pages,
+            "checkpointed_pages": checkpointed,
+            "reclaimed_bytes": max(0, before - _file_size(wal_path)),
+        }
+
+    def _vacuum(self, engine: Engine, busy: bool) -> dict:
+        with self._connect(engine) as connection:
+            page_size = _pragma(connection, "page_size")
+            pages_before = _pragma(connection, "page_count")
+            free_pages = _pragma(connection, "freelist_count")
+            incremental = _pragma(connection, "auto_vacuum") == 2
+
+            if incremental:
+                _run_script(connection, f"PRAGMA incremental_vacuum({self.policy.vacuum_pages})")
+                mode = "incremental"
+            elif not busy and pages_before and free_pages / pages_before >= self.policy.rebuild_ratio:
+                # Databases created before incremental vacuum was switched on need
+                # one full rebuild for it to take effect; only worth it when fragmented
+                connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.exec_driver_sql("VACUUM")
+                mode = "full"
+            else:
+                mode = "skipped"
+
+            pages_after = _pragma(connection, "page_count")
+            return {
+                "mode": mode,
+                "free_pages": _pragma(connection, "freelist_count"),
+                "reclaimed_bytes": max(0, pages_before - pages_after) * page_size,
+            }
+
+    def _optimize(self, engine: Engine, busy: bool) -> dict:
+        with self._connect(engine) as connection:
+            # Bounds the rows ANALYZE reads per index, keeping the pass short
+            connection.exec_driver_sql("PRAGMA analysis_limit = 1000")
+            _run_script(connection, "PRAGMA optimize")
+        return {"reclaimed_bytes": 0}
+
+    def _integrity(self, engine: Engine, busy: bool) -> dict:
+        check = "integrity_check" if self.policy.full_integrity_check else "quick_check"
+        with self._connect(engine) as connection:
+            problems = [row[0] for row in connection.exec_driver_sql(f"PRAGMA {check}")]
+        ok = problems == ["ok"]
+        if not ok:
+            logger.error(f"Database {check} found problems: {problems[:10]}")
+        return {"check": check, "ok": ok, "problems": [] if ok else problems[:100], "reclaimed_bytes": 0}
+
+
+maintenance = DatabaseMaintenance(
+    engine=lambda: getattr(note_service.storage, "engine", None),
+    load=lambda: websocket_service.pending_saves,
+)
@@ -1,67 +1,264 @@
-from typing import List, Optional
-from sqlmodel import Session, select
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+import os
+import threading
+import time
 from ..models.note import Note, NoteCreate, NoteUpdate, NoteListItem
-from ..database import engine
+from ..database import get_engine
+from ..storage.base import NoteStorage
+from ..storage.sql import SQLNoteStorage
+from .notes_index import NotesIndex, _sort_key
+from .notes_feed import NotesFeed, notes_feed
 from datetime import datetime, timezone
 
+# "sqlite" (default) or "log" for the append-only segment log engine
+STORAGE_BACKEND = os.getenv("NOTES_STORAGE", "sqlite")
+
+# Set when several processes write to the same database (e.g. cluster workers):
+# the index is then re-read once it is this many seconds old, and misses are
+# looked up in storage
+INDEX_MAX_AGE = float(os.getenv("NOTES_INDEX_MAX_AGE", 0)) or None
+
+# Set to use another engine (tests swap in an in-memory one); otherwise the
+# application engine is built on first use
+engine = None
+
+def _list_item(note: Note) -> NoteListItem:
+    return NoteListItem(
+        id=note.id,
+        title=note.title,
+        owner_uid=note.owner_uid,
+        created_at=note.created_at,
+        updated_at=note.updated_at
+    )
+
+def create_storage_from_env() -> Optional[NoteStorage]:
+    if STORAGE_BACKEND == "log":
+        from ..storage.log import LogNoteStorage
+        return LogNoteStorage.from_env()
+    if STORAGE_BACKEND != "sqlite":
+        raise ValueError(f"Unknown NOTES_STORAGE backend: {STORAGE_BACKEND}")
+    return None
+
 class NoteService:
     
-    def create_note(self, note_data: NoteCreate) -> Note:
-        with Session(engine) as session:
-            utc_now = datetime.now(timezone.utc)
-            note = Note(
-                title=note_data.title,
-                content=note_data.content,
-                created_at=utc_now,
-                updated_at=utc_now
-            )
-            session.add(note)
-            session.commit()
-            session.refresh(note)
-            return note
+    def __init__(self, storage: Optional[NoteStorage] = None, feed: Optional[NotesFeed] = None,
+                 index_max_age: Optional[float] = None,
+                 storage_factory: Optional[Callable[[], Optional[NoteStorage]]] = None):
+        self._storage = storage
+        # Opened on first use, so importing the app does not replay a storage log
+        self._storage_factory = storage_factory
+        self._storage_lock = threading.Lock()
+        self.index = NotesIndex()
+        self.index_max_age = index_max_age
+        self._index_loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        # Every mutation is announced to notes-list subscribers
+        self.feed = feed or notes_feed
+    
+    @property
+    def storage(self) -> NoteStorage:
+        if self._storage_factory is not None:
+            with self._storage_lock:
+                if self._storage_factory is not None:
+                    self._storage = self._storage_factory()
+                    self._storage_factory = None
+        # The SQL engine is looked up per call so the module-level engine can be swapped
+        return self._storage or SQLNoteStorage(engine or get_engine())
+    
+    def has_notes(self) -> bool:
+        """Whether any note exists, without listing them"""
+        return self.storage.has_notes()
+    
+    def create_note(self, note_data: NoteCreate, owner_uid: Optional[str] = None) -> Note:
+        utc_now = datetime.now(timezone.utc)
+        note = self.storage.create(Note(
+            title=note_data.title,
+            content=note_data.content,
+            owner_uid=owner_uid,
+            created_at=utc_now,
+            updated_at=utc_now
+        ))
+        item = _list_item(note)
+        self.index.upsert(item)
+        self.feed.publish_added(item, self._audience(note.id, owner_uid))
+        return note
     
     def get_note(self, note_id: str) -> Optional[Note]:
-        with Session(engine) as session:
-            return session.get(Note, note_id)
-    
-    def get_all_notes(self) -> List[Note]:
-        with Session(engine) as session:
-            statement = select(Note.id, Note.title, Note.created_at, Note.updated_at)
-            results = session.exec(statement).all()
-            
-            return [
-                NoteListItem(
-                    id=row.id,
-                    title=row.title,
-                    created_at=row.created_at,
-                    updated_at=row.updated_at
-                )
-                for row in results
-            ]
+        return self.storage.get(note_id)
+    
+    def get_all_notes(self, offset: int = 0, limit: Optional[int] = None, owner_uid: Optional[str] = None) -> List[NoteListItem]:
+        """List a user's notes and those shared with them, most recently updated first.
+        
+        ``owner_uid=None`` lists the notes created without signing in.
+        """
+        self._ensure_index()
+        return self.index.list(offset=offset, limit=limit, owner_uid=owner_uid)
+    
+    def get_item(self, note_id: str) -> Optional[NoteListItem]:
+        """A note's list entry, including notes other processes created since the last refresh"""
+        return self._lookup(note_id)
+    
+    def can_access(self, note_id: str, uid: Optional[str]) -> bool:
+        self._lookup(note_id)
+        return self.index.can_access(note_id, uid)
+    
+    def is_owner(self, note_id: str, uid: Optional[str]) -> bool:
+        item = self._lookup(note_id)
+        return item is not None and item.owner_uid == uid
+    
+    def load_index(self) -> int:
+        """(Re)build the notes index from storage"""
+        self.index.load(self.storage.list_items(), self.storage.list_shares())
+        self._index_loaded_at = time.monotonic()
+        return len(self.index)
+    
+    def refresh_index(self) -> int:
+        """Reload the index and publish what other processes changed; returns the number of changed notes"""
+        before, shares_before = self.index.snapshot()
+        items = self.storage.list_items()
+        shares = self.storage.list_shares()
+        self.index.load(items, shares)
+        self._index_loaded_at = time.monotonic()
+        
+        after = {item.id: item for item in items}
+        shares_after: Dict[str, Set[str]] = {}
+        for note_id, uid in shares:
+            shares_after.setdefault(note_id, set()).add(uid)
+        
+        changed = 0
+        for note_id in before.keys() | after.keys():
+            old, new = before.get(note_id), after.get(note_id)
+            old_audience = {old.owner_uid} | shares_before.get(note_id, set()) if old else set()
+            new_audience = {new.owner_uid} | shares_after.get(note_id, set()) if new else set()
+            if old_audience - new_audience:
+                self.feed.publish_removed(note_id, old_audience - new_audience)
+            if new_audience - old_audience:
+                self.feed.publish_added(new, new_audience - old_audience)
+            if old and new and (old.title != new.title or _sort_key(old) != _sort_key(new)):
+                self.feed.publish_updated(new, old_audience & new_audience)
+            elif old_audience == new_audience:
+                continue
+            changed += 1
+        return changed
+    
+    def refresh_if_stale(self) -> bool:
+        """Refresh an index older than ``index_max_age``, unless another thread already is"""
+        if self.index_max_age is None or time.monotonic() - self._index_loaded_at < self.index_max_age:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            self.refresh_index()
+        finally:
+            self._refresh_lock.release()
+        return True
+    
+    def _ensure_index(self):
+        if not self.index.loaded:
+            self.load_index()
+        else:
+            self.refresh_if_stale()
+    
+    def _lookup(self, note_id: str) -> Optional[NoteListItem]:
+        """A note's index entry; with a shared database, misses are read from storage"""
+        self._ensure_index()
+        item = self.index.get(note_id)
+        if item is not None or self.index_max_age is None:
+            return item
+        
+        # Created by another process since the last refresh
+        note = self.storage.get(note_id)
+        if note is None:
+            return None
+        item = _list_item(note)
+        self.index.upsert(item)
+        for uid in self.storage.shares_of(note_id):
+            self.index.share(note_id, uid)
+        return item
+    
+    def check_index_consistency(self) -> dict:
+        return self.index.check_consistency(self.storage.list_items())
     
     def update_note(self, note_id: str, note_update: NoteUpdate) -> Optional[Note]:
-        with Session(engine) as session:
-            note = session.get(Note, note_id)
-            if not note:
-                return None
-            
-            update_data = note_update.model_dump(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(note, field, value)
-            
-            note.updated_at = datetime.now(timezone.utc)
-            session.add(note)
-            session.commit()
-            session.refresh(note)
-            return note
+        update_data = note_update.model_dump(exclude_unset=True)
+        update_data["updated_at"] = datetime.now(timezone.utc)
+        
+        note = self.storage.update(note_id, update_data)
+        if note:
+            item = _list_item(note)
+            self.index.upsert(item)
+            self.feed.publish_updated(item, self._audience(note_id, note.owner_uid))
+        return note
     
-    def delete_note(self, note_id: str) -> bool:
-        with Session(engine) as session:
-            note = session.get(Note, note_id)
-            if note:
-                session.delete(note)
-                session.commit()
-                return True
+    def list_shares(self, note_id: str) -> List[str]:
+        self._ensure_index()
+        return sorted(self.index.shared_with(note_id))
+    
+    def share_note(self, note_id: str, uid: str) -> bool:
+        """Give ``uid`` access to a note; sharing with the owner is a no-op"""
+        item = self._lookup(note_id)
+        if item is None:
+            return False
+        if uid == item.owner_uid:
+            return True
+        if not self.storage.add_share(note_id, uid):
+            return False
+        if uid not in self.index.shared_with(note_id):
+            self.index.share(note_id, uid)
+            self.feed.publish_added(item, {uid})
+        return True
+    
+    def unshare_note(self, note_id: str, uid: str) -> bool:
+        if not self.storage.remove_share(note_id, uid):
             return False
+        self.index.unshare(note_id, uid)
+        self.feed.publish_removed(note_id, {uid})
+        return True
+    
+    def iter_notes(self, batch_size: int = 500, owner_uid: Optional[str] = None,
+                   scoped: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream every note (or, when ``scoped``, those ``owner_uid`` can list) without loading the whole table"""
+        return self.storage.iter_rows(batch_size=batch_size, owner_uid=owner_uid, scoped=scoped)
+    
+    def import_notes(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert (or replace) a chunk of notes in one storage call"""
+        count = self.storage.bulk_upsert(rows)
+        
+        for row in rows:
+            item = NoteListItem(
+                id=row["id"],
+                title=row["title"],
+                owner_uid=row.get("owner_uid"),
+                created_at=row["created_at"],
+                updated_at=row["updated_at"]
+            )
+            previous = self.index.get(row["id"])
+            self.index.upsert(item)
+            audience = self._audience(item.id, item.owner_uid)
+            if previous and previous.owner_uid != item.owner_uid:
+                self.feed.publish_removed(item.id, {previous.owner_uid})
+                previous = None
+            if previous:
+                self.feed.publish_updated(item, audience)
+            else:
+                self.feed.publish_added(item, audience)
+        return count
+    
+    def delete_note(self, note_id: str) -> bool:
+        item = self.index.get(note_id)
+        audience = self._audience(note_id, item.owner_uid) if item else set()
+        if self.storage.delete(note_id):
+            self.index.remove(note_id)
+            self.feed.publish_removed(note_id, audience)
+            return True
+        return False
+    
+    def _audience(self, note_id: str, owner_uid: Optional[str]) -> Set[Optional[str]]:
+        """Users whose notes list includes this note"""
+        return {owner_uid} | self.index.shared_with(note_id)
+    
+    def close(self):
+        if self._storage is not None:
+            self._storage.close()
 
-note_service = NoteService()
\ No newline at end of file
+note_service = NoteService(storage_factory=create_storage_from_env, index_max_age=INDEX_MAX_AGE)
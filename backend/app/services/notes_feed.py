@@ -0,0 +1,160 @@
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import WebSocket
+import asyncio
+import json
+import logging
+import threading
+from ..models.note import NoteListItem
+
+logger = logging.getLogger(__name__)
+
+# A subscriber's scope: the signed-in user's uid, or None for anonymous clients
+Scope = Optional[str]
+
+
+class NotesFeed:
+    """Push compact notes-list diffs to subscribed websockets.
+
+    ``NoteService`` publishes every create, update and delete, often from a
+    threadpool worker, together with the users whose list shows the note.
+    Changes are merged per user and note until the event loop gets to them,
+    then sent as one ``notes_diff`` frame per user, encoded once for all of
+    that user's sockets. Each frame carries a sequence number; a client that
+    sees a gap resubscribes to get a fresh ``notes_index`` snapshot.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[WebSocket, Scope] = {}
+        self._listening: Counter = Counter()
+        # Diff sequence numbers run per user, so gaps mean a frame was missed
+        self.seq: Dict[Scope, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # (scope, note id) -> ("added" | "updated" | "removed", item)
+        self._pending: Dict[Tuple[Scope, str], Tuple[str, Optional[NoteListItem]]] = {}
+        self._flush_scheduled = False
+        self._send_lock: Optional[asyncio.Lock] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Deliver on ``loop``; until a loop is bound, changes are dropped"""
+        with self._lock:
+            self._loop = loop
+            self._pending.clear()
+            self._flush_scheduled = False
+            self._send_lock = None
+            self.subscribers.clear()
+            self._listening.clear()
+            self.seq.clear()
+
+    def unbind(self):
+        with self._lock:
+            self._loop = None
+            self._pending.clear()
+            self.subscribers.clear()
+            self._listening.clear()
+
+    def publish_added(self, item: NoteListItem, audience: Iterable[Scope] = (None,)):
+        self._publish(item.id, "added", item, audience)
+
+    def publish_updated(self, item: NoteListItem, audience: Iterable[Scope] = (None,)):
+        self._publish(item.id, "updated", item, audience)
+
+    def publish_removed(self, note_id: str, audience: Iterable[Scope] = (None,)):
+        self._publish(note_id, "removed", None, audience)
+
+    def _publish(self, note_id: str, op: str, item: Optional[NoteListItem], audience: Iterable[Scope]):
+        with self._lock:
+            if self._loop is None:
+                return
+            queued = False
+            for scope in audience:
+                if not self._listening[scope]:
+                    continue
+                self._merge((scope, note_id), op, item)
+                queued = True
+
+            if not queued or self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+            loop = self._loop
+        try:
+            loop.call_soon_threadsafe(self._schedule_flush)
+        except RuntimeError:
+            # The loop closed under us (shutdown); nobody is listening anymore
+            with self._lock:
+                self._flush_scheduled = False
+
+    def _merge(self, key: Tuple[Scope, str], op: str, item: Optional[NoteListItem]):
+        """Fold a change into what is pending for one user; caller holds the lock"""
+        previous = self._pending.get(key)
+        if previous and previous[0] == "added":
+            # The user never saw this note, so it is still an addition (or nothing)
+            if op == "removed":
+                del self._pending[key]
+            else:
+                self._pending[key] = ("added", item)
+        else:
+            self._pending[key] = (op, item)
+
+    def _schedule_flush(self):
+        asyncio.ensure_future(self.flush())
+
+    def _take_diffs(self) -> Dict[Scope, dict]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+
+        diffs: Dict[Scope, dict] = {}
+        for (scope, note_id), (op, item) in pending.items():
+            diff = diffs.get(scope)
+            if diff is None:
+                self.seq[scope] = self.seq.get(scope, 0) + 1
+                diff = diffs[scope] = {"type": "notes_diff", "seq": self.seq[scope], "added": [], "updated": [], "removed": []}
+            diff[op].append(note_id if op == "removed" else item.model_dump(mode="json"))
+        return diffs
+
+    async def flush(self):
+        """Send the merged pending changes as one frame per user"""
+        if self._send_lock is None:
+            self._send_lock = asyncio.Lock()
+        # Keep frames in sequence order for every subscriber
+        async with self._send_lock:
+            diffs = self._take_diffs()
+            if not diffs:
+                return
+            frames = {scope: json.dumps(diff) for scope, diff in diffs.items()}
+            for websocket, scope in list(self.subscribers.items()):
+                frame = frames.get(scope)
+                if frame is None:
+                    continue
+                try:
+                    await websocket.send_text(frame)
+                except Exception as e:
+                    logger.warning(f"Dropping notes feed subscriber: {e}")
+                    self.unsubscribe(websocket)
+
+    async def subscribe(self, websocket: WebSocket, list_items: Callable[[], List[NoteListItem]], scope: Scope = None):
+        """Send the current list, then stream diffs from that point on"""
+        if self._send_lock is None:
+            self._send_lock = asyncio.Lock()
+        async with self._send_lock:
+            # Register before reading the list so no change falls in between;
+            # a diff repeating what the snapshot already shows is harmless
+            self.unsubscribe(websocket)
+            with self._lock:
+                self.subscribers[websocket] = scope
+                self._listening[scope] += 1
+            await websocket.send_text(json.dumps({
+                "type": "notes_index",
+                "seq": self.seq.get(scope, 0),
+                "notes": [item.model_dump(mode="json") for item in list_items()],
+            }))
+
+    def unsubscribe(self, websocket: WebSocket):
+        with self._lock:
+            if websocket in self.subscribers:
+                self._listening[self.subscribers.pop(websocket)] -= 1
+
+
+notes_feed = NotesFeed()
@@ -0,0 +1,156 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import threading
+from ..models.note import NoteListItem
+
+
+def _sort_key(item: NoteListItem) -> Tuple[datetime, str]:
+    updated_at = item.updated_at
+    # SQLite hands back naive UTC datetimes while fresh writes are aware
+    if updated_at.tzinfo is not None:
+        updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return (updated_at, item.id)
+
+
+class NotesIndex:
+    """In-memory list metadata for every note, ordered by ``updated_at``.
+
+    Loaded once from the database and kept current by ``NoteService`` on each
+    create, update and delete, so listing notes needs no database round-trip.
+    The order is partitioned by owner (``None`` holds notes created without
+    signing in), and share grants are kept alongside, so listing and access
+    checks cost the same however many other users there are.
+    Until it is loaded, mutations are ignored and the next load picks them up.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, NoteListItem] = {}
+        self._keys: Dict[str, Tuple[datetime, str]] = {}
+        # Per owner, ascending (updated_at, id); listing walks it from the end
+        self._order: Dict[Optional[str], List[Tuple[datetime, str]]] = {}
+        self._shared_with: Dict[str, Set[str]] = {}
+        self._shared_to: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, note_id: str) -> bool:
+        return note_id in self._items
+
+    def load(self, items: Iterable[NoteListItem], shares: Iterable[Tuple[str, str]] = ()):
+        with self._lock:
+            self._items = {item.id: item for item in items}
+            self._keys = {note_id: _sort_key(item) for note_id, item in self._items.items()}
+            self._order = {}
+            for note_id, key in self._keys.items():
+                self._order.setdefault(self._items[note_id].owner_uid, []).append(key)
+            for keys in self._order.values():
+                keys.sort()
+            self._shared_with = {}
+            self._shared_to = {}
+            for note_id, uid in shares:
+                self._add_share(note_id, uid)
+            self.loaded = True
+
+    def upsert(self, item: NoteListItem):
+        with self._lock:
+            if not self.loaded:
+                return
+            self._discard(item.id)
+            key = _sort_key(item)
+            self._items[item.id] = item
+            self._keys[item.id] = key
+            insort(self._order.setdefault(item.owner_uid, []), key)
+
+    def remove(self, note_id: str):
+        with self._lock:
+            if self.loaded:
+                self._discard(note_id)
+                for uid in self._shared_with.pop(note_id, ()):
+                    self._shared_to[uid].discard(note_id)
+
+    def share(self, note_id: str, uid: str):
+        with self._lock:
+            if self.loaded:
+                self._add_share(note_id, uid)
+
+    def unshare(self, note_id: str, uid: str):
+        with self._lock:
+            if self.loaded:
+                self._shared_with.get(note_id, set()).discard(uid)
+                self._shared_to.get(uid, set()).discard(note_id)
+
+    def snapshot(self) -> Tuple[Dict[str, NoteListItem], Dict[str, Set[str]]]:
+        """Copies of every item and share grant, taken under the lock"""
+        with self._lock:
+            return dict(self._items), {note_id: set(uids) for note_id, uids in self._shared_with.items()}
+
+    def get(self, note_id: str) -> Optional[NoteListItem]:
+        return self._items.get(note_id)
+
+    def shared_with(self, note_id: str) -> Set[str]:
+        return set(self._shared_with.get(note_id, ()))
+
+    def can_access(self, note_id: str, uid: Optional[str]) -> bool:
+        """Notes without an owner are open to everyone; others to the owner and sharees"""
+        item = self._items.get(note_id)
+        if item is None:
+            return False
+        return item.owner_uid is None or item.owner_uid == uid or uid in self._shared_with.get(note_id, ())
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, owner_uid: Optional[str] = None) -> List[NoteListItem]:
+        """An owner's notes plus those shared with them, most recently updated first"""
+        with self._lock:
+            own = self._order.get(owner_uid, [])
+            shared = self._shared_to.get(owner_uid) if owner_uid is not None else None
+            if not shared:
+                end = len(own) - offset
+                start = 0 if limit is None else max(0, end - limit)
+                if end <= 0:
+                    return []
+                return [self._items[note_id] for _, note_id in reversed(own[start:end])]
+
+            shared_keys = sorted((self._keys[note_id] for note_id in shared if note_id in self._keys), reverse=True)
+            newest_first = merge(reversed(own), shared_keys, reverse=True)
+            stop = None if limit is None else offset + limit
+            return [self._items[note_id] for _, note_id in islice(newest_first, offset, stop)]
+
+    def check_consistency(self, items: Iterable[NoteListItem]) -> dict:
+        """Compare the index against authoritative rows from the database"""
+        with self._lock:
+            expected = {item.id: item for item in items}
+            missing = sorted(note_id for note_id in expected if note_id not in self._items)
+            extra = sorted(note_id for note_id in self._items if note_id not in expected)
+            stale = sorted(
+                note_id for note_id, item in expected.items()
+                if note_id in self._items and (
+                    self._items[note_id].title != item.title
+                    or self._items[note_id].owner_uid != item.owner_uid
+                    or _sort_key(self._items[note_id]) != _sort_key(item)
+                )
+            )
+            return {
+                "consistent": not (missing or extra or stale),
+                "indexed": len(self._items),
+                "database": len(expected),
+                "missing": missing,
+                "extra": extra,
+                "stale": stale,
+            }
+
+    def _add_share(self, note_id: str, uid: str):
+        self._shared_with.setdefault(note_id, set()).add(uid)
+        self._shared_to.setdefault(uid, set()).add(note_id)
+
+    def _discard(self, note_id: str):
+        key = self._keys.pop(note_id, None)
+        if key is None:
+            return
+        item = self._items.pop(note_id)
+        order = self._order[item.owner_uid]
+        del order[bisect_left(order, key)]
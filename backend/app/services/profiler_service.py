@@ -0,0 +1,124 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profiling session is already running"""
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class ProfilerService:
+    """On-demand sampling profiler for the running server.
+
+    While a session runs, a background thread snapshots every thread's stack
+    at a fixed interval and folds them into collapsed stacks (the input format
+    of flamegraph.pl and speedscope). A coroutine measures event-loop lag, and
+    ``WebSocketService.handle_message`` reports per-message-type handling
+    times. Outside a session the only cost is the ``enabled`` check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = asyncio.Lock()
+        self._message_times: Dict[str, List[float]] = defaultdict(list)
+
+    def record_message(self, message_type: Optional[str], seconds: float):
+        self._message_times[message_type or "unknown"].append(seconds)
+
+    async def profile(self, seconds: float, interval: float = 0.005, lag_interval: float = 0.05) -> dict:
+        if self._lock.locked():
+            raise ProfilerBusyError("A profiling session is already running")
+
+        async with self._lock:
+            self._message_times = defaultdict(list)
+            stacks: Counter = Counter()
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample, args=(stacks, interval, stop),
+                name="profiler-sampler", daemon=True
+            )
+
+            self.enabled = True
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                lag_samples = await self._measure_loop_lag(seconds, lag_interval)
+            finally:
+                stop.set()
+                self.enabled = False
+                await asyncio.to_thread(sampler.join)
+            duration = time.perf_counter() - started
+
+            logger.info(f"Profiled for {duration:.2f}s: {sum(stacks.values())} stack samples")
+            return {
+                "duration_s": round(duration, 3),
+                "interval_ms": interval * 1000,
+                "samples": sum(stacks.values()),
+                "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+                "loop_lag_ms": {
+                    "samples": [round(lag * 1000, 3) for lag in lag_samples],
+                    "p50": round(_percentile(lag_samples, 0.5) * 1000, 3),
+                    "p99": round(_percentile(lag_samples, 0.99) * 1000, 3),
+                    "max": round(max(lag_samples, default=0.0) * 1000, 3),
+                },
+                "message_handling": {
+                    message_type: {
+                        "count": len(times),
+                        "mean_ms": round(sum(times) / len(times) * 1000, 3),
+                        "p99_ms": round(_percentile(times, 0.99) * 1000, 3),
+                        "max_ms": round(max(times) * 1000, 3),
+                    }
+                    for message_type, times in self._message_times.items()
+                },
+            }
+
+    @staticmethod
+    def _sample(stacks: Counter, interval: float, stop: threading.Event):
+        own_id = threading.get_ident()
+        names = {}
+        while not stop.wait(interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(labels))] += 1
+
+    @staticmethod
+    async def _measure_loop_lag(seconds: float, interval: float) -> List[float]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + seconds
+        samples = []
+        while loop.time() < deadline:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            samples.append(max(0.0, loop.time() - expected))
+        return samples
+
+
+profiler = ProfilerService()
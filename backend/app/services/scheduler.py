@@ -0,0 +1,184 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set
+import asyncio
+import inspect
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Timer:
+    __slots__ = ("key", "deadline_tick", "callback", "slot")
+
+    def __init__(self, key: Hashable, deadline_tick: int, callback: Callable[[], Any], slot: int):
+        self.key = key
+        self.deadline_tick = deadline_tick
+        self.callback = callback
+        self.slot = slot
+
+
+class TimerWheel:
+    """Hashed timer wheel shared by debounce deadlines, presence flushes and heartbeats.
+
+    Timers are identified by a key, so rescheduling (e.g. on every keystroke)
+    is an O(1) move between slot dicts instead of cancelling and creating an
+    ``asyncio.Task``. A single loop ``TimerHandle`` drives the wheel while
+    timers are pending; coroutine callbacks get a task only when they fire.
+    """
+
+    def __init__(self, tick: float = 0.01, slots: int = 512):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: List[Dict[Hashable, _Timer]] = [{} for _ in range(slots)]
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._origin = 0.0
+        self._current_tick = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self._stats = {
+            "scheduled": 0,
+            "rescheduled": 0,
+            "cancelled": 0,
+            "fired": 0,
+            "schedule_ns_total": 0,
+            "tick_ns_total": 0,
+            "ticks": 0,
+            "max_fire_lag_ms": 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[[], Any]) -> None:
+        """Run ``callback`` after ``delay`` seconds, replacing any timer with the same key"""
+        started = time.perf_counter_ns()
+        self._bind_loop()
+
+        timer = self._timers.get(key)
+        if timer:
+            del self._wheel[timer.slot][key]
+            self._stats["rescheduled"] += 1
+        else:
+            self._stats["scheduled"] += 1
+
+        now_tick = self._tick_at(self._loop.time())
+        deadline_tick = max(now_tick, self._current_tick) + max(1, math.ceil(delay / self.tick))
+        slot = deadline_tick % self.slots
+        timer = _Timer(key, deadline_tick, callback, slot)
+        self._wheel[slot][key] = timer
+        self._timers[key] = timer
+
+        if self._handle is None:
+            # Waking up from idle: skip the ticks nobody was waiting on
+            self._current_tick = max(self._current_tick, now_tick)
+            self._arm()
+        self._stats["schedule_ns_total"] += time.perf_counter_ns() - started
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if not timer:
+            return False
+        del self._wheel[timer.slot][key]
+        self._stats["cancelled"] += 1
+        return True
+
+    def cancel_all(self) -> int:
+        cancelled = len(self._timers)
+        for slot in self._wheel:
+            slot.clear()
+        self._timers.clear()
+        self._stats["cancelled"] += cancelled
+        return cancelled
+
+    async def drain(self):
+        """Wait for coroutine callbacks that have already fired"""
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        operations = self._stats["scheduled"] + self._stats["rescheduled"]
+        ticks = self._stats["ticks"]
+        return {
+            **self._stats,
+            "pending": len(self._timers),
+            "in_flight": len(self._running),
+            "avg_schedule_us": round(self._stats["schedule_ns_total"] / operations / 1000, 3) if operations else 0.0,
+            "avg_tick_us": round(self._stats["tick_ns_total"] / ticks / 1000, 3) if ticks else 0.0,
+        }
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        # A new event loop (e.g. after a restart or between tests) invalidates old timers
+        if self._timers:
+            logger.warning(f"Discarding {len(self._timers)} timers bound to a previous event loop")
+        for slot in self._wheel:
+            slot.clear()
+        self._timers.clear()
+        self._running.clear()
+        self._loop = loop
+        self._origin = loop.time()
+        self._current_tick = 0
+        self._handle = None
+
+    def _tick_at(self, when: float) -> int:
+        return int((when - self._origin) / self.tick)
+
+    def _arm(self):
+        next_tick_at = self._origin + (self._current_tick + 1) * self.tick
+        self._handle = self._loop.call_at(next_tick_at, self._advance)
+
+    def _advance(self):
+        started = time.perf_counter_ns()
+        self._handle = None
+        now = self._loop.time()
+        target_tick = self._tick_at(now)
+
+        # Visit every slot passed since the last tick; one full turn covers them all
+        first_tick = self._current_tick + 1
+        last_tick = max(target_tick, first_tick)
+        if last_tick - first_tick >= self.slots:
+            first_tick = last_tick - self.slots + 1
+
+        due: List[_Timer] = []
+        for tick in range(first_tick, last_tick + 1):
+            slot = self._wheel[tick % self.slots]
+            for timer in list(slot.values()):
+                if timer.deadline_tick <= last_tick:
+                    del slot[timer.key]
+                    del self._timers[timer.key]
+                    due.append(timer)
+        self._current_tick = last_tick
+
+        for timer in due:
+            lag_ms = (now - (self._origin + timer.deadline_tick * self.tick)) * 1000
+            self._stats["max_fire_lag_ms"] = round(max(self._stats["max_fire_lag_ms"], lag_ms), 3)
+            self._fire(timer)
+
+        self._stats["ticks"] += 1
+        self._stats["tick_ns_total"] += time.perf_counter_ns() - started
+
+        if self._timers and self._handle is None:
+            self._arm()
+
+    def _fire(self, timer: _Timer):
+        self._stats["fired"] += 1
+        try:
+            result = timer.callback()
+        except Exception as e:
+            logger.error(f"Timer {timer.key!r} callback failed: {e}", exc_info=True)
+            return
+
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+
+scheduler = TimerWheel()
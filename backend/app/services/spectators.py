@@ -0,0 +1,156 @@
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import secrets
+from .scheduler import TimerWheel, scheduler
+
+# Per-keystroke chatter that read-only viewers have no use for
+SKIPPED_EVENTS = {"cursor_position", "typing_indicator"}
+
+BUFFER_SIZE = int(os.getenv("SSE_BUFFER_EVENTS", 512))
+HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+
+
+class _Channel:
+    __slots__ = ("epoch", "events", "next_id", "wakeup", "spectators", "snapshot")
+
+    def __init__(self, buffer_size: int):
+        # Event ids are only meaningful within one channel's lifetime
+        self.epoch = secrets.token_hex(4)
+        self.events: Deque[Tuple[int, bytes]] = deque(maxlen=buffer_size)
+        self.next_id = 1
+        self.wakeup = asyncio.Event()
+        self.spectators = 0
+        # (event id it reflects, encoded frame), shared by spectators joining together
+        self.snapshot: Optional[Tuple[int, bytes]] = None
+
+    def wake(self):
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+    @property
+    def first_buffered(self) -> int:
+        return self.events[0][0] if self.events else self.next_id
+
+
+class SpectatorHub:
+    """Read-only Server-Sent Events feeds of note rooms.
+
+    ``ConnectionManager.broadcast_to_room`` hands every room message to the
+    hub, which encodes it once as an SSE frame into the room's ring buffer.
+    Spectators share those bytes: each one is only a cursor into the buffer
+    and a wait on the room's wakeup event, with no receive loop and no
+    per-viewer encoding. Event ids let a reconnecting ``EventSource`` resume
+    from ``Last-Event-ID``; a spectator that falls out of the buffer, or
+    cannot be resumed, gets a fresh snapshot instead.
+    """
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE, heartbeat: float = HEARTBEAT_SECONDS,
+                 timer_wheel: Optional[TimerWheel] = None):
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.scheduler = timer_wheel if timer_wheel is not None else scheduler
+        self._channels: Dict[str, _Channel] = {}
+        self._stats = {"events_published": 0, "snapshots_encoded": 0, "resumed": 0, "resyncs": 0}
+
+    def watching(self, note_id: str) -> bool:
+        return note_id in self._channels
+
+    def publish(self, note_id: str, message: dict, encoded: Optional[str] = None):
+        """Append a room message to the note's buffer and wake its spectators"""
+        channel = self._channels.get(note_id)
+        if channel is None or message.get("type") in SKIPPED_EVENTS:
+            return
+        event_id = channel.next_id
+        channel.next_id += 1
+        channel.events.append((event_id, self._frame(channel, event_id, message.get("type"), encoded or json.dumps(message))))
+        channel.wake()
+        self._stats["events_published"] += 1
+
+    async def stream(self, note_id: str, snapshot: Callable[[], Awaitable[dict]],
+                     last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE bytes for one spectator until they disconnect"""
+        channel = self._channels.get(note_id)
+        if channel is None:
+            channel = self._channels[note_id] = _Channel(self.buffer_size)
+            self._schedule_heartbeat(note_id, channel)
+        channel.spectators += 1
+        try:
+            yield b"retry: 2000\n\n"
+            cursor = self._resume_point(channel, last_event_id)
+            if cursor is None:
+                cursor, frame = await self._snapshot(channel, snapshot)
+                yield frame
+            else:
+                self._stats["resumed"] += 1
+
+            while True:
+                if cursor + 1 < channel.first_buffered:
+                    # Too slow for the buffer: start over from the current state
+                    self._stats["resyncs"] += 1
+                    cursor, frame = await self._snapshot(channel, snapshot)
+                    yield frame
+                elif cursor + 1 < channel.next_id:
+                    start = cursor + 1 - channel.first_buffered
+                    pending = list(islice(channel.events, start, None))
+                    cursor = pending[-1][0]
+                    yield b"".join(frame for _, frame in pending)
+                else:
+                    await channel.wakeup.wait()
+                    if cursor + 1 == channel.next_id:
+                        # Woken by the heartbeat; keeps proxies from closing an idle stream
+                        yield b": keepalive\n\n"
+        finally:
+            channel.spectators -= 1
+            if not channel.spectators and self._channels.get(note_id) is channel:
+                del self._channels[note_id]
+                self.scheduler.cancel(self._heartbeat_timer_key(note_id))
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._channels),
+            "spectators": sum(channel.spectators for channel in self._channels.values()),
+            **self._stats,
+        }
+
+    @staticmethod
+    def _heartbeat_timer_key(note_id: str) -> tuple:
+        return ("sse-heartbeat", note_id)
+
+    def _schedule_heartbeat(self, note_id: str, channel: _Channel):
+        # One timer per room rather than a timeout per spectator
+        def beat():
+            channel.wake()
+            self._schedule_heartbeat(note_id, channel)
+        self.scheduler.schedule(self._heartbeat_timer_key(note_id), self.heartbeat, beat)
+
+    @staticmethod
+    def _frame(channel: _Channel, event_id: int, event: Optional[str], data: str) -> bytes:
+        return f"id: {channel.epoch}-{event_id}\nevent: {event or 'message'}\ndata: {data}\n\n".encode()
+
+    def _resume_point(self, channel: _Channel, last_event_id: Optional[str]) -> Optional[int]:
+        """The last event a reconnecting spectator saw, if the buffer still follows it"""
+        if not last_event_id or "-" not in last_event_id:
+            return None
+        epoch, _, event_id = last_event_id.partition("-")
+        if epoch != channel.epoch or not event_id.isdigit():
+            return None
+        cursor = int(event_id)
+        if cursor + 1 < channel.first_buffered or cursor >= channel.next_id:
+            return None
+        return cursor
+
+    async def _snapshot(self, channel: _Channel, snapshot: Callable[[], Awaitable[dict]]) -> Tuple[int, bytes]:
+        cursor = channel.next_id - 1
+        if channel.snapshot is None or channel.snapshot[0] != cursor:
+            message = await snapshot()
+            # Events arriving meanwhile are sent again after it, which is harmless
+            channel.snapshot = (cursor, self._frame(channel, cursor, "snapshot", json.dumps(message)))
+            self._stats["snapshots_encoded"] += 1
+        return channel.snapshot
+
+
+spectators = SpectatorHub()
@@ -0,0 +1,118 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+from fastapi import WebSocket
+import hashlib
+import json
+import logging
+import os
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+# Message fields that may carry user text and are masked when redacting
+REDACTED_FIELDS = ("content", "title")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+
+def _pseudonym(prefix: str, value: str) -> str:
+    return prefix + hashlib.sha256(value.encode()).hexdigest()[:10]
+
+
+class TrafficRecorder:
+    """Opt-in trace of inbound websocket traffic for replaying real workloads.
+
+    Every join, leave and inbound message becomes one compact NDJSON line with
+    a wall-clock timestamp, a connection number and the room it belongs to.
+    Lines are handed to a background thread that writes a size-rotated file,
+    so recording costs the event loop one ``json.dumps`` and a queue put.
+    With ``redact`` on, text fields keep only their length and user names and
+    note ids are replaced by stable pseudonyms.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024,
+                 backups: int = 5, redact: bool = True):
+        self.path = path
+        self.redact = redact
+        self.enabled = path is not None
+        self.recorded = 0
+        self._connections: Dict[WebSocket, int] = {}
+        self._next_connection = 1
+        self._listener: Optional[QueueListener] = None
+
+        if self.enabled:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            self._listener = QueueListener(records, handler)
+            self._listener.start()
+
+            # A standalone logger, so trace lines never reach the app's log handlers
+            self._trace = logging.Logger(f"{__name__}.trace", logging.INFO)
+            self._trace.addHandler(QueueHandler(records))
+            logger.info(f"Recording websocket traffic to {path} (redact={redact})")
+
+    @classmethod
+    def from_env(cls) -> "TrafficRecorder":
+        return cls(
+            path=os.getenv("WS_RECORD_PATH") or None,
+            max_bytes=int(os.getenv("WS_RECORD_MAX_BYTES", 64 * 1024 * 1024)),
+            backups=int(os.getenv("WS_RECORD_BACKUPS", 5)),
+            redact=_env_flag("WS_RECORD_REDACT", True),
+        )
+
+    def record_join(self, websocket: WebSocket, note_id: str, user_name: str):
+        if not self.enabled:
+            return
+        connection = self._connections.get(websocket)
+        if connection is None:
+            connection = self._connections[websocket] = self._next_connection
+            self._next_connection += 1
+        self._write(connection, note_id, "join", user=self._user(user_name))
+
+    def record_message(self, websocket: WebSocket, note_id: str, message_data: dict):
+        if not self.enabled:
+            return
+        connection = self._connections.get(websocket)
+        if connection is None:
+            return
+        message = {key: value for key, value in message_data.items() if key not in ("user_name", "note_id", "timestamp")}
+        if self.redact:
+            for field in REDACTED_FIELDS:
+                if isinstance(message.get(field), str):
+                    message[field] = len(message[field])
+        self._write(connection, note_id, "message", message=message)
+
+    def record_leave(self, websocket: WebSocket, note_id: str):
+        if not self.enabled:
+            return
+        connection = self._connections.get(websocket)
+        if connection is not None:
+            self._write(connection, note_id, "leave")
+
+    def forget(self, websocket: WebSocket):
+        """Drop the connection number of a closed socket"""
+        self._connections.pop(websocket, None)
+
+    def close(self):
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+            self.enabled = False
+
+    def _user(self, user_name: str) -> str:
+        return _pseudonym("user-", user_name) if self.redact else user_name
+
+    def _write(self, connection: int, note_id: str, event: str, **fields):
+        room = _pseudonym("note-", note_id) if self.redact else note_id
+        entry = {"t": round(time.time(), 3), "conn": connection, "room": room, "event": event, **fields}
+        self._trace.info(json.dumps(entry, separators=(",", ":")))
+        self.recorded += 1
+
+
+recorder = TrafficRecorder.from_env()
@@ -1,138 +1,320 @@
-from datetime import datetime, timezone
 import json
 from ..websocket_manager import manager
 from ..services.note_service import note_service
+from ..services.debounce import DebouncePolicy
+from ..services.scheduler import TimerWheel, scheduler
+from ..services.profiler_service import profiler
+from ..services.traffic_recorder import recorder
+from ..services.spectators import spectators
+from ..services.clock import utc_timestamp
+from ..models.messages import ClientMessage, ContentChange, CursorPosition, TypingIndicator, parse_message
+from ..models.note import NoteUpdate
 from fastapi import WebSocket
 import asyncio
-from typing import Dict
+import time
+from typing import Dict, Iterable, List, Optional, Union
 import logging
 
 logger = logging.getLogger(__name__)
 
 class WebSocketService:
-    def __init__(self):
+    def __init__(self, debounce_policy: Optional[DebouncePolicy] = None, timer_wheel: Optional[TimerWheel] = None):
+        self.debounce_policy = debounce_policy or DebouncePolicy.from_env()
+        self.scheduler = timer_wheel if timer_wheel is not None else scheduler
         self._pending_updates: Dict[str, dict] = {}
-        self._update_tasks: Dict[str, asyncio.Task] = {}
+        # Live state of active rooms: latest content and its revision
+        self._room_state: Dict[str, dict] = {}
     
-    async def handle_message(self, websocket: WebSocket, note_id: str, user_name: str, message_data: dict):
-        """Handle incoming WebSocket messages based on type"""
+    @property
+    def pending_saves(self) -> int:
+        """Notes with edits waiting for their debounced save"""
+        return len(self._pending_updates)
+    
+    async def handle_message(self, websocket: WebSocket, note_id: str, user_name: str,
+                             message_data: Union[ClientMessage, dict]):
+        """Handle an incoming WebSocket message based on its type"""
+        message = message_data if isinstance(message_data, ClientMessage) else parse_message(message_data)
         
-        # Add metadata
-        message_data.update({
-            "user_name": user_name,
-            "note_id": note_id,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
+        # Opt-in trace for replaying real edit bursts (WS_RECORD_PATH)
+        if recorder.enabled:
+            recorder.record_message(websocket, note_id, message.model_dump(exclude={"note_id"}))
         
-        message_type = message_data.get("type")
-        logger.info(f"Handling message type: {message_type} from {user_name}")
+        timestamp = utc_timestamp()
+        logger.info(f"Handling message type: {message.type} from {user_name}")
         
+        # Timing is only collected while an admin profiling session is running
+        if profiler.enabled:
+            started = time.perf_counter()
+            try:
+                await self._dispatch(websocket, note_id, user_name, message, timestamp)
+            finally:
+                profiler.record_message(message.type, time.perf_counter() - started)
+        else:
+            await self._dispatch(websocket, note_id, user_name, message, timestamp)
+    
+    # Message struct -> handler method name, looked up on the instance so tests can patch handlers
+    _HANDLERS = {
+        ContentChange: "_handle_content_change",
+        CursorPosition: "_handle_cursor_position",
+        TypingIndicator: "_handle_typing_indicator",
+    }
+    
+    async def _dispatch(self, websocket: WebSocket, note_id: str, user_name: str, message: ClientMessage, timestamp: str):
+        handler = self._HANDLERS.get(type(message))
         try:
-            if message_type == "content_change":
-                await self._handle_content_change(websocket, note_id, user_name, message_data)
-            elif message_type == "cursor_position":
-                await self._handle_cursor_position(websocket, note_id, user_name, message_data)
-            elif message_type == "typing_indicator":
-                await self._handle_typing_indicator(websocket, note_id, user_name, message_data)
+            if handler is None:
+                logger.warning(f"Unknown message type: {message.type}")
+                await self._handle_unknown_message(websocket, note_id, user_name, message)
             else:
-                logger.warning(f"Unknown message type: {message_type}")
-                await self._handle_unknown_message(websocket, note_id, user_name, message_data)
+                await getattr(self, handler)(websocket, note_id, user_name, message, timestamp)
         except Exception as e:
             logger.error(f"Error handling message: {e}", exc_info=True)
             raise
     
-    async def _handle_content_change(self, websocket: WebSocket, note_id: str, user_name: str, message_data: dict):
+    async def _handle_content_change(self, websocket: WebSocket, note_id: str, user_name: str,
+                                     message: ContentChange, timestamp: str):
         """Handle content change messages with debouncing"""
-        content = message_data.get("content", "")
+        content = message.content
         logger.info(f"Content change from {user_name}: {len(content)} characters")
         
-        # Store the latest update for debouncing
+        now = asyncio.get_running_loop().time()
+        previous = self._pending_updates.get(note_id)
+        
+        # Store the latest update for debouncing, remembering when the burst started
         self._pending_updates[note_id] = {
             "content": content,
             "user_name": user_name,
-            "timestamp": message_data["timestamp"],
-            "websocket": websocket
+            "timestamp": timestamp,
+            "websocket": websocket,
+            "first_pending_at": previous["first_pending_at"] if previous else now,
+            "edits": previous["edits"] + 1 if previous else 1
         }
+        pending = self._pending_updates[note_id]
+        # The edit itself is the authoritative content, so a cold room needs no DB read
+        room = self._room_state.setdefault(note_id, {"content": content, "title": None, "revision": 0})
+        room["content"] = content
+        room["revision"] += 1
         
-        # Cancel existing task
-        if note_id in self._update_tasks:
-            self._update_tasks[note_id].cancel()
+        delay = self.debounce_policy.next_delay(
+            now, pending["first_pending_at"], pending["edits"], len(content)
+        )
         
-        # Create new debounced task
-        self._update_tasks[note_id] = asyncio.create_task(
-            self._send_debounced_update(note_id)
+        # Move the note's save deadline on the shared timer wheel
+        self.scheduler.schedule(
+            self._save_timer_key(note_id), delay,
+            lambda: self._persist_pending_update(note_id)
         )
         
         # Immediately broadcast to other users (don't wait for debounce)
         await manager.broadcast_to_room(note_id, {
             "type": "content_change",
+            "note_id": note_id,
             "content": content,
+            "revision": room["revision"],
             "user_name": user_name,
-            "timestamp": message_data["timestamp"]
+            "timestamp": timestamp
         }, exclude_websocket=websocket)
     
-    async def _send_debounced_update(self, note_id: str):
-        """Send update to database after debounce delay"""
-        await asyncio.sleep(0.3)  # 300ms debounce
+    def _get_room_state(self, note_id: str) -> dict:
+        """Return live room state, loading it from the database when the room is cold"""
+        room = self._room_state.get(note_id)
+        if room is None:
+            note = note_service.get_note(note_id)
+            room = {
+                "content": note.content if note else None,
+                "title": note.title if note else None,
+                "revision": 0
+            }
+            self._room_state[note_id] = room
+        return room
+    
+    def snapshot(self, note_id: str) -> dict:
+        """The room's authoritative content and presence roster"""
+        room = self._get_room_state(note_id)
+        metadata = note_service.index.get(note_id)
+        snapshot = {
+            "type": "snapshot",
+            "note_id": note_id,
+            "title": metadata.title if metadata else room["title"],
+            "content": room["content"],
+            "revision": room["revision"],
+            "saved": note_id not in self._pending_updates,
+            "users": manager.get_room_users(note_id),
+            "timestamp": utc_timestamp()
+        }
+        # Spectators alone do not keep a room's state cached
+        self._release_room(note_id)
+        return snapshot
+    
+    async def send_snapshot(self, websocket: WebSocket, note_id: str):
+        """Send a joining client the room's authoritative content and presence roster"""
+        await websocket.send_text(json.dumps(self.snapshot(note_id)))
+    
+    async def handle_join(self, websocket: WebSocket, note_id: str, user_name: str):
+        """Snapshot the room for the new client and announce them to everyone else"""
+        await self.send_snapshot(websocket, note_id)
+        await manager.broadcast_to_room(note_id, {
+            "type": "user_joined",
+            "note_id": note_id,
+            "user_name": user_name,
+            "timestamp": utc_timestamp()
+        }, exclude_websocket=websocket)
+    
+    async def handle_leave(self, note_id: str, user_name: str):
+        """Announce a departure and drop room state once the room is empty and saved"""
+        await manager.broadcast_to_room(note_id, {
+            "type": "user_left",
+            "note_id": note_id,
+            "user_name": user_name,
+            "timestamp": utc_timestamp()
+        })
+        self._release_room(note_id)
+    
+    async def subscribe(self, websocket: WebSocket, note_id: str, user_name: str) -> bool:
+        """Add a multiplexed connection to another note room"""
+        if not manager.join(websocket, note_id):
+            return False
+        recorder.record_join(websocket, note_id, user_name)
+        await self.handle_join(websocket, note_id, user_name)
+        return True
+    
+    async def unsubscribe(self, websocket: WebSocket, note_id: str, user_name: str) -> bool:
+        """Take a multiplexed connection out of one note room"""
+        if not manager.leave(websocket, note_id):
+            return False
+        recorder.record_leave(websocket, note_id)
+        await self.handle_leave(note_id, user_name)
+        return True
+    
+    async def handle_disconnect(self, websocket: WebSocket, user_name: str):
+        """Leave every room a closed connection was subscribed to"""
+        rooms = manager.get_rooms(websocket)
+        manager.disconnect(websocket)
+        for note_id in rooms:
+            recorder.record_leave(websocket, note_id)
+            await self.handle_leave(note_id, user_name)
+        recorder.forget(websocket)
+    
+    async def handle_external_update(self, note, fields: set):
+        """Bring an open room up to date with a write that bypassed the websocket (REST)"""
+        if not manager.has_room(note.id) and note.id not in self._room_state and not spectators.watching(note.id):
+            return
         
-        if note_id in self._pending_updates:
-            update = self._pending_updates[note_id]
+        room = self._get_room_state(note.id)
+        message = {
+            "type": "note_updated",
+            "note_id": note.id,
+            "title": note.title,
+            "updated_at": note.updated_at.isoformat(),
+            "timestamp": utc_timestamp()
+        }
+        room["title"] = note.title
+        if "content" in fields:
+            # The REST write is the newest content; a debounced save would overwrite it
+            if self._pending_updates.pop(note.id, None):
+                self.scheduler.cancel(self._save_timer_key(note.id))
+            room["content"] = note.content
+            room["revision"] += 1
+            message["content"] = note.content
+            message["revision"] = room["revision"]
+        
+        await manager.broadcast_to_room(note.id, message)
+        self._release_room(note.id)
+    
+    def _release_room(self, note_id: str):
+        if not manager.has_room(note_id) and note_id not in self._pending_updates:
+            self._room_state.pop(note_id, None)
+    
+    @staticmethod
+    def _save_timer_key(note_id: str) -> tuple:
+        return ("save", note_id)
+    
+    async def _persist_pending_update(self, note_id: str) -> bool:
+        """Write the pending content for a note and acknowledge the sender"""
+        update = self._pending_updates.pop(note_id, None)
+        if not update:
+            return False
+        
+        try:
+            # Save to database via note_service, off the event loop so a
+            # storage write (and the log engine's fsync) never blocks other rooms
+            note_update = NoteUpdate(content=update["content"])
+            await asyncio.to_thread(note_service.update_note, note_id, note_update)
             
-            try:
-                # Save to database via note_service
-                from ..models.note import NoteUpdate
-                note_update = NoteUpdate(content=update["content"])
-                
-                # Check if note_service.update_note is async
-                if asyncio.iscoroutinefunction(note_service.update_note):
-                    await note_service.update_note(note_id, note_update)
-                else:
-                    note_service.update_note(note_id, note_update)
-                
-                logger.info(f"Saved note {note_id} to database")
-
-                await update["websocket"].send_text(json.dumps({
-                  "type": "content_saved",
-                  "timestamp": datetime.now(timezone.utc).isoformat()
-                }))
-                
-            except Exception as e:
-                logger.error(f"Error saving update to database: {e}", exc_info=True)
-            finally:
-                # Clean up
-                if note_id in self._pending_updates:
-                    del self._pending_updates[note_id]
-                if note_id in self._update_tasks:
-                    del self._update_tasks[note_id]
+            logger.info(f"Saved note {note_id} to database")
+        except Exception as e:
+            logger.error(f"Error saving update to database: {e}", exc_info=True)
+            return False
+        
+        try:
+            await update["websocket"].send_text(json.dumps({
+              "type": "content_saved",
+              "note_id": note_id,
+              "timestamp": utc_timestamp()
+            }))
+        except Exception as e:
+            logger.warning(f"Could not acknowledge save of note {note_id}: {e}")
+        finally:
+            self._release_room(note_id)
+        return True
+    
+    async def flush_pending_updates(self, note_ids: Optional[Iterable[str]] = None) -> int:
+        """Persist pending updates immediately: all of them (on shutdown) or those of ``note_ids``"""
+        targets = list(self._pending_updates) if note_ids is None else [
+            note_id for note_id in note_ids if note_id in self._pending_updates
+        ]
+        for note_id in targets:
+            self.scheduler.cancel(self._save_timer_key(note_id))
+        
+        # Let saves that already fired finish before writing what is left
+        await self.scheduler.drain()
+        
+        flushed = 0
+        for note_id in targets:
+            if await self._persist_pending_update(note_id):
+                flushed += 1
+        return flushed
+    
+    async def release_notes(self, note_ids: List[str]) -> int:
+        """Hand notes over to another worker: save pending edits and forget their room state"""
+        flushed = await self.flush_pending_updates(note_ids)
+        for note_id in note_ids:
+            self._release_room(note_id)
+        return flushed
     
-    async def _handle_cursor_position(self, websocket: WebSocket, note_id: str, user_name: str, message_data: dict):
+    async def _handle_cursor_position(self, websocket: WebSocket, note_id: str, user_name: str,
+                                      message: CursorPosition, timestamp: str):
         """Handle cursor position messages"""
         await manager.broadcast_to_room(note_id, {
             "type": "cursor_position",
-            "position": message_data.get("position"),
+            "note_id": note_id,
+            "position": message.position,
             "user_name": user_name,
-            "timestamp": message_data["timestamp"]
+            "timestamp": timestamp
         }, exclude_websocket=websocket)
     
-    async def _handle_typing_indicator(self, websocket: WebSocket, note_id: str, user_name: str, message_data: dict):
+    async def _handle_typing_indicator(self, websocket: WebSocket, note_id: str, user_name: str,
+                                       message: TypingIndicator, timestamp: str):
         """Handle typing indicator messages"""
-        is_typing = message_data.get("is_typing", False)
+        is_typing = message.is_typing
         logger.info(f"{user_name} typing: {is_typing}")
         
         await manager.broadcast_to_room(note_id, {
             "type": "typing_indicator",
+            "note_id": note_id,
             "is_typing": is_typing,
             "user_name": user_name,
-            "timestamp": message_data["timestamp"]
+            "timestamp": timestamp
         }, exclude_websocket=websocket)
     
-    async def _handle_unknown_message(self, websocket: WebSocket, note_id: str, user_name: str, message_data: dict):
+    async def _handle_unknown_message(self, websocket: WebSocket, note_id: str, user_name: str, message: ClientMessage):
         """Handle unknown message types"""
-        logger.warning(f"Unknown message type from {user_name}: {message_data}")
+        logger.warning(f"Unknown message type from {user_name}: {message!r}")
         # Send error back to sender
         await websocket.send_text(json.dumps({
             "type": "error",
-            "message": f"Unknown message type: {message_data.get('type')}"
+            "note_id": note_id,
+            "message": f"Unknown message type: {message.type}"
         }))
 
 websocket_service = WebSocketService()
\ No newline at end of file
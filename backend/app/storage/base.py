@@ -0,0 +1,67 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..models.note import Note, NoteListItem
+
+
+class NoteStorage(ABC):
+    """Persistence engine behind ``NoteService``.
+
+    Implementations store whole notes keyed by id. ``NoteService`` owns
+    timestamps, the list index and validation; engines only read and write.
+    """
+
+    @abstractmethod
+    def create(self, note: Note) -> Note:
+        ...
+
+    @abstractmethod
+    def get(self, note_id: str) -> Optional[Note]:
+        ...
+
+    @abstractmethod
+    def list_items(self) -> List[NoteListItem]:
+        """Metadata for every note, in no particular order"""
+
+    def has_notes(self) -> bool:
+        """Whether any note is stored; engines override this with a cheaper check"""
+        return bool(self.list_items())
+
+    @abstractmethod
+    def update(self, note_id: str, fields: Dict[str, Any]) -> Optional[Note]:
+        """Apply ``fields`` to a note, returning ``None`` if it does not exist"""
+
+    @abstractmethod
+    def delete(self, note_id: str) -> bool:
+        """Remove a note together with its shares"""
+
+    @abstractmethod
+    def list_shares(self) -> List[Tuple[str, str]]:
+        """Every (note_id, uid) share grant"""
+
+    def shares_of(self, note_id: str) -> List[str]:
+        """The uids a single note is shared with; engines override this with a keyed lookup"""
+        return [uid for shared_id, uid in self.list_shares() if shared_id == note_id]
+
+    @abstractmethod
+    def add_share(self, note_id: str, uid: str) -> bool:
+        """Grant ``uid`` access to a note; returns False if the note does not exist"""
+
+    @abstractmethod
+    def remove_share(self, note_id: str, uid: str) -> bool:
+        ...
+
+    @abstractmethod
+    def iter_rows(self, batch_size: int = 500, owner_uid: Optional[str] = None,
+                  scoped: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream every note as a plain dict, ordered by id.
+
+        When ``scoped``, only the notes ``owner_uid`` owns or has been shared
+        are read; ``owner_uid=None`` then means the unowned notes.
+        """
+
+    @abstractmethod
+    def bulk_upsert(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or replace notes given as plain dicts"""
+
+    def close(self):
+        pass
@@ -0,0 +1,90 @@
+from typing import Optional, Union
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Compressed blobs start with a NUL byte, which never begins a stored UTF-8 note
+ZLIB_MAGIC = b"\x00NZ1"
+ZSTD_MAGIC = b"\x00NS1"
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+class ContentCodec:
+    """Transparent compression for note content at rest.
+
+    ``encode`` returns the original string when compression is disabled, the
+    text is below ``min_bytes`` or it would not get smaller; otherwise it
+    returns a self-describing blob. ``decode`` accepts either, so rows written
+    before compression was enabled keep working and are compressed on their
+    next write.
+    """
+
+    def __init__(self, algorithm: str = "none", min_bytes: int = 1024, level: int = 6):
+        if algorithm == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed, falling back to zlib compression")
+            algorithm = "zlib"
+        if algorithm not in ("none", "zlib", "zstd"):
+            raise ValueError(f"Unknown NOTES_COMPRESSION algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.level = level
+
+    @classmethod
+    def from_env(cls) -> "ContentCodec":
+        return cls(
+            algorithm=os.getenv("NOTES_COMPRESSION", "none"),
+            min_bytes=int(os.getenv("NOTES_COMPRESSION_MIN_BYTES", 1024)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.algorithm != "none"
+
+    def pack(self, data: bytes) -> Optional[bytes]:
+        """Compress raw bytes into a tagged blob, or ``None`` if not worthwhile"""
+        if not self.enabled or len(data) < self.min_bytes:
+            return None
+        if self.algorithm == "zstd":
+            blob = ZSTD_MAGIC + zstandard.ZstdCompressor(level=self.level).compress(data)
+        else:
+            blob = ZLIB_MAGIC + zlib.compress(data, self.level)
+        return blob if len(blob) < len(data) else None
+
+    @staticmethod
+    def unpack(blob: bytes) -> bytes:
+        if blob.startswith(ZLIB_MAGIC):
+            return zlib.decompress(blob[len(ZLIB_MAGIC):])
+        if blob.startswith(ZSTD_MAGIC):
+            if zstandard is None:
+                raise RuntimeError("Note content is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(blob[len(ZSTD_MAGIC):])
+        return blob
+
+    def encode(self, text: Optional[str]) -> Union[str, bytes, None]:
+        if text is None:
+            return None
+        return self.pack(text.encode("utf-8")) or text
+
+    def decode(self, value: Union[str, bytes, None]) -> Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+        return self.unpack(bytes(value)).decode("utf-8")
+
+
+_codec = ContentCodec.from_env()
+
+
+def get_codec() -> ContentCodec:
+    return _codec
+
+
+def set_codec(codec: ContentCodec):
+    """Swap the process-wide codec (benchmarks and tests)"""
+    global _codec
+    _codec = codec
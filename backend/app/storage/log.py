@@ -0,0 +1,491 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from ..models.note import Note, NoteListItem
+from .base import NoteStorage
+from .compression import get_codec
+
+logger = logging.getLogger(__name__)
+
+# Record layout: crc32(payload) | len(payload) | payload (JSON, possibly compressed)
+HEADER = struct.Struct("<II")
+# High bit of the length field marks a compressed payload
+COMPRESSED_FLAG = 0x80000000
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+COMPACT_SUFFIX = ".compact"
+COMPACT_TMP_SUFFIX = ".compact.tmp"
+
+
+class LogCorruptionError(RuntimeError):
+    """Raised when a sealed segment contains an unreadable record"""
+
+
+class _Location:
+    __slots__ = ("segment", "offset", "length")
+
+    def __init__(self, segment: int, offset: int, length: int):
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+
+
+def _segment_name(segment: int, suffix: str = SEGMENT_SUFFIX) -> str:
+    return f"{SEGMENT_PREFIX}{segment:08d}{suffix}"
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    flags = 0
+    compressed = get_codec().pack(payload)
+    if compressed is not None:
+        payload, flags = compressed, COMPRESSED_FLAG
+    return HEADER.pack(zlib.crc32(payload), len(payload) | flags) + payload
+
+
+def _decode(payload: bytes, compressed: bool) -> Dict[str, Any]:
+    return json.loads(get_codec().unpack(payload) if compressed else payload)
+
+
+def _naive_utc(value: datetime) -> str:
+    # Match SQLite, which hands timestamps back as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _to_record(note: Dict[str, Any], shared_with: Iterable[str] = ()) -> Dict[str, Any]:
+    record = {
+        "op": "put",
+        "id": note["id"],
+        "title": note["title"],
+        "content": note["content"],
+        "owner_uid": note.get("owner_uid"),
+        "created_at": _naive_utc(note["created_at"]),
+        "updated_at": _naive_utc(note["updated_at"]),
+    }
+    # Shares live in the note's record, so compaction keeps them with it
+    if shared_with:
+        record["shared_with"] = sorted(shared_with)
+    return record
+
+
+def _to_note(record: Dict[str, Any]) -> Note:
+    return Note(
+        id=record["id"],
+        title=record["title"],
+        content=record["content"],
+        owner_uid=record.get("owner_uid"),
+        created_at=datetime.fromisoformat(record["created_at"]),
+        updated_at=datetime.fromisoformat(record["updated_at"]),
+    )
+
+
+class LogNoteStorage(NoteStorage):
+    """Append-only, log-structured note engine.
+
+    Every write appends a whole-note record (or a tombstone) to the active
+    segment; an in-memory index maps note ids to the latest record, and list
+    metadata is kept in memory so listing never touches disk.
+
+    Durability uses group commit: a writer that finds an fsync in progress
+    waits for the next one, so concurrent saves share a single fsync.
+    Sealed segments are rewritten by background compaction once enough of
+    their bytes are superseded. On open, segments are replayed in order and a
+    torn or corrupt tail in the newest segment is truncated away.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        sync: bool = True,
+        compaction_interval: Optional[float] = 30.0,
+        compaction_garbage_ratio: float = 0.5,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.sync = sync
+        self.compaction_garbage_ratio = compaction_garbage_ratio
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, _Location] = {}
+        self._meta: Dict[str, NoteListItem] = {}
+        self._shares: Dict[str, Set[str]] = {}
+        self._segment_bytes: Dict[int, int] = {}
+        self._live_bytes: Dict[int, int] = {}
+        self._read_fds: Dict[int, int] = {}
+        self._active = 0
+        self._active_fd = -1
+        self._active_size = 0
+
+        self._sync_cond = threading.Condition()
+        self._syncing = False
+        self._write_seq = 0
+        self._synced_seq = 0
+
+        self.stats = {"appends": 0, "fsyncs": 0, "compactions": 0, "recovered_truncations": 0}
+
+        self._recover()
+
+        self._stop = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if compaction_interval:
+            self._compactor = threading.Thread(
+                target=self._compaction_loop, args=(compaction_interval,),
+                name="log-compactor", daemon=True
+            )
+            self._compactor.start()
+
+    @classmethod
+    def from_env(cls) -> "LogNoteStorage":
+        return cls(
+            os.getenv("NOTES_LOG_DIR", "./data/notes-log"),
+            segment_max_bytes=int(os.getenv("NOTES_LOG_SEGMENT_BYTES", 4 * 1024 * 1024)),
+            sync=os.getenv("NOTES_LOG_FSYNC", "true").lower() != "false",
+        )
+
+    # NoteStorage API
+
+    def create(self, note: Note) -> Note:
+        record = _to_record(note.model_dump())
+        self._append(record)
+        return _to_note(record)
+
+    def get(self, note_id: str) -> Optional[Note]:
+        with self._lock:
+            location = self._index.get(note_id)
+            if location is None:
+                return None
+            record = self._read(location)
+        return _to_note(record)
+
+    def list_items(self) -> List[NoteListItem]:
+        with self._lock:
+            return list(self._meta.values())
+
+    def has_notes(self) -> bool:
+        with self._lock:
+            return bool(self._meta)
+
+    def update(self, note_id: str, fields: Dict[str, Any]) -> Optional[Note]:
+        # Hold the lock across read-modify-append so concurrent updates don't interleave
+        with self._lock:
+            location = self._index.get(note_id)
+            if location is None:
+                return None
+            note = _to_note(self._read(location))
+            for field, value in fields.items():
+                setattr(note, field, value)
+            record = _to_record(note.model_dump(), self._shares.get(note_id, ()))
+            seq = self._write(record)
+        self._wait_durable(seq)
+        return _to_note(record)
+
+    def delete(self, note_id: str) -> bool:
+        with self._lock:
+            if note_id not in self._index:
+                return False
+            seq = self._write({"op": "del", "id": note_id})
+        self._wait_durable(seq)
+        return True
+
+    def list_shares(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return [(note_id, uid) for note_id, uids in self._shares.items() for uid in uids]
+
+    def shares_of(self, note_id: str) -> List[str]:
+        with self._lock:
+            return list(self._shares.get(note_id, ()))
+
+    def add_share(self, note_id: str, uid: str) -> bool:
+        return self._set_shares(note_id, lambda uids: uids | {uid})
+
+    def remove_share(self, note_id: str, uid: str) -> bool:
+        if uid not in self._shares.get(note_id, ()):
+            return False
+        return self._set_shares(note_id, lambda uids: uids - {uid})
+
+    def iter_rows(self, batch_size: int = 500, owner_uid: Optional[str] = None,
+                  scoped: bool = False) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            if scoped:
+                # Filter on the in-memory metadata so other users' notes are never read from disk
+                note_ids = sorted(
+                    note_id for note_id, item in self._meta.items()
+                    if item.owner_uid == owner_uid or owner_uid in self._shares.get(note_id, ())
+                )
+            else:
+                note_ids = sorted(self._index)
+        for start in range(0, len(note_ids), batch_size):
+            for note_id in note_ids[start:start + batch_size]:
+                note = self.get(note_id)
+                if note:
+                    yield note.model_dump()
+
+    def bulk_upsert(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        with self._lock:
+            seq = 0
+            for row in rows:
+                seq = self._write(_to_record(row, self._shares.get(row["id"], ())))
+        self._wait_durable(seq)
+        return len(rows)
+
+    def close(self):
+        self._stop.set()
+        if self._compactor:
+            self._compactor.join()
+        with self._lock:
+            if self._active_fd >= 0:
+                os.fsync(self._active_fd)
+                os.close(self._active_fd)
+                self._active_fd = -1
+            for fd in self._read_fds.values():
+                os.close(fd)
+            self._read_fds.clear()
+
+    # Writing
+
+    def _set_shares(self, note_id: str, change) -> bool:
+        with self._lock:
+            location = self._index.get(note_id)
+            if location is None:
+                return False
+            record = self._read(location)
+            uids = change(set(record.get("shared_with", ())))
+            seq = self._write(_to_record(_to_note(record).model_dump(), uids))
+        self._wait_durable(seq)
+        return True
+
+    def _append(self, record: Dict[str, Any]):
+        with self._lock:
+            seq = self._write(record)
+        self._wait_durable(seq)
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        """Append a record to the active segment; caller holds the lock"""
+        data = _encode(record)
+        if self._active_size and self._active_size + len(data) > self.segment_max_bytes:
+            self._roll_segment()
+
+        offset = self._active_size
+        os.write(self._active_fd, data)
+        self._active_size += len(data)
+        self._segment_bytes[self._active] = self._active_size
+        self._apply(record, _Location(self._active, offset, len(data)))
+        self.stats["appends"] += 1
+
+        self._write_seq += 1
+        return self._write_seq
+
+    def _wait_durable(self, seq: int):
+        """Group commit: one fsync covers every write issued before it started"""
+        if not self.sync:
+            return
+        with self._sync_cond:
+            while self._synced_seq < seq:
+                if self._syncing:
+                    self._sync_cond.wait()
+                    continue
+                self._syncing = True
+                with self._lock:
+                    target = self._write_seq
+                    fd = os.dup(self._active_fd)
+                self._sync_cond.release()
+                try:
+                    os.fsync(fd)
+                    self.stats["fsyncs"] += 1
+                finally:
+                    os.close(fd)
+                    self._sync_cond.acquire()
+                    self._syncing = False
+                self._synced_seq = max(self._synced_seq, target)
+                self._sync_cond.notify_all()
+
+    def _roll_segment(self):
+        os.fsync(self._active_fd)
+        os.close(self._active_fd)
+        self._open_active(self._active + 1)
+
+    def _open_active(self, segment: int):
+        path = self.directory / _segment_name(segment)
+        self._active = segment
+        self._active_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._active_size = os.fstat(self._active_fd).st_size
+        self._segment_bytes.setdefault(segment, self._active_size)
+        self._live_bytes.setdefault(segment, 0)
+
+    def _apply(self, record: Dict[str, Any], location: _Location):
+        """Point the in-memory index at a record; caller holds the lock"""
+        note_id = record["id"]
+        previous = self._index.pop(note_id, None)
+        if previous:
+            self._live_bytes[previous.segment] -= previous.length
+        self._meta.pop(note_id, None)
+        self._shares.pop(note_id, None)
+
+        if record["op"] == "put":
+            self._index[note_id] = location
+            self._live_bytes[location.segment] = self._live_bytes.get(location.segment, 0) + location.length
+            self._meta[note_id] = NoteListItem(
+                id=note_id,
+                title=record["title"],
+                owner_uid=record.get("owner_uid"),
+                created_at=datetime.fromisoformat(record["created_at"]),
+                updated_at=datetime.fromisoformat(record["updated_at"]),
+            )
+            if record.get("shared_with"):
+                self._shares[note_id] = set(record["shared_with"])
+
+    # Reading
+
+    def _read(self, location: _Location) -> Dict[str, Any]:
+        fd = self._read_fds.get(location.segment)
+        if fd is None:
+            fd = os.open(self.directory / _segment_name(location.segment), os.O_RDONLY)
+            self._read_fds[location.segment] = fd
+        data = os.pread(fd, location.length, location.offset)
+        _, length = HEADER.unpack_from(data)
+        return _decode(data[HEADER.size:], bool(length & COMPRESSED_FLAG))
+
+    def _scan(self, path: Path) -> Iterator[Tuple[int, int, Optional[Dict[str, Any]]]]:
+        """Yield (offset, length, record) for each record; record is None at a bad tail"""
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            header = data[offset:offset + HEADER.size]
+            if len(header) < HEADER.size:
+                yield offset, 0, None
+                return
+            crc, length = HEADER.unpack(header)
+            compressed = bool(length & COMPRESSED_FLAG)
+            length &= ~COMPRESSED_FLAG
+            payload = data[offset + HEADER.size:offset + HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                yield offset, 0, None
+                return
+            yield offset, HEADER.size + length, _decode(payload, compressed)
+            offset += HEADER.size + length
+
+    # Recovery
+
+    def _segments(self) -> List[int]:
+        segments = []
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            segments.append(int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segments)
+
+    def _recover(self):
+        self._finish_interrupted_compaction()
+
+        segments = self._segments()
+        for position, segment in enumerate(segments):
+            path = self.directory / _segment_name(segment)
+            is_last = position == len(segments) - 1
+            size = 0
+            for offset, length, record in self._scan(path):
+                if record is None:
+                    if not is_last:
+                        raise LogCorruptionError(f"Corrupt record in sealed segment {path.name} at offset {offset}")
+                    # A crash mid-append leaves a torn tail; drop it and carry on
+                    logger.warning(f"Truncating torn tail of {path.name} at offset {offset}")
+                    os.truncate(path, offset)
+                    self.stats["recovered_truncations"] += 1
+                    break
+                self._apply(record, _Location(segment, offset, length))
+                size = offset + length
+            self._segment_bytes[segment] = size
+            self._live_bytes.setdefault(segment, 0)
+
+        self._open_active(segments[-1] if segments else 1)
+        logger.info(f"Recovered {len(self._index)} notes from {len(segments)} log segments")
+
+    def _finish_interrupted_compaction(self):
+        for tmp in self.directory.glob(f"*{COMPACT_TMP_SUFFIX}"):
+            tmp.unlink()
+        for compacted in self.directory.glob(f"*{COMPACT_SUFFIX}"):
+            # A complete compaction output supersedes every segment up to its id
+            segment = int(compacted.name[len(SEGMENT_PREFIX):-len(COMPACT_SUFFIX)])
+            for old in self._segments():
+                if old <= segment:
+                    (self.directory / _segment_name(old)).unlink()
+            compacted.rename(self.directory / _segment_name(segment))
+
+    # Compaction
+
+    def garbage_ratio(self) -> float:
+        with self._lock:
+            sealed = [s for s in self._segment_bytes if s != self._active]
+            total = sum(self._segment_bytes[s] for s in sealed)
+            live = sum(self._live_bytes.get(s, 0) for s in sealed)
+        return 1 - live / total if total else 0.0
+
+    def compact(self) -> int:
+        """Rewrite sealed segments into one holding only live records; returns bytes reclaimed"""
+        with self._lock:
+            sealed = sorted(s for s in self._segment_bytes if s != self._active)
+            if not sealed:
+                return 0
+            target = sealed[-1]
+            moved = {
+                note_id: location for note_id, location in self._index.items()
+                if location.segment in sealed
+            }
+            before = sum(self._segment_bytes[s] for s in sealed)
+
+        # Copy live records without blocking writers; only the active segment changes meanwhile
+        tmp_path = self.directory / _segment_name(target, COMPACT_TMP_SUFFIX)
+        new_locations: Dict[str, _Location] = {}
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for note_id, location in sorted(moved.items(), key=lambda item: (item[1].segment, item[1].offset)):
+                with self._lock:
+                    data = _encode(self._read(location))
+                out.write(data)
+                new_locations[note_id] = _Location(target, offset, len(data))
+                offset += len(data)
+            out.flush()
+            os.fsync(out.fileno())
+        tmp_path.rename(self.directory / _segment_name(target, COMPACT_SUFFIX))
+
+        with self._lock:
+            for segment in sealed:
+                fd = self._read_fds.pop(segment, None)
+                if fd is not None:
+                    os.close(fd)
+            self._finish_interrupted_compaction()
+
+            for segment in sealed:
+                self._segment_bytes.pop(segment, None)
+                self._live_bytes.pop(segment, None)
+            self._segment_bytes[target] = offset
+            self._live_bytes[target] = 0
+            for note_id, location in new_locations.items():
+                # Notes rewritten into the active segment during the copy keep their newer record
+                current = self._index.get(note_id)
+                if current is not None and current.segment in sealed:
+                    self._index[note_id] = location
+                    self._live_bytes[target] += location.length
+
+            self.stats["compactions"] += 1
+        reclaimed = before - offset
+        logger.info(f"Compacted {len(sealed)} segments into {_segment_name(target)}, reclaimed {reclaimed} bytes")
+        return reclaimed
+
+    def _compaction_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                if self.garbage_ratio() >= self.compaction_garbage_ratio:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Log compaction failed: {e}", exc_info=True)
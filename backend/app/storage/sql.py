@@ -0,0 +1,124 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import delete, insert, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from ..models.note import Note, NoteListItem, NoteShare
+from .base import NoteStorage
+
+
+class SQLNoteStorage(NoteStorage):
+    """SQLModel/SQLite engine (the default)"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def create(self, note: Note) -> Note:
+        with Session(self.engine) as session:
+            session.add(note)
+            session.commit()
+            session.refresh(note)
+            return note
+
+    def get(self, note_id: str) -> Optional[Note]:
+        with Session(self.engine) as session:
+            return session.get(Note, note_id)
+
+    def list_items(self) -> List[NoteListItem]:
+        with Session(self.engine) as session:
+            statement = select(Note.id, Note.title, Note.owner_uid, Note.created_at, Note.updated_at)
+            results = session.exec(statement).all()
+            
+            return [
+                NoteListItem(
+                    id=row.id,
+                    title=row.title,
+                    owner_uid=row.owner_uid,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at
+                )
+                for row in results
+            ]
+
+    def has_notes(self) -> bool:
+        # SELECT EXISTS stops at the first row instead of reading the table
+        with Session(self.engine) as session:
+            return session.scalar(select(select(Note.id).exists()))
+
+    def update(self, note_id: str, fields: Dict[str, Any]) -> Optional[Note]:
+        with Session(self.engine) as session:
+            note = session.get(Note, note_id)
+            if not note:
+                return None
+            
+            for field, value in fields.items():
+                setattr(note, field, value)
+            
+            session.add(note)
+            session.commit()
+            session.refresh(note)
+            return note
+
+    def delete(self, note_id: str) -> bool:
+        with Session(self.engine) as session:
+            note = session.get(Note, note_id)
+            if note:
+                session.execute(delete(NoteShare).where(NoteShare.note_id == note_id))
+                session.delete(note)
+                session.commit()
+                return True
+            return False
+
+    def list_shares(self) -> List[Tuple[str, str]]:
+        with Session(self.engine) as session:
+            return [tuple(row) for row in session.exec(select(NoteShare.note_id, NoteShare.uid)).all()]
+
+    def shares_of(self, note_id: str) -> List[str]:
+        # Served by the (note_id, uid) primary key
+        with Session(self.engine) as session:
+            return list(session.exec(select(NoteShare.uid).where(NoteShare.note_id == note_id)).all())
+
+    def add_share(self, note_id: str, uid: str) -> bool:
+        with Session(self.engine) as session:
+            if session.get(Note, note_id) is None:
+                return False
+            if session.get(NoteShare, (note_id, uid)) is None:
+                session.add(NoteShare(note_id=note_id, uid=uid))
+                session.commit()
+            return True
+
+    def remove_share(self, note_id: str, uid: str) -> bool:
+        with Session(self.engine) as session:
+            share = session.get(NoteShare, (note_id, uid))
+            if share is None:
+                return False
+            session.delete(share)
+            session.commit()
+            return True
+
+    def iter_rows(self, batch_size: int = 500, owner_uid: Optional[str] = None,
+                  scoped: bool = False) -> Iterator[Dict[str, Any]]:
+        # yield_per streams through a server-side cursor instead of fetching everything
+        with Session(self.engine) as session:
+            statement = (
+                select(Note.id, Note.title, Note.content, Note.owner_uid, Note.created_at, Note.updated_at)
+                .order_by(Note.id)
+                .execution_options(yield_per=batch_size)
+            )
+            if scoped and owner_uid is None:
+                statement = statement.where(Note.owner_uid.is_(None))
+            elif scoped:
+                # Served by the (owner_uid, updated_at) and (uid, note_id) indexes
+                shared = select(NoteShare.note_id).where(NoteShare.uid == owner_uid)
+                statement = statement.where(or_(Note.owner_uid == owner_uid, Note.id.in_(shared)))
+            for row in session.exec(statement):
+                yield row._asdict()
+
+    def bulk_upsert(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        
+        with Session(self.engine) as session:
+            statement = insert(Note).prefix_with("OR REPLACE", dialect="sqlite")
+            session.execute(statement, rows)
+            session.commit()
+        return len(rows)
@@ -1,36 +1,117 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 from fastapi import WebSocket
 import json
+import os
 from datetime import datetime, timezone
+from .services.scheduler import TimerWheel, scheduler
+from .services.spectators import spectators
+
+# Outbound batching window and size cap for clients that opt in
+BATCH_WINDOW = int(os.getenv("WS_BATCH_WINDOW_MS", 10)) / 1000
+BATCH_MAX_MESSAGES = int(os.getenv("WS_BATCH_MAX_MESSAGES", 32))
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, timer_wheel: Optional[TimerWheel] = None):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.connection_users: Dict[WebSocket, str] = {}
+        # A multiplexed connection can be in many rooms at once
+        self.connection_rooms: Dict[WebSocket, Set[str]] = {}
+        # Connections that accept JSON-array frames, and per-room queues for them
+        self.batching_connections: Set[WebSocket] = set()
+        self._outbound: Dict[str, List[Tuple[dict, Optional[WebSocket]]]] = {}
+        self.scheduler = timer_wheel if timer_wheel is not None else scheduler
+        self.stats = {
+            "messages_delivered": 0,
+            "frames_sent": 0,
+            "batched_frames": 0,
+            "collapsed_messages": 0,
+        }
+
+    async def connect(self, websocket: WebSocket, note_id: str, user_name: str = "Anonymous", batch: bool = False):
+        await self.accept(websocket, user_name, batch=batch)
+        self.join(websocket, note_id)
 
-    async def connect(self, websocket: WebSocket, note_id: str):
+    async def accept(self, websocket: WebSocket, user_name: str = "Anonymous", batch: bool = False):
+        """Register a connection before it joins any room"""
         await websocket.accept()
+        self.connection_users[websocket] = user_name
+        self.connection_rooms[websocket] = set()
+        if batch:
+            self.batching_connections.add(websocket)
+
+    def join(self, websocket: WebSocket, note_id: str) -> bool:
+        """Add a connection to a note room; returns False if it was already there"""
+        rooms = self.connection_rooms.setdefault(websocket, set())
+        if note_id in rooms:
+            return False
+        rooms.add(note_id)
+        self.active_connections.setdefault(note_id, []).append(websocket)
+        return True
+
+    def leave(self, websocket: WebSocket, note_id: str) -> bool:
+        """Remove a connection from one note room, keeping the connection itself"""
+        rooms = self.connection_rooms.get(websocket)
+        if rooms is not None:
+            rooms.discard(note_id)
         
-        if note_id not in self.active_connections:
-            self.active_connections[note_id] = []
+        connections = self.active_connections.get(note_id)
+        if connections is None or websocket not in connections:
+            return False
+        connections.remove(websocket)
         
-        self.active_connections[note_id].append(websocket)
+        # Clean up empty note rooms
+        if not connections:
+            del self.active_connections[note_id]
+            if self._outbound.pop(note_id, None):
+                self.scheduler.cancel(self._batch_timer_key(note_id))
+        return True
 
-    def disconnect(self, websocket: WebSocket, note_id: str):
-        if note_id in self.active_connections:
-            if websocket in self.active_connections[note_id]:
-                self.active_connections[note_id].remove(websocket)
-            
-            # Clean up empty note rooms
-            if not self.active_connections[note_id]:
-                del self.active_connections[note_id]
+    def disconnect(self, websocket: WebSocket, note_id: Optional[str] = None):
+        """Leave ``note_id`` (or every room); forget the connection once it is in none"""
+        rooms = self.connection_rooms.get(websocket, set())
+        for room in [note_id] if note_id is not None else list(rooms):
+            self.leave(websocket, room)
+        
+        if not rooms:
+            self.connection_users.pop(websocket, None)
+            self.connection_rooms.pop(websocket, None)
+            self.batching_connections.discard(websocket)
+
+    def get_rooms(self, websocket: WebSocket) -> Set[str]:
+        return set(self.connection_rooms.get(websocket, ()))
+
+    def counts(self) -> dict:
+        """Open sockets versus room subscriptions they carry"""
+        return {
+            "connections": len(self.connection_rooms),
+            "subscriptions": sum(len(rooms) for rooms in self.connection_rooms.values()),
+            "rooms": len(self.active_connections),
+        }
+
+    def has_room(self, note_id: str) -> bool:
+        return note_id in self.active_connections
+
+    def get_room_users(self, note_id: str) -> List[str]:
+        """Presence roster: user names connected to a note, in join order"""
+        return [
+            self.connection_users.get(websocket, "Anonymous")
+            for websocket in self.active_connections.get(note_id, [])
+        ]
 
     async def broadcast_to_room(self, note_id: str, message: dict, exclude_websocket: WebSocket = None):
         """Broadcast message to all users in a specific note room"""
-        if note_id not in self.active_connections:
+        watched = spectators.watching(note_id)
+        if note_id not in self.active_connections and not watched:
             return
         
         message_str = json.dumps(message)
+        if watched:
+            # Read-only SSE viewers get every room message, the sender's own included
+            spectators.publish(note_id, message, message_str)
+        if note_id not in self.active_connections:
+            return
         connections_to_remove = []
+        has_batching = False
         
         print(f"🔊 Broadcasting to note {note_id}, excluding sender: {exclude_websocket is not None}")
         
@@ -40,8 +121,15 @@ class ConnectionManager:
                 print(f"⏭️  Skipping sender websocket")
                 continue
             
+            # Batching clients get this message in the room's next coalesced frame
+            if websocket in self.batching_connections:
+                has_batching = True
+                continue
+            
             try:
                 await websocket.send_text(message_str)
+                self.stats["messages_delivered"] += 1
+                self.stats["frames_sent"] += 1
                 print(f"✅ Sent message to a recipient")
             except Exception as e:
                 print(f"❌ Failed to send to websocket: {e}")
@@ -50,6 +138,74 @@ class ConnectionManager:
         # Remove broken connections
         for websocket in connections_to_remove:
             self.disconnect(websocket, note_id)
+        
+        if has_batching:
+            await self._enqueue(note_id, message, exclude_websocket)
+
+    async def _enqueue(self, note_id: str, message: dict, exclude_websocket: Optional[WebSocket]):
+        queue = self._outbound.setdefault(note_id, [])
+        queue.append((message, exclude_websocket))
+        
+        if len(queue) >= BATCH_MAX_MESSAGES:
+            self.scheduler.cancel(self._batch_timer_key(note_id))
+            await self.flush_room(note_id)
+        elif len(queue) == 1:
+            # The window opens with the first queued message and is never extended
+            self.scheduler.schedule(
+                self._batch_timer_key(note_id), BATCH_WINDOW,
+                lambda: self.flush_room(note_id)
+            )
+
+    async def flush_room(self, note_id: str):
+        """Send queued messages to the room's batching clients, one frame each"""
+        queue = self._outbound.pop(note_id, None)
+        if not queue:
+            return
+        
+        frames: Dict[Tuple[int, ...], str] = {}
+        connections_to_remove = []
+        
+        for websocket in self.active_connections.get(note_id, []):
+            if websocket not in self.batching_connections:
+                continue
+            
+            selected = self._select_for_recipient(queue, websocket)
+            if not selected:
+                continue
+            
+            # Recipients that see the same messages share one encoded frame
+            frame = frames.get(selected)
+            if frame is None:
+                messages = [queue[i][0] for i in selected]
+                frame = json.dumps(messages[0] if len(messages) == 1 else messages)
+                frames[selected] = frame
+            
+            try:
+                await websocket.send_text(frame)
+                self.stats["messages_delivered"] += len(selected)
+                self.stats["frames_sent"] += 1
+                if len(selected) > 1:
+                    self.stats["batched_frames"] += 1
+            except Exception as e:
+                print(f"❌ Failed to send batch to websocket: {e}")
+                connections_to_remove.append(websocket)
+        
+        for websocket in connections_to_remove:
+            self.disconnect(websocket, note_id)
+
+    def _select_for_recipient(self, queue: List[Tuple[dict, Optional[WebSocket]]], websocket: WebSocket) -> Tuple[int, ...]:
+        """Indices of queued messages for a recipient, keeping only its newest content_change"""
+        selected = [i for i, (_, exclude) in enumerate(queue) if exclude is not websocket]
+        content_changes = [i for i in selected if queue[i][0].get("type") == "content_change"]
+        if len(content_changes) > 1:
+            superseded = set(content_changes[:-1])
+            self.stats["collapsed_messages"] += len(superseded)
+            selected = [i for i in selected if i not in superseded]
+        return tuple(selected)
+
+    @staticmethod
+    def _batch_timer_key(note_id: str) -> tuple:
+        return ("batch", note_id)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
@@ -0,0 +1,82 @@
+"""Measure database size and save latency with and without content compression.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression --notes 200 --saves 2000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlmodel import SQLModel, create_engine
+from app.models.note import Note
+from app.storage.compression import ContentCodec, set_codec, zstandard
+from app.storage.sql import SQLNoteStorage
+
+WORDS = (
+    "meeting roadmap release backend frontend websocket note draft review "
+    "deadline budget design feedback todo done blocked follow-up owner"
+).split()
+
+
+def markdown_note(rng: random.Random, size: int) -> str:
+    lines = ["# " + " ".join(rng.choices(WORDS, k=4)).title(), ""]
+    while sum(len(line) + 1 for line in lines) < size:
+        lines.append("- " + " ".join(rng.choices(WORDS, k=rng.randint(5, 12))))
+    return "\n".join(lines)
+
+
+def run(algorithm: str, notes: int, saves: int, note_size: int) -> dict:
+    set_codec(ContentCodec(algorithm, min_bytes=512))
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "notes.db"
+        engine = create_engine(f"sqlite:///{path}")
+        SQLModel.metadata.create_all(engine)
+        storage = SQLNoteStorage(engine)
+
+        now = datetime.now(timezone.utc)
+        ids = [
+            storage.create(Note(title=f"Note {i}", content=markdown_note(rng, note_size), created_at=now, updated_at=now)).id
+            for i in range(notes)
+        ]
+
+        latencies = []
+        for _ in range(saves):
+            content = markdown_note(rng, note_size)
+            started = time.perf_counter()
+            storage.update(rng.choice(ids), {"content": content, "updated_at": datetime.now(timezone.utc)})
+            latencies.append(time.perf_counter() - started)
+
+        engine.dispose()
+        return {
+            "db_bytes": path.stat().st_size,
+            "mean_ms": statistics.mean(latencies) * 1000,
+            "p99_ms": sorted(latencies)[int(len(latencies) * 0.99) - 1] * 1000,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--note-size", type=int, default=16 * 1024)
+    args = parser.parse_args()
+
+    algorithms = ["none", "zlib"] + (["zstd"] if zstandard else [])
+    results = {name: run(name, args.notes, args.saves, args.note_size) for name in algorithms}
+    set_codec(ContentCodec.from_env())
+
+    baseline = results["none"]
+    print(f"{'codec':<8}{'db bytes':>14}{'size':>9}{'mean ms':>10}{'p99 ms':>10}{'latency':>10}")
+    for name, result in results.items():
+        size_delta = result["db_bytes"] / baseline["db_bytes"] - 1
+        latency_delta = result["mean_ms"] / baseline["mean_ms"] - 1
+        print(f"{name:<8}{result['db_bytes']:>14}{size_delta:>+9.1%}{result['mean_ms']:>10.3f}{result['p99_ms']:>10.3f}{latency_delta:>+10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Per-message cost of decoding and dispatching inbound websocket frames.
+
+Compares the previous path (json.loads, logging the parsed dict, dict.update
+with a fresh datetime.isoformat() timestamp and an if/elif chain on the type) with typed
+decoding in one validated pass, the cached clock and the dispatch table.
+Handlers are no-ops so only decode and dispatch are measured. Run from the
+backend directory:
+
+    python -m benchmarks.bench_message_decode --messages 50000
+"""
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import logging
+import time
+from app.models.messages import decode_message
+from app.services.traffic_recorder import recorder
+from app.services.scheduler import TimerWheel
+from app.services.websocket_service import WebSocketService
+
+logger = logging.getLogger("app.routers.websockets")
+
+FRAMES = {
+    "content_change": json.dumps({"type": "content_change", "content": "x" * 300, "timestamp": "2024-01-01T00:00:00Z"}),
+    "cursor_position": json.dumps({"type": "cursor_position", "position": 120, "timestamp": "2024-01-01T00:00:00Z"}),
+    "typing_indicator": json.dumps({"type": "typing_indicator", "is_typing": True}),
+}
+
+
+async def noop(*args):
+    pass
+
+
+async def legacy(data: str):
+    """The decode and dispatch steps as the router and handle_message used to run them"""
+    message_data = json.loads(data)
+    logger.info(f"Parsed message: {message_data}")
+    if recorder.enabled:
+        recorder.record_message(None, "bench", message_data)
+    message_data.update({
+        "user_name": "typist",
+        "note_id": "bench",
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+    message_type = message_data.get("type")
+    logger.info(f"Handling message type: {message_type} from typist")
+    if message_type == "content_change":
+        await noop(None, "bench", "typist", message_data)
+    elif message_type == "cursor_position":
+        await noop(None, "bench", "typist", message_data)
+    elif message_type == "typing_indicator":
+        await noop(None, "bench", "typist", message_data)
+    else:
+        await noop(None, "bench", "typist", message_data)
+
+
+async def measure(step, data: str, messages: int, repeats: int = 5) -> float:
+    """Best of several runs, in microseconds per message"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(messages):
+            await step(data)
+        best = min(best, time.perf_counter() - started)
+    return best / messages * 1e6
+
+
+async def run(messages: int) -> dict:
+    service = WebSocketService(timer_wheel=TimerWheel())
+    for handler in ("_handle_content_change", "_handle_cursor_position", "_handle_typing_indicator"):
+        setattr(service, handler, noop)
+
+    async def typed(data: str):
+        await service.handle_message(None, "bench", "typist", decode_message(data))
+
+    results = {}
+    for name, data in FRAMES.items():
+        results[name] = (await measure(legacy, data, messages), await measure(typed, data, messages))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50_000, help="Frames decoded per run and message type")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.messages))
+    print(f"{'message type':<20}{'before µs':>12}{'after µs':>12}{'change':>10}")
+    for name, (before, after) in results.items():
+        print(f"{name:<20}{before:>12.2f}{after:>12.2f}{after / before - 1:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare per-message sends with opt-in outbound batching for a busy room.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_outbound_batching --recipients 20 --events 500
+"""
+import argparse
+import asyncio
+import time
+from app.websocket_manager import ConnectionManager
+from app.services.scheduler import TimerWheel
+
+
+class CountingWebSocket:
+    """Stands in for a client socket; every send_text is one frame/syscall"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+async def run(batch: bool, recipients: int, events: int, interval: float) -> dict:
+    manager = ConnectionManager(timer_wheel=TimerWheel())
+    sender = CountingWebSocket()
+    await manager.connect(sender, "bench", "typist", batch=batch)
+    clients = [CountingWebSocket() for _ in range(recipients)]
+    for i, client in enumerate(clients):
+        await manager.connect(client, "bench", f"viewer-{i}", batch=batch)
+
+    started = time.perf_counter()
+    for i in range(events):
+        # A typist emits a content change plus a cursor move per keystroke
+        await manager.broadcast_to_room("bench", {
+            "type": "content_change",
+            "content": "x" * (200 + i),
+            "user_name": "typist",
+        }, exclude_websocket=sender)
+        await manager.broadcast_to_room("bench", {
+            "type": "cursor_position",
+            "position": 200 + i,
+            "user_name": "typist",
+        }, exclude_websocket=sender)
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "frames": sum(client.frames for client in clients),
+        "bytes": sum(client.bytes for client in clients),
+        "messages": events * 2 * recipients,
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=20)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Delay between keystrokes")
+    args = parser.parse_args()
+
+    interval = args.interval_ms / 1000
+    baseline = asyncio.run(run(False, args.recipients, args.events, interval))
+    batched = asyncio.run(run(True, args.recipients, args.events, interval))
+
+    print(f"{'mode':<10}{'messages':>10}{'frames':>10}{'bytes':>14}{'seconds':>10}")
+    for name, result in (("direct", baseline), ("batched", batched)):
+        print(f"{name:<10}{result['messages']:>10}{result['frames']:>10}{result['bytes']:>14}{result['elapsed']:>10.2f}")
+
+    reduction = 1 - batched["frames"] / baseline["frames"]
+    print(f"\nsend_text calls (frames/syscalls) reduced by {reduction:.1%}")
+    print(f"bytes on the wire reduced by {1 - batched['bytes'] / baseline['bytes']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare read-only viewers as websocket room members and as SSE spectators.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_spectators --viewers 1000 --events 200
+"""
+from contextlib import redirect_stdout
+import argparse
+import asyncio
+import io
+import time
+import tracemalloc
+from app.services.scheduler import TimerWheel
+from app.services.spectators import spectators
+from app.websocket_manager import ConnectionManager
+
+
+class CountingWebSocket:
+    """Stands in for a client socket; every send_text is one frame/syscall"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+async def snapshot():
+    return {"type": "snapshot", "note_id": "bench", "content": ""}
+
+
+async def watch(counts: dict):
+    """One spectator draining its stream, as the HTTP response would"""
+    async for chunk in spectators.stream("bench", snapshot):
+        counts["frames"] += 1
+        counts["bytes"] += len(chunk)
+
+
+async def run(sse: bool, viewers: int, events: int, interval: float) -> dict:
+    manager = ConnectionManager(timer_wheel=TimerWheel())
+    presenter = CountingWebSocket()
+    await manager.connect(presenter, "bench", "presenter")
+
+    tracemalloc.start()
+    counts = {"frames": 0, "bytes": 0}
+    if sse:
+        tasks = [asyncio.create_task(watch(counts)) for _ in range(viewers)]
+    else:
+        clients = [CountingWebSocket() for _ in range(viewers)]
+        for i, client in enumerate(clients):
+            await manager.connect(client, "bench", f"viewer-{i}")
+    await asyncio.sleep(0.05)
+
+    started, broadcasting = time.perf_counter(), 0.0
+    for i in range(events):
+        sent = time.perf_counter()
+        # A presenter emits a content change plus a cursor move per keystroke
+        await manager.broadcast_to_room("bench", {
+            "type": "content_change",
+            "content": "x" * (200 + i),
+            "user_name": "presenter",
+        }, exclude_websocket=presenter)
+        await manager.broadcast_to_room("bench", {
+            "type": "cursor_position",
+            "position": 200 + i,
+            "user_name": "presenter",
+        }, exclude_websocket=presenter)
+        broadcasting += time.perf_counter() - sent
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if sse:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    else:
+        counts["frames"] = sum(client.frames for client in clients)
+        counts["bytes"] = sum(client.bytes for client in clients)
+    return {**counts, "elapsed": elapsed, "broadcast": broadcasting, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viewers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=2.0, help="Delay between keystrokes")
+    args = parser.parse_args()
+
+    interval = args.interval_ms / 1000
+    # The room logs every send; keep it out of the measurements' output
+    with redirect_stdout(io.StringIO()):
+        websockets = asyncio.run(run(False, args.viewers, args.events, interval))
+        sse = asyncio.run(run(True, args.viewers, args.events, interval))
+
+    print(f"{'mode':<12}{'writes':>10}{'bytes':>14}{'broadcast s':>13}{'total s':>10}{'peak KiB':>12}")
+    for name, result in (("websocket", websockets), ("sse", sse)):
+        print(
+            f"{name:<12}{result['frames']:>10}{result['bytes']:>14}{result['broadcast']:>13.3f}"
+            f"{result['elapsed']:>10.2f}{result['peak_kib']:>12.0f}"
+        )
+
+    # Broadcast time is what the presenter's message handling waits on
+    print(f"\nbroadcast time reduced by {1 - sse['broadcast'] / websockets['broadcast']:.1%}")
+    print(f"writes reduced by {1 - sse['frames'] / websockets['frames']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Measure how long the API takes to import and to start serving.
+
+Each run is a fresh interpreter: one imports ``app.main`` and reports the
+import time, another runs uvicorn on a temporary database holding --notes
+notes and polls until /health and then /ready answer 200. Run from the
+backend directory:
+
+    python -m benchmarks.bench_startup --runs 5 --notes 5000
+"""
+from statistics import median
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import httpx
+
+IMPORT_PROBE = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def seed_database(path: str, notes: int):
+    """Create the schema through the app, then bulk-insert notes with sqlite3"""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run(
+        [sys.executable, "-c", "import app.models.note; from app.database import create_db_and_tables; create_db_and_tables()"],
+        env=env, check=True, capture_output=True,
+    )
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO note (id, title, content, created_at, updated_at) VALUES (?, ?, ?, datetime('now'), datetime('now'))",
+            ((str(uuid.uuid4()), f"Note {i}", "x" * 500) for i in range(notes)),
+        )
+
+
+def import_time(env: dict) -> float:
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def wait_for(client: httpx.Client, url: str, timeout: float = 60.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(url)
+            if response.status_code == 200:
+                return True
+            if response.status_code == 404:
+                return False
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} did not answer within {timeout:.0f}s")
+
+
+def startup_time(env: dict, port: int) -> tuple:
+    """Seconds from spawning uvicorn until /health, then /ready, return 200"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            wait_for(client, f"http://127.0.0.1:{port}/health")
+            healthy = time.perf_counter() - started
+            has_ready = wait_for(client, f"http://127.0.0.1:{port}/ready")
+            ready = time.perf_counter() - started if has_ready else None
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--notes", type=int, default=5000, help="Notes in the database the server starts on")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "notes.db")
+        seed_database(path, args.notes)
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "DB_MAINTENANCE": "false"}
+
+        imports = [import_time(env) for _ in range(args.runs)]
+        startups = [startup_time(env, args.port) for _ in range(args.runs)]
+
+    print(f"{'phase':<28}{'median s':>10}{'min s':>10}")
+    print(f"{'import app.main':<28}{median(imports):>10.3f}{min(imports):>10.3f}")
+    healthy = [healthy for healthy, _ in startups]
+    print(f"{'spawn to /health':<28}{median(healthy):>10.3f}{min(healthy):>10.3f}")
+    ready = [ready for _, ready in startups if ready is not None]
+    if ready:
+        print(f"{'spawn to /ready':<28}{median(ready):>10.3f}{min(ready):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare the SQLite and log-structured storage engines on a debounced-save workload.
+
+Saves are issued the way the websocket service issues them: every active note
+has its own debounced save on one event loop, and each save rewrites the note's
+full content through ``asyncio.to_thread``. Saves of different notes therefore
+overlap only as far as the default executor lets them. A ticker on the loop
+records how late it wakes up, to show whether the saves block it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_storage --notes 50 --saves 2000
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from sqlmodel import SQLModel, create_engine
+from app.models.note import Note
+from app.storage.log import LogNoteStorage
+from app.storage.sql import SQLNoteStorage
+from datetime import datetime, timezone
+
+
+def directory_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+async def run_workload(storage, notes: int, saves: int, note_size: int) -> dict:
+    now = datetime.now(timezone.utc)
+    ids = []
+    for i in range(notes):
+        note = storage.create(Note(title=f"Note {i}", content="", created_at=now, updated_at=now))
+        ids.append(note.id)
+
+    latencies = []
+    lags = []
+
+    async def active_note(note_id: str, count: int):
+        for i in range(count):
+            content = "x" * (note_size + i % 64)
+            started = time.perf_counter()
+            await asyncio.to_thread(storage.update, note_id, {"content": content, "updated_at": datetime.now(timezone.utc)})
+            latencies.append(time.perf_counter() - started)
+
+    async def ticker(interval: float = 0.001):
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - expected)
+
+    probe = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(active_note(note_id, saves // notes) for note_id in ids))
+    elapsed = time.perf_counter() - started
+    probe.cancel()
+
+    latencies.sort()
+    return {
+        "saves_per_sec": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notes", type=int, default=50)
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--note-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_dir = Path(tmp) / "sqlite"
+        sqlite_dir.mkdir()
+        engine = create_engine(f"sqlite:///{sqlite_dir / 'notes.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        results["sqlite"] = asyncio.run(run_workload(SQLNoteStorage(engine), args.notes, args.saves, args.note_size))
+        results["sqlite"]["disk_bytes"] = directory_size(sqlite_dir)
+        engine.dispose()
+
+        log_dir = Path(tmp) / "log"
+        storage = LogNoteStorage(str(log_dir), compaction_interval=None)
+        results["log"] = asyncio.run(run_workload(storage, args.notes, args.saves, args.note_size))
+        results["log"]["disk_bytes"] = directory_size(log_dir)
+        results["log"]["fsyncs"] = storage.stats["fsyncs"]
+        storage.compact()
+        results["log"]["disk_after_compaction"] = directory_size(log_dir)
+        storage.close()
+
+    print(f"{'engine':<8}{'saves/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'loop lag ms':>13}{'disk bytes':>14}")
+    for name, result in results.items():
+        print(
+            f"{name:<8}{result['saves_per_sec']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['max_lag_ms']:>13.2f}{result['disk_bytes']:>14}"
+        )
+    log = results["log"]
+    print(f"\nlog engine: {log['fsyncs']} fsyncs for {args.saves} saves (group commit), "
+          f"{log['disk_after_compaction']} bytes on disk after compaction")
+
+
+if __name__ == "__main__":
+    main()
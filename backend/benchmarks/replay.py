@@ -0,0 +1,167 @@
+"""Replay a recorded websocket trace against a running server.
+
+Record with WS_RECORD_PATH set on the server, then run from the backend directory:
+
+    python -m benchmarks.replay ./data/ws-trace.ndjson --url http://localhost:8000 --speed 4
+
+Every recorded room gets a fresh note, and every recorded connection its own
+/ws/{note_id} socket (multiplexed connections are split per room). Redacted
+text is replayed as filler of the recorded length. An observer socket per room
+timestamps broadcasts, giving broadcast latency; content_saved acks give the
+persistence lag from a connection's last edit to its save.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import quote
+import httpx
+import websockets
+
+
+def load_trace(path: str) -> List[dict]:
+    """Read a trace including rotated backups (path.N ... path.1, path), oldest first"""
+    backups = sorted(
+        glob.glob(f"{glob.escape(path)}.[0-9]*"),
+        key=lambda name: int(name.rsplit(".", 1)[1]),
+        reverse=True,
+    )
+    entries = []
+    for name in backups + ([path] if os.path.exists(path) else []):
+        with open(name, encoding="utf-8") as trace:
+            entries.extend(json.loads(line) for line in trace if line.strip())
+    entries.sort(key=lambda entry: entry["t"])
+    return entries
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"p50 {p50 * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms   max {ordered[-1] * 1000:8.1f} ms"
+
+
+class Replayer:
+
+    def __init__(self, url: str, speed: float):
+        self.url = url.rstrip("/")
+        self.ws_url = self.url.replace("http", "ws", 1)
+        self.speed = speed
+        self.notes: Dict[str, str] = {}
+        self.sockets: Dict[Tuple[int, str], websockets.ClientConnection] = {}
+        self.readers: List[asyncio.Task] = []
+        # Per room: send time of each content_change, in revision order
+        self.edit_sent: Dict[str, List[float]] = {}
+        self.last_edit: Dict[Tuple[int, str], float] = {}
+        self.latencies: List[float] = []
+        self.save_lags: List[float] = []
+        self.messages_sent = 0
+
+    async def run(self, entries: List[dict], settle: float):
+        rooms = sorted({entry["room"] for entry in entries})
+        async with httpx.AsyncClient(base_url=self.url) as http:
+            for room in rooms:
+                response = await http.post("/api/v1/notes", json={"title": f"replay {room}", "content": ""})
+                response.raise_for_status()
+                self.notes[room] = response.json()["id"]
+
+        for room in rooms:
+            observer = await websockets.connect(f"{self.ws_url}/ws/{self.notes[room]}?user_name=replay-observer")
+            await observer.recv()  # snapshot
+            self.edit_sent[room] = []
+            self.readers.append(asyncio.create_task(self._observe(room, observer)))
+
+        started = time.perf_counter()
+        origin = entries[0]["t"]
+        for entry in entries:
+            delay = started + (entry["t"] - origin) / self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._apply(entry)
+        replay_seconds = time.perf_counter() - started
+
+        # Leave time for the last debounced saves before closing everything
+        await asyncio.sleep(settle)
+        for socket in self.sockets.values():
+            await socket.close()
+        for reader in self.readers:
+            reader.cancel()
+        await asyncio.gather(*self.readers, return_exceptions=True)
+        return replay_seconds
+
+    async def _apply(self, entry: dict):
+        key = (entry["conn"], entry["room"])
+        if entry["event"] == "join" and key not in self.sockets:
+            socket = await websockets.connect(
+                f"{self.ws_url}/ws/{self.notes[entry['room']]}?user_name={quote(entry.get('user', 'replay'))}"
+            )
+            self.sockets[key] = socket
+            self.readers.append(asyncio.create_task(self._read_acks(key, socket)))
+        elif entry["event"] == "leave" and key in self.sockets:
+            await self.sockets.pop(key).close()
+        elif entry["event"] == "message" and key in self.sockets:
+            message = dict(entry["message"])
+            for field in ("content", "title"):
+                if isinstance(message.get(field), int):
+                    message[field] = "x" * message[field]
+            now = time.perf_counter()
+            if message.get("type") == "content_change":
+                self.edit_sent[entry["room"]].append(now)
+                self.last_edit[key] = now
+            await self.sockets[key].send(json.dumps(message))
+            self.messages_sent += 1
+
+    async def _observe(self, room: str, socket):
+        try:
+            async for frame in socket:
+                received = time.perf_counter()
+                data = json.loads(frame)
+                for message in data if isinstance(data, list) else [data]:
+                    revision = message.get("revision")
+                    if message.get("type") == "content_change" and revision:
+                        sent = self.edit_sent[room]
+                        if revision <= len(sent):
+                            self.latencies.append(received - sent[revision - 1])
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _read_acks(self, key: Tuple[int, str], socket):
+        try:
+            async for frame in socket:
+                data = json.loads(frame)
+                for message in data if isinstance(data, list) else [data]:
+                    if message.get("type") == "content_saved" and key in self.last_edit:
+                        self.save_lags.append(time.perf_counter() - self.last_edit[key])
+        except websockets.ConnectionClosed:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="Trace file written by the server (WS_RECORD_PATH)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (1 = recorded pace)")
+    parser.add_argument("--settle", type=float, default=6.0, help="Seconds to wait for saves after the last message")
+    args = parser.parse_args()
+
+    entries = load_trace(args.trace)
+    if not entries:
+        parser.error(f"No trace entries found at {args.trace}")
+
+    replayer = Replayer(args.url, args.speed)
+    elapsed = asyncio.run(replayer.run(entries, args.settle))
+
+    recorded = entries[-1]["t"] - entries[0]["t"]
+    print(f"replayed {replayer.messages_sent} messages over {len(replayer.notes)} rooms "
+          f"in {elapsed:.1f}s (recorded span {recorded:.1f}s, speed x{args.speed:g})")
+    print(f"broadcast latency   {percentiles(replayer.latencies)}   ({len(replayer.latencies)} samples)")
+    print(f"persistence lag     {percentiles(replayer.save_lags)}   ({len(replayer.save_lags)} saves)")
+
+
+if __name__ == "__main__":
+    main()
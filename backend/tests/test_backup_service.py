@@ -0,0 +1,50 @@
+import gzip
+import pytest
+from app.services.backup_service import BackupFormatError, NDJSONReader, NoteImporter
+
+
+class TestNDJSONReader:
+    
+    def test_records_split_across_chunks(self):
+        """Test that lines split over several chunks are reassembled"""
+        data = b'{"id": "1", "title": "One", "content": "a"}\n{"id": "2", "title": "Two", "content": "b"}\n'
+        reader = NDJSONReader()
+        
+        records = []
+        for i in range(0, len(data), 7):
+            records.extend(reader.feed(data[i:i + 7]))
+        records.extend(reader.close())
+        
+        assert [r["id"] for r in records] == ["1", "2"]
+        assert records[0]["updated_at"] == records[0]["created_at"]
+    
+    def test_gzip_input_is_detected(self):
+        """Test that gzip streams are decompressed transparently"""
+        data = gzip.compress(b'{"id": "1", "title": "One", "content": "a"}')
+        reader = NDJSONReader()
+        
+        records = reader.feed(data[:1]) + reader.feed(data[1:]) + reader.close()
+        
+        assert len(records) == 1
+        assert records[0]["title"] == "One"
+    
+    def test_missing_field_reports_line(self):
+        """Test that validation errors carry the offending line number"""
+        reader = NDJSONReader()
+        
+        with pytest.raises(BackupFormatError) as exc_info:
+            reader.feed(b'\n{"id": "1", "title": "No content"}\n')
+        
+        assert exc_info.value.line_number == 2
+
+
+class TestNoteImporter:
+    
+    def test_chunks_are_fixed_size(self):
+        """Test that records are released in chunk_size batches"""
+        importer = NoteImporter(chunk_size=2)
+        
+        ready = importer.add([{"id": str(i)} for i in range(5)])
+        
+        assert [len(chunk) for chunk in ready] == [2, 2]
+        assert len(importer.drain()) == 1
@@ -0,0 +1,213 @@
+import httpx
+import json
+import pytest
+from collections import Counter
+from unittest.mock import MagicMock
+import app.services.backup_service
+from app.cluster.proxy import ClusterProxy, note_key
+from app.cluster.ring import HashRing
+from app.models.note import NoteCreate, NoteUpdate
+from app.services.backup_service import NoteImporter
+from app.services.debounce import DebouncePolicy
+from app.services.note_service import NoteService
+from app.services.websocket_service import websocket_service
+from app.storage.sql import SQLNoteStorage
+
+WORKERS = [f"http://127.0.0.1:81{index:02d}" for index in range(4)]
+KEYS = [f"note-{index}" for index in range(5000)]
+
+
+class TestHashRing:
+
+    def test_mapping_is_deterministic(self):
+        """Test that two rings with the same workers agree on every key"""
+        first, second = HashRing(WORKERS), HashRing(reversed(WORKERS))
+        assert all(first.node_for(key) == second.node_for(key) for key in KEYS)
+
+    def test_keys_spread_evenly(self):
+        """Test that virtual nodes keep every worker near its fair share"""
+        ring = HashRing(WORKERS)
+        shares = Counter(ring.node_for(key) for key in KEYS)
+
+        assert set(shares) == set(WORKERS)
+        fair = len(KEYS) / len(WORKERS)
+        assert all(0.75 * fair < count < 1.25 * fair for count in shares.values())
+
+    def test_adding_a_worker_only_moves_keys_to_it(self):
+        """Test that growing the ring moves about 1/N of the keys, all onto the new worker"""
+        ring = HashRing(WORKERS)
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.add("http://127.0.0.1:8199")
+
+        moved = [key for key in KEYS if ring.node_for(key) != before[key]]
+        assert all(ring.node_for(key) == "http://127.0.0.1:8199" for key in moved)
+        assert 0.1 < len(moved) / len(KEYS) < 0.3
+
+    def test_removing_a_worker_only_moves_its_keys(self):
+        """Test that keys of the remaining workers stay put"""
+        ring = HashRing(WORKERS)
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.remove(WORKERS[0])
+
+        for key in KEYS:
+            if before[key] != WORKERS[0]:
+                assert ring.node_for(key) == before[key]
+            else:
+                assert ring.node_for(key) in WORKERS[1:]
+
+    def test_empty_ring(self):
+        """Test that an empty ring owns nothing"""
+        assert HashRing().node_for("note-1") is None
+
+
+class TestRouting:
+
+    @pytest.mark.parametrize("path, key", [
+        ("/ws/abc", "abc"),
+        ("/api/v1/notes/abc", "abc"),
+        ("/api/v1/notes/abc/shares/uid-2", "abc"),
+        ("/ws", None),
+        ("/ws/notes/index", None),
+        ("/api/v1/notes", None),
+        ("/api/v1/notes/export", None),
+        ("/api/v1/notes/import", None),
+        ("/api/v1/notes/index/consistency", None),
+        ("/metrics", None),
+    ])
+    def test_note_key(self, path, key):
+        """Test which requests are pinned to a note's worker"""
+        assert note_key(path) == key
+
+    @pytest.mark.asyncio
+    async def test_requests_reach_the_owning_worker(self):
+        """Test that note requests go to the ring owner and the rest to the coordinator"""
+        def echo_worker(request: httpx.Request) -> httpx.Response:
+            body = json.dumps({"worker": f"http://{request.url.host}:{request.url.port}"}).encode()
+            # Streamed like a real worker's response, which the router relays as-is
+            return httpx.Response(200, headers={"content-type": "application/json"}, stream=httpx.ByteStream(body))
+
+        proxy = ClusterProxy(WORKERS, client=httpx.AsyncClient(transport=httpx.MockTransport(echo_worker)))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=proxy), base_url="http://router") as client:
+            for note_id in ("a", "b", "c", "d"):
+                response = await client.get(f"/api/v1/notes/{note_id}")
+                assert response.json()["worker"] == proxy.ring.node_for(note_id)
+            response = await client.get("/api/v1/notes")
+            assert response.json()["worker"] == proxy.coordinator == min(WORKERS)
+
+    @pytest.mark.asyncio
+    async def test_failed_workers_leave_the_ring(self):
+        """Test that a worker failing its health checks is dropped, then re-added"""
+        down = {WORKERS[1]}
+
+        def health(request: httpx.Request) -> httpx.Response:
+            worker = f"http://{request.url.host}:{request.url.port}"
+            return httpx.Response(503 if worker in down else 200)
+
+        proxy = ClusterProxy(WORKERS, max_failures=2, client=httpx.AsyncClient(transport=httpx.MockTransport(health)))
+        await proxy.check_workers()
+        assert WORKERS[1] in proxy.ring
+        await proxy.check_workers()
+        assert WORKERS[1] not in proxy.ring
+        assert proxy.rebalances == 1
+
+        down.clear()
+        await proxy.check_workers()
+        assert proxy.ring.nodes == sorted(WORKERS)
+
+
+class TestSharedDatabaseWorkers:
+
+    @pytest.fixture
+    def workers(self, test_engine):
+        """Two services on one database, as cluster workers are"""
+        first = NoteService(storage=SQLNoteStorage(test_engine), feed=MagicMock(), index_max_age=0.0)
+        second = NoteService(storage=SQLNoteStorage(test_engine), feed=MagicMock(), index_max_age=0.0)
+        first.load_index()
+        second.load_index()
+        return first, second
+
+    def test_notes_created_elsewhere_are_found(self, workers):
+        """Test that an index miss is read through from storage"""
+        first, second = workers
+        second.index_max_age = 3600
+        note = first.create_note(NoteCreate(title="Elsewhere", content=""), owner_uid="uid-1")
+
+        assert second.can_access(note.id, "uid-1")
+        assert not second.can_access(note.id, "uid-2")
+        assert second.is_owner(note.id, "uid-1")
+
+    def test_misses_read_only_that_notes_shares(self, workers, monkeypatch):
+        """Test that a read-through fetches one note's shares, not the whole share table"""
+        first, second = workers
+        second.index_max_age = 3600
+        note = first.create_note(NoteCreate(title="Shared", content=""), owner_uid="uid-1")
+        first.share_note(note.id, "uid-2")
+        monkeypatch.setattr(second.storage, "list_shares", MagicMock(side_effect=AssertionError("full scan")))
+
+        assert second.can_access(note.id, "uid-2")
+        assert not second.can_access(note.id, "uid-3")
+
+    def test_scoped_import_keeps_notes_created_elsewhere(self, workers, monkeypatch):
+        """Test that an import cannot claim a note another worker created since the last refresh"""
+        first, second = workers
+        second.index_max_age = 3600
+        note = first.create_note(NoteCreate(title="Mine", content="secret"), owner_uid="alice")
+        monkeypatch.setattr(app.services.backup_service, "note_service", second)
+        importer = NoteImporter(owner_uid="mallory", scoped=True)
+        record = {"id": note.id, "title": "pwned", "content": "", "created_at": note.created_at, "updated_at": note.updated_at}
+
+        assert importer.write([record]) == 0
+        assert importer.skipped == 1
+        stored = first.get_note(note.id)
+        assert (stored.title, stored.owner_uid) == ("Mine", "alice")
+
+    def test_refresh_publishes_other_workers_changes(self, workers):
+        """Test that a stale index is reloaded and the differences announced"""
+        first, second = workers
+        note = first.create_note(NoteCreate(title="Draft", content=""))
+
+        assert [item.id for item in second.get_all_notes()] == [note.id]
+        second.feed.publish_added.assert_called_once()
+
+        first.update_note(note.id, NoteUpdate(title="Final"))
+        assert second.get_all_notes()[0].title == "Final"
+        second.feed.publish_updated.assert_called_once()
+
+        first.delete_note(note.id)
+        assert second.get_all_notes() == []
+        second.feed.publish_removed.assert_called_once_with(note.id, {None})
+
+
+class TestReleaseEndpoint:
+
+    def test_hidden_without_cluster_token(self, client, monkeypatch):
+        """Test that the hand-over route needs the shared cluster token"""
+        import app.routers.cluster
+        monkeypatch.setattr(app.routers.cluster, "CLUSTER_TOKEN", "secret")
+
+        assert client.post("/internal/cluster/release", json={"note_ids": []}).status_code == 404
+        response = client.post(
+            "/internal/cluster/release", json={"note_ids": ["a"]}, headers={"X-Cluster-Token": "secret"}
+        )
+        assert response.json() == {"released": 1, "flushed": 0}
+
+    def test_release_saves_pending_edits(self, client, created_note, monkeypatch):
+        """Test that releasing a note persists its debounced edit right away"""
+        import app.routers.cluster
+        monkeypatch.setattr(app.routers.cluster, "CLUSTER_TOKEN", "secret")
+        # Keep the debounced save from firing on its own during the test
+        monkeypatch.setattr(websocket_service, "debounce_policy", DebouncePolicy(min_delay=30, max_delay=30, max_wait=30))
+        with client.websocket_connect(f"/ws/{created_note['id']}?user_name=alice") as websocket:
+            websocket.receive_json()
+            websocket.send_json({"type": "content_change", "content": "moving out"})
+            # Messages are handled in order, so the error reply means the edit is pending
+            websocket.send_json({"type": "barrier"})
+            assert websocket.receive_json()["type"] == "error"
+            response = client.post(
+                "/internal/cluster/release",
+                json={"note_ids": [created_note["id"]]},
+                headers={"X-Cluster-Token": "secret"},
+            )
+
+        assert response.json()["flushed"] == 1
+        assert client.get(f"/api/v1/notes/{created_note['id']}").json()["content"] == "moving out"
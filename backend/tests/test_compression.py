@@ -0,0 +1,98 @@
+import pytest
+import app.database
+from sqlalchemy import text
+from sqlmodel import Session
+from app.models.note import NoteCreate, NoteUpdate
+from app.services.note_service import NoteService
+from app.storage.compression import ZLIB_MAGIC, ContentCodec, get_codec, set_codec
+from app.storage.log import LogNoteStorage
+from app.storage.sql import SQLNoteStorage
+
+LARGE_CONTENT = "# Meeting notes\n\n" + "- discussed the roadmap and next steps\n" * 200
+
+
+@pytest.fixture
+def zlib_codec():
+    original = get_codec()
+    set_codec(ContentCodec("zlib", min_bytes=256))
+    yield get_codec()
+    set_codec(original)
+
+
+class TestContentCodec:
+    
+    def test_roundtrip(self):
+        """Test that compressed content decodes back to the original text"""
+        codec = ContentCodec("zlib", min_bytes=16)
+        
+        encoded = codec.encode(LARGE_CONTENT)
+        
+        assert isinstance(encoded, bytes)
+        assert encoded.startswith(ZLIB_MAGIC)
+        assert len(encoded) < len(LARGE_CONTENT)
+        assert codec.decode(encoded) == LARGE_CONTENT
+    
+    def test_small_content_stays_plain(self):
+        """Test that content below the threshold is stored as-is"""
+        codec = ContentCodec("zlib", min_bytes=1024)
+        assert codec.encode("short note") == "short note"
+    
+    def test_disabled_codec_still_reads_compressed_rows(self):
+        """Test that turning compression off keeps existing blobs readable"""
+        blob = ContentCodec("zlib", min_bytes=16).encode(LARGE_CONTENT)
+        assert ContentCodec("none").decode(blob) == LARGE_CONTENT
+        assert ContentCodec("none").encode(LARGE_CONTENT) == LARGE_CONTENT
+    
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            ContentCodec("lz4")
+
+
+class TestCompressedStorage:
+    
+    def test_refused_outside_sqlite(self, zlib_codec, monkeypatch):
+        """Test that compression cannot be enabled on a database with strict column types"""
+        monkeypatch.setattr(app.database, "DATABASE_URL", "postgresql://notes@localhost/notes")
+        
+        with pytest.raises(ValueError, match="NOTES_COMPRESSION"):
+            app.database._create_engine()
+    
+    def test_sql_rows_are_compressed_transparently(self, test_engine, zlib_codec):
+        """Test that callers see plain strings while the row holds a blob"""
+        service = NoteService(storage=SQLNoteStorage(test_engine))
+        note = service.create_note(NoteCreate(title="Big", content=LARGE_CONTENT))
+        
+        with Session(test_engine) as session:
+            raw = session.execute(text("SELECT content FROM note WHERE id = :id"), {"id": note.id}).scalar_one()
+        
+        assert isinstance(raw, bytes) and raw.startswith(ZLIB_MAGIC)
+        assert service.get_note(note.id).content == LARGE_CONTENT
+    
+    def test_legacy_rows_migrate_on_next_write(self, test_engine, zlib_codec):
+        """Test that uncompressed rows stay readable and are compressed when rewritten"""
+        service = NoteService(storage=SQLNoteStorage(test_engine))
+        with Session(test_engine) as session:
+            session.execute(text(
+                "INSERT INTO note (id, title, content, created_at, updated_at) "
+                "VALUES ('legacy', 'Old', :content, '2024-01-01 00:00:00', '2024-01-01 00:00:00')"
+            ), {"content": LARGE_CONTENT})
+            session.commit()
+        
+        assert service.get_note("legacy").content == LARGE_CONTENT
+        
+        service.update_note("legacy", NoteUpdate(content=LARGE_CONTENT + "more\n"))
+        with Session(test_engine) as session:
+            raw = session.execute(text("SELECT content FROM note WHERE id = 'legacy'")).scalar_one()
+        assert isinstance(raw, bytes)
+    
+    def test_log_records_are_compressed(self, tmp_path, zlib_codec):
+        """Test compressed payloads in the log engine survive a restart"""
+        storage = LogNoteStorage(str(tmp_path), compaction_interval=None)
+        service = NoteService(storage=storage)
+        note = service.create_note(NoteCreate(title="Big", content=LARGE_CONTENT))
+        storage.close()
+        
+        assert sum(p.stat().st_size for p in tmp_path.iterdir()) < len(LARGE_CONTENT)
+        reopened = LogNoteStorage(str(tmp_path), compaction_interval=None)
+        assert reopened.get(note.id).content == LARGE_CONTENT
+        reopened.close()
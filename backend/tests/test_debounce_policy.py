@@ -0,0 +1,33 @@
+import pytest
+from app.services.debounce import DebouncePolicy
+
+
+class TestDebouncePolicy:
+    
+    @pytest.fixture
+    def policy(self):
+        return DebouncePolicy(min_delay=0.3, max_delay=2.0, max_wait=5.0)
+    
+    def test_single_edit_uses_min_delay(self, policy):
+        """Test that an isolated small edit waits the minimum quiet window"""
+        assert policy.next_delay(now=10.0, first_pending_at=10.0, edits=1, content_size=10) == pytest.approx(0.3, abs=0.01)
+    
+    def test_fast_typing_widens_window(self, policy):
+        """Test that a high edit rate coalesces into a longer quiet window"""
+        slow = policy.next_delay(now=11.0, first_pending_at=10.0, edits=2, content_size=10)
+        fast = policy.next_delay(now=11.0, first_pending_at=10.0, edits=20, content_size=10)
+        assert fast > slow
+        assert fast <= policy.max_delay
+    
+    def test_large_note_widens_window(self, policy):
+        """Test that larger notes are saved less eagerly"""
+        small = policy.quiet_window(edit_rate=0, content_size=100)
+        large = policy.quiet_window(edit_rate=0, content_size=128 * 1024)
+        assert large > small
+    
+    def test_max_wait_bounds_continuous_typing(self, policy):
+        """Test that a burst never stays unsaved beyond max_wait"""
+        delay = policy.next_delay(now=14.9, first_pending_at=10.0, edits=200, content_size=10)
+        assert delay == pytest.approx(0.1)
+        
+        assert policy.next_delay(now=16.0, first_pending_at=10.0, edits=300, content_size=10) == 0.0
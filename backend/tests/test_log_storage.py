@@ -0,0 +1,194 @@
+import os
+import pytest
+from datetime import datetime
+from app.models.note import Note, NoteCreate, NoteUpdate
+from app.services.note_service import NoteService
+from app.storage.log import LogCorruptionError, LogNoteStorage
+
+
+def make_note(note_id, content="content"):
+    now = datetime(2024, 1, 1, 12, 0)
+    return Note(id=note_id, title=f"Title {note_id}", content=content, created_at=now, updated_at=now)
+
+
+def segment_paths(directory):
+    return sorted(p for p in directory.iterdir() if p.suffix == ".log")
+
+
+class TestLogNoteStorage:
+    
+    @pytest.fixture
+    def open_storage(self, tmp_path):
+        opened = []
+        
+        def _open(**kwargs):
+            kwargs.setdefault("compaction_interval", None)
+            storage = LogNoteStorage(str(tmp_path), **kwargs)
+            opened.append(storage)
+            return storage
+        
+        yield _open
+        for storage in opened:
+            storage.close()
+    
+    def test_write_and_read_back(self, open_storage):
+        """Test basic create/update/get/delete"""
+        storage = open_storage()
+        storage.create(make_note("a"))
+        storage.update("a", {"content": "changed"})
+        storage.create(make_note("b"))
+        
+        assert storage.get("a").content == "changed"
+        assert storage.delete("b") is True
+        assert storage.delete("b") is False
+        assert storage.get("b") is None
+        assert [item.id for item in storage.list_items()] == ["a"]
+    
+    def test_reopen_replays_log(self, open_storage):
+        """Test that the index is rebuilt from segments after a restart"""
+        storage = open_storage(segment_max_bytes=200)
+        for i in range(10):
+            storage.create(make_note(str(i), content="x" * 50))
+        storage.update("3", {"title": "renamed"})
+        storage.delete("4")
+        storage.close()
+        
+        reopened = open_storage(segment_max_bytes=200)
+        
+        assert len(reopened.list_items()) == 9
+        assert reopened.get("3").title == "renamed"
+        assert reopened.get("4") is None
+        assert reopened.get("9").content == "x" * 50
+    
+    def test_torn_tail_is_truncated(self, open_storage, tmp_path):
+        """Test crash recovery when the last append was only partially written"""
+        storage = open_storage()
+        storage.create(make_note("a"))
+        storage.create(make_note("b"))
+        storage.close()
+        
+        path = segment_paths(tmp_path)[-1]
+        good_size = path.stat().st_size
+        with open(path, "ab") as f:
+            f.write(b"\x01\x02\x03\x04\xff\x00")  # header of a record that never made it
+        
+        reopened = open_storage()
+        
+        assert reopened.get("a") is not None and reopened.get("b") is not None
+        assert path.stat().st_size == good_size
+        assert reopened.stats["recovered_truncations"] == 1
+        
+        reopened.create(make_note("c"))
+        reopened.close()
+        assert open_storage().get("c") is not None
+    
+    def test_corrupt_last_record_is_dropped(self, open_storage, tmp_path):
+        """Test that a checksum mismatch in the tail discards only that record"""
+        storage = open_storage()
+        storage.create(make_note("a"))
+        storage.update("a", {"content": "second version"})
+        storage.close()
+        
+        path = segment_paths(tmp_path)[-1]
+        with open(path, "r+b") as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b"???")
+        
+        assert open_storage().get("a").content == "content"
+    
+    def test_corrupt_sealed_segment_raises(self, open_storage, tmp_path):
+        """Test that damage outside the tail is reported instead of silently skipped"""
+        storage = open_storage(segment_max_bytes=150)
+        for i in range(4):
+            storage.create(make_note(str(i), content="y" * 40))
+        storage.close()
+        
+        first = segment_paths(tmp_path)[0]
+        with open(first, "r+b") as f:
+            f.seek(10)
+            f.write(b"!!")
+        
+        with pytest.raises(LogCorruptionError):
+            LogNoteStorage(str(tmp_path), compaction_interval=None)
+    
+    def test_owner_and_shares_survive_updates_and_compaction(self, open_storage):
+        """Test that ownership and share grants are kept in the note's record"""
+        storage = open_storage(segment_max_bytes=300)
+        note = make_note("a")
+        note.owner_uid = "bob"
+        storage.create(note)
+        assert storage.add_share("a", "alice") is True
+        assert storage.add_share("missing", "alice") is False
+        for i in range(10):
+            storage.update("a", {"content": f"version {i}"})
+        storage.compact()
+        storage.close()
+        
+        reopened = open_storage(segment_max_bytes=300)
+        assert reopened.get("a").owner_uid == "bob"
+        assert reopened.list_items()[0].owner_uid == "bob"
+        assert reopened.list_shares() == [("a", "alice")]
+        assert reopened.shares_of("a") == ["alice"] and reopened.shares_of("missing") == []
+        assert reopened.remove_share("a", "alice") is True
+        assert reopened.list_shares() == []
+    
+    def test_compaction_reclaims_space(self, open_storage, tmp_path):
+        """Test that compaction keeps live data and drops superseded records"""
+        storage = open_storage(segment_max_bytes=300)
+        storage.create(make_note("keep"))
+        storage.create(make_note("gone"))
+        for i in range(20):
+            storage.update("keep", {"content": f"version {i}"})
+        storage.delete("gone")
+        
+        assert storage.garbage_ratio() > 0.5
+        reclaimed = storage.compact()
+        
+        assert reclaimed > 0
+        assert storage.get("keep").content == "version 19"
+        assert storage.get("gone") is None
+        storage.close()
+        
+        reopened = open_storage(segment_max_bytes=300)
+        assert reopened.get("keep").content == "version 19"
+        assert reopened.get("gone") is None
+    
+    def test_interrupted_compaction_is_completed_on_open(self, open_storage, tmp_path):
+        """Test recovery when a crash happens after the compacted segment was written"""
+        storage = open_storage(segment_max_bytes=150)
+        for i in range(6):
+            storage.create(make_note(str(i), content="z" * 40))
+        storage.close()
+        
+        # Simulate a finished .compact file whose old segments were never removed
+        segments = segment_paths(tmp_path)
+        target = segments[-2]
+        compacted = target.with_suffix(".compact")
+        compacted.write_bytes(b"".join(p.read_bytes() for p in segments[:-1]))
+        (tmp_path / "segment-00000099.compact.tmp").write_bytes(b"partial")
+        
+        reopened = open_storage(segment_max_bytes=150)
+        
+        assert len(reopened.list_items()) == 6
+        assert not list(tmp_path.glob("*.compact*"))
+        assert len(segment_paths(tmp_path)) == 2
+
+
+class TestNoteServiceOnLogStorage:
+    
+    def test_service_roundtrip(self, tmp_path):
+        """Test NoteService end to end on the log engine"""
+        service = NoteService(storage=LogNoteStorage(str(tmp_path), compaction_interval=None))
+        
+        note = service.create_note(NoteCreate(title="Log", content="Backed by segments"))
+        service.update_note(note.id, NoteUpdate(content="Edited"))
+        
+        assert service.get_note(note.id).content == "Edited"
+        assert [item.id for item in service.get_all_notes()] == [note.id]
+        assert service.check_index_consistency()["consistent"] is True
+        assert [row["id"] for row in service.iter_notes()] == [note.id]
+        assert [row["id"] for row in service.iter_notes(scoped=True)] == [note.id]
+        assert list(service.iter_notes(owner_uid="uid-1", scoped=True)) == []
+        service.share_note(note.id, "uid-1")
+        assert [row["id"] for row in service.iter_notes(owner_uid="uid-1", scoped=True)] == [note.id]
+        service.close()
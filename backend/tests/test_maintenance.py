@@ -0,0 +1,142 @@
+import pytest
+from sqlalchemy import delete, event
+from sqlmodel import Session, SQLModel, create_engine
+from app.auth.firebase_auth import require_admin
+from app.database import configure_sqlite_connection
+from app.main import app as fastapi_app
+from app.models.note import Note
+from app.services.maintenance import DatabaseMaintenance, MaintenancePolicy
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """A file-backed SQLite engine configured like the app's own"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'notes.db'}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", lambda dbapi_connection, _: configure_sqlite_connection(dbapi_connection))
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def write_notes(engine, count: int, size: int = 4000):
+    with Session(engine) as session:
+        for i in range(count):
+            session.add(Note(id=f"note-{i}", title=f"Note {i}", content="x" * size))
+        session.commit()
+
+
+def delete_notes(engine):
+    with Session(engine) as session:
+        session.exec(delete(Note))
+        session.commit()
+
+
+class TestDatabaseMaintenance:
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_truncates_wal(self, file_engine):
+        """Test that an idle checkpoint folds the WAL back and reports the bytes"""
+        write_notes(file_engine, 50)
+        maintenance = DatabaseMaintenance(lambda: file_engine, policy=MaintenancePolicy())
+        assert maintenance.stats()["wal_bytes"] > 0
+
+        result = await maintenance.run("checkpoint")
+
+        assert result["mode"] == "TRUNCATE"
+        assert result["reclaimed_bytes"] > 0
+        assert maintenance.stats()["wal_bytes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_incremental_vacuum_reclaims_deleted_pages(self, file_engine):
+        """Test that pages freed by deletes are returned to the filesystem"""
+        write_notes(file_engine, 100)
+        delete_notes(file_engine)
+        maintenance = DatabaseMaintenance(lambda: file_engine, policy=MaintenancePolicy())
+
+        result = await maintenance.run("vacuum")
+
+        assert result["mode"] == "incremental"
+        assert result["reclaimed_bytes"] > 0
+        assert result["free_pages"] == 0
+        assert maintenance.stats()["tasks"]["vacuum"]["reclaimed_bytes"] == result["reclaimed_bytes"]
+
+    @pytest.mark.asyncio
+    async def test_fragmented_legacy_database_is_rebuilt(self, tmp_path):
+        """Test that a database without incremental vacuum gets one full VACUUM"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        SQLModel.metadata.create_all(engine)
+        write_notes(engine, 100)
+        delete_notes(engine)
+        maintenance = DatabaseMaintenance(lambda: engine, policy=MaintenancePolicy())
+
+        result = await maintenance.run("vacuum")
+
+        assert result["mode"] == "full"
+        assert result["reclaimed_bytes"] > 0
+        assert (await maintenance.run("vacuum"))["mode"] == "incremental"
+        engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_optimize_and_integrity_check(self, file_engine):
+        """Test that optimize and quick_check run and record timings"""
+        write_notes(file_engine, 10)
+        maintenance = DatabaseMaintenance(lambda: file_engine, policy=MaintenancePolicy())
+
+        results = await maintenance.run_all(("optimize", "integrity"))
+
+        assert results["integrity"]["ok"] is True
+        assert results["integrity"]["check"] == "quick_check"
+        stats = maintenance.stats()["tasks"]
+        assert stats["optimize"]["runs"] == 1
+        assert stats["integrity"]["last_duration_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_busy_server_defers_heavy_tasks(self, file_engine):
+        """Test that load postpones vacuum but checkpoints go on in PASSIVE mode"""
+        policy = MaintenancePolicy(max_defer=60, poll_interval=5)
+        maintenance = DatabaseMaintenance(lambda: file_engine, load=lambda: 3, policy=policy)
+        maintenance._due = {"checkpoint": 0, "vacuum": 0, "optimize": 0, "integrity": 1e9}
+
+        results = await maintenance.tick(now=100)
+
+        assert set(results) == {"checkpoint"}
+        assert results["checkpoint"]["mode"] == "PASSIVE"
+        assert maintenance.stats()["tasks"]["vacuum"]["deferred"] == 1
+
+        # Once deferred for max_defer, the task runs despite the load
+        results = await maintenance.tick(now=161)
+        assert {"vacuum", "optimize"} <= set(results)
+
+    def test_disabled_for_non_sqlite_storage(self):
+        """Test that nothing is scheduled without a SQLite engine"""
+        maintenance = DatabaseMaintenance(lambda: None, policy=MaintenancePolicy())
+
+        assert maintenance.start() is False
+        assert maintenance.stats()["enabled"] is False
+
+
+class TestMaintenanceEndpoint:
+
+    def test_requires_authentication(self, client):
+        """Test that anonymous callers are rejected"""
+        assert client.post("/api/v1/admin/maintenance").status_code == 401
+
+    def test_admin_runs_single_task(self, client):
+        """Test running one task on demand and reading it back from metrics"""
+        fastapi_app.dependency_overrides[require_admin] = lambda: {"uid": "admin"}
+        try:
+            response = client.post("/api/v1/admin/maintenance?task=integrity")
+        finally:
+            fastapi_app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.json()["integrity"]["ok"] is True
+        metrics = client.get("/metrics").json()["maintenance"]
+        assert metrics["tasks"]["integrity"]["runs"] >= 1
+
+    def test_metrics_hide_files_and_results(self, client):
+        """Test that /metrics reports counts and durations but no file sizes or check output"""
+        metrics = client.get("/metrics").json()["maintenance"]
+
+        assert "database_bytes" not in metrics and "wal_bytes" not in metrics
+        assert all("last_result" not in task and "reclaimed_bytes" not in task for task in metrics["tasks"].values())
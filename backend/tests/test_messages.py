@@ -0,0 +1,53 @@
+import pytest
+from datetime import datetime, timezone
+from app.models.messages import (
+    ContentChange, CursorPosition, InvalidMessage, Subscribe, UnknownMessage, decode_message, parse_message
+)
+from app.services.clock import utc_timestamp
+
+
+class TestDecodeMessage:
+
+    def test_frames_decode_to_their_struct(self):
+        """Test that each message type gets its own typed struct"""
+        change = decode_message('{"type": "content_change", "content": "hi", "timestamp": "ignored"}')
+        assert change == ContentChange(content="hi")
+        assert decode_message(b'{"type": "cursor_position", "position": 3}') == CursorPosition(position=3)
+        assert decode_message('{"type": "subscribe", "note_id": "n1"}') == Subscribe(note_id="n1")
+
+    def test_missing_fields_take_defaults(self):
+        """Test that optional fields default as the dict-based handlers did"""
+        assert decode_message('{"type": "content_change"}').content == ""
+        assert decode_message('{"type": "typing_indicator"}').is_typing is False
+
+    def test_unknown_types_are_kept_for_the_error_reply(self):
+        """Test that unhandled types decode rather than fail, keeping type and note_id"""
+        assert decode_message('{"type": "nope", "note_id": "n1"}') == UnknownMessage(type="nope", note_id="n1")
+        assert decode_message('{"content": "no type"}') == UnknownMessage()
+
+    @pytest.mark.parametrize("frame, error", [
+        ("{not json", "Invalid JSON format"),
+        ("[1, 2]", "Message must be a JSON object"),
+        ('{"type": "content_change", "content": 5}', "Invalid content_change message: content"),
+        ('{"type": "cursor_position", "position": "end"}', "Invalid cursor_position message: position"),
+    ])
+    def test_malformed_frames_are_rejected(self, frame, error):
+        """Test that bad frames raise InvalidMessage with a client-facing reason"""
+        with pytest.raises(InvalidMessage, match=error):
+            decode_message(frame)
+
+    def test_parse_message_accepts_dicts(self):
+        """Test that callers holding a parsed dict get the same structs"""
+        assert parse_message({"type": "content_change", "content": "x"}) == ContentChange(content="x")
+
+
+class TestUtcTimestamp:
+
+    def test_matches_isoformat(self):
+        """Test that the cached clock formats like datetime.isoformat() and tracks real time"""
+        stamp = utc_timestamp()
+        parsed = datetime.fromisoformat(stamp)
+
+        assert stamp.endswith("+00:00") and len(stamp) == len("2024-01-01T00:00:00.000000+00:00")
+        assert abs((datetime.now(timezone.utc) - parsed).total_seconds()) < 1
+        assert utc_timestamp() >= stamp
@@ -0,0 +1,162 @@
+import json
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel.pool import StaticPool
+from starlette.websockets import WebSocketDisconnect
+from app.main import app as fastapi_app
+from app.auth.firebase_auth import get_current_user
+from app.database import migrate_note_ownership
+
+
+def as_user(uid):
+    return {"X-Test-Uid": uid}
+
+
+@pytest.fixture
+def users(client, monkeypatch):
+    """Authenticate requests by the X-Test-Uid header and websockets by ?token=<uid>"""
+    def fake_current_user(request: Request):
+        uid = request.headers.get("X-Test-Uid")
+        return {"uid": uid} if uid else None
+    
+    fastapi_app.dependency_overrides[get_current_user] = fake_current_user
+    monkeypatch.setattr("app.routers.websockets.verify_token", lambda token: {"uid": token})
+    yield
+    fastapi_app.dependency_overrides.pop(get_current_user, None)
+
+
+def create(client, title, uid=None):
+    headers = as_user(uid) if uid else {}
+    response = client.post("/api/v1/notes", json={"title": title, "content": "text"}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestNoteOwnership:
+    
+    def test_list_is_scoped_to_caller(self, client, users):
+        """Test that users list only their notes and anonymous callers only unowned ones"""
+        alice_note = create(client, "Alice's", "alice")
+        create(client, "Bob's", "bob")
+        public = create(client, "Public")
+        
+        assert alice_note["owner_uid"] == "alice"
+        assert [n["id"] for n in client.get("/api/v1/notes", headers=as_user("alice")).json()] == [alice_note["id"]]
+        assert [n["id"] for n in client.get("/api/v1/notes").json()] == [public["id"]]
+    
+    def test_other_users_cannot_read_or_change(self, client, users):
+        """Test that a stranger gets 404 for someone else's note"""
+        note = create(client, "Private", "alice")
+        
+        assert client.get(f"/api/v1/notes/{note['id']}", headers=as_user("bob")).status_code == 404
+        assert client.get(f"/api/v1/notes/{note['id']}").status_code == 404
+        assert client.put(f"/api/v1/notes/{note['id']}", json={"title": "x"}, headers=as_user("bob")).status_code == 404
+        assert client.delete(f"/api/v1/notes/{note['id']}", headers=as_user("bob")).status_code == 404
+        assert client.get(f"/api/v1/notes/{note['id']}", headers=as_user("alice")).status_code == 200
+    
+    def test_sharing_grants_edit_but_not_delete(self, client, users):
+        """Test that a sharee can list and edit a note but only the owner deletes it"""
+        note = create(client, "Shared", "alice")
+        
+        response = client.post(f"/api/v1/notes/{note['id']}/shares", json={"uid": "bob"}, headers=as_user("alice"))
+        assert response.status_code == 200
+        assert client.get(f"/api/v1/notes/{note['id']}/shares", headers=as_user("alice")).json() == ["bob"]
+        
+        assert [n["id"] for n in client.get("/api/v1/notes", headers=as_user("bob")).json()] == [note["id"]]
+        updated = client.put(f"/api/v1/notes/{note['id']}", json={"content": "edited"}, headers=as_user("bob"))
+        assert updated.status_code == 200
+        assert client.delete(f"/api/v1/notes/{note['id']}", headers=as_user("bob")).status_code == 403
+        assert client.post(f"/api/v1/notes/{note['id']}/shares", json={"uid": "carol"}, headers=as_user("bob")).status_code == 403
+        
+        assert client.delete(f"/api/v1/notes/{note['id']}/shares/bob", headers=as_user("alice")).status_code == 200
+        assert client.get(f"/api/v1/notes/{note['id']}", headers=as_user("bob")).status_code == 404
+    
+    def test_import_cannot_overwrite_other_users_notes(self, client, users):
+        """Test that imported notes are claimed by the caller and foreign ids are skipped"""
+        theirs = create(client, "Bob's", "bob")
+        body = (
+            json.dumps({"id": theirs["id"], "title": "Hijack", "content": "x"}) + "\n"
+            + json.dumps({"id": "new-note", "title": "Mine", "content": "y", "owner_uid": "bob"}) + "\n"
+        )
+        
+        response = client.post("/api/v1/notes/import", content=body, headers=as_user("alice"))
+        
+        assert response.json() == {"imported": 1, "skipped": 1}
+        assert client.get(f"/api/v1/notes/{theirs['id']}", headers=as_user("bob")).json()["title"] == "Bob's"
+        assert client.get("/api/v1/notes/new-note", headers=as_user("alice")).json()["owner_uid"] == "alice"
+    
+    def test_export_contains_only_visible_notes(self, client, users):
+        """Test that an export holds the notes the caller's list shows and no others"""
+        mine = create(client, "Mine", "alice")
+        shared = create(client, "Bob's shared", "bob")
+        create(client, "Bob's", "bob")
+        public = create(client, "Public")
+        client.post(f"/api/v1/notes/{shared['id']}/shares", json={"uid": "alice"}, headers=as_user("bob"))
+        
+        def exported(headers):
+            lines = client.get("/api/v1/notes/export", headers=headers).text.splitlines()
+            return sorted(json.loads(line)["id"] for line in lines)
+        
+        assert exported(as_user("alice")) == sorted([mine["id"], shared["id"]])
+        assert exported({}) == [public["id"]]
+    
+    def test_websocket_rooms_require_access(self, client, users):
+        """Test that an owned note's room only admits the owner and sharees"""
+        note = create(client, "Private", "alice")
+        
+        with pytest.raises(WebSocketDisconnect):
+            with client.websocket_connect(f"/ws/{note['id']}?user_name=Eve") as websocket:
+                websocket.receive_text()
+        
+        with client.websocket_connect(f"/ws/{note['id']}?user_name=Alice&token=alice") as websocket:
+            assert json.loads(websocket.receive_text())["type"] == "snapshot"
+    
+    def test_invalid_token_is_refused(self, client, users, monkeypatch):
+        """Test that a bad token closes the socket instead of joining anonymously"""
+        def reject(token):
+            raise HTTPException(status_code=401, detail="expired")
+        monkeypatch.setattr("app.routers.websockets.verify_token", reject)
+        public = create(client, "Public")
+        
+        for path in (f"/ws/{public['id']}", "/ws", "/ws/notes/index"):
+            with pytest.raises(WebSocketDisconnect) as closed:
+                with client.websocket_connect(f"{path}?token=stale") as websocket:
+                    websocket.receive_text()
+            assert closed.value.code == 1008
+    
+    def test_index_feed_is_scoped(self, client, users):
+        """Test that list diffs only reach users whose list shows the note"""
+        with client.websocket_connect("/ws/notes/index?token=bob") as bob_feed:
+            assert json.loads(bob_feed.receive_text())["notes"] == []
+            
+            create(client, "Alice's", "alice")
+            shared = create(client, "For Bob", "alice")
+            client.post(f"/api/v1/notes/{shared['id']}/shares", json={"uid": "bob"}, headers=as_user("alice"))
+            
+            diff = json.loads(bob_feed.receive_text())
+            assert diff["seq"] == 1
+            assert [n["id"] for n in diff["added"]] == [shared["id"]]
+
+
+class TestOwnershipMigration:
+    
+    def test_adds_owner_column_to_existing_table(self, monkeypatch):
+        """Test that a pre-ownership database gains owner_uid and its index"""
+        engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE note (id VARCHAR PRIMARY KEY, title VARCHAR, content TEXT, "
+                "created_at DATETIME, updated_at DATETIME)"
+            ))
+            connection.execute(text("INSERT INTO note VALUES ('a', 't', 'c', '2024-01-01', '2024-01-01')"))
+        monkeypatch.setenv("NOTES_LEGACY_OWNER_UID", "alice")
+        
+        migrate_note_ownership(engine)
+        migrate_note_ownership(engine)
+        
+        inspector = inspect(engine)
+        assert "owner_uid" in {column["name"] for column in inspector.get_columns("note")}
+        assert "ix_note_owner_uid_updated_at" in {index["name"] for index in inspector.get_indexes("note")}
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT owner_uid FROM note")).scalar() == "alice"
@@ -1,3 +1,5 @@
+import gzip
+import json
 import pytest
 from fastapi.testclient import TestClient
 
@@ -9,6 +11,15 @@ class TestNotesAPI:
         assert response.status_code == 200
         assert response.json() == {"status": "healthy"}
     
+    def test_metrics(self, client):
+        """Test that scheduler metrics are exposed"""
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        scheduler = response.json()["scheduler"]
+        assert "avg_schedule_us" in scheduler
+        assert "pending" in scheduler
+    
     def test_create_note_success(self, client, sample_note_data):
         """Test creating a new note successfully"""
         response = client.post("/api/v1/notes", json=sample_note_data)
@@ -61,6 +72,21 @@ class TestNotesAPI:
         for created_note in multiple_notes:
             assert created_note["id"] in note_ids
     
+    def test_get_all_notes_pagination(self, client, multiple_notes):
+        """Test that the list is served newest first with offset/limit"""
+        client.put(f"/api/v1/notes/{multiple_notes[0]['id']}", json={"title": "Touched"})
+        
+        response = client.get("/api/v1/notes?offset=0&limit=2")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert data[0]["id"] == multiple_notes[0]["id"]
+        assert data[0]["title"] == "Touched"
+        
+        response = client.get("/api/v1/notes?offset=2&limit=2")
+        assert len(response.json()) == 1
+    
     def test_get_note_by_id_success(self, client, created_note):
         """Test getting a specific note by ID"""
         note_id = created_note["id"]
@@ -136,4 +162,43 @@ class TestNotesAPI:
         """Test deleting a note that doesn't exist"""
         response = client.delete("/api/v1/notes/nonexistent-id")
         assert response.status_code == 404
-        assert "Note not found" in response.json()["detail"]
\ No newline at end of file
+        assert "Note not found" in response.json()["detail"]
+    
+    def test_export_notes_ndjson(self, client, multiple_notes):
+        """Test streaming the notes table as NDJSON"""
+        response = client.get("/api/v1/notes/export")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert {r["id"] for r in records} == {n["id"] for n in multiple_notes}
+        assert all("content" in r for r in records)
+    
+    def test_export_notes_gzip(self, client, multiple_notes):
+        """Test gzip-compressed export"""
+        response = client.get("/api/v1/notes/export?gzip=true")
+        
+        assert response.status_code == 200
+        lines = gzip.decompress(response.content).decode().splitlines()
+        assert len(lines) == 3
+    
+    def test_import_notes_roundtrip(self, client, multiple_notes):
+        """Test that an export can be deleted and imported back"""
+        exported = client.get("/api/v1/notes/export?gzip=true").content
+        for note in multiple_notes:
+            client.delete(f"/api/v1/notes/{note['id']}")
+        
+        response = client.post("/api/v1/notes/import", content=exported)
+        
+        assert response.status_code == 200
+        assert response.json() == {"imported": 3, "skipped": 0}
+        restored = client.get(f"/api/v1/notes/{multiple_notes[0]['id']}").json()
+        assert restored["content"] == multiple_notes[0]["content"]
+    
+    def test_import_notes_invalid_record(self, client):
+        """Test that a malformed line is rejected with its line number"""
+        body = b'{"id": "a", "title": "A", "content": "ok"}\nnot json\n'
+        response = client.post("/api/v1/notes/import", content=body)
+        
+        assert response.status_code == 400
+        assert "line 2" in response.json()["detail"]
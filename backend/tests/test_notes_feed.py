@@ -0,0 +1,80 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock
+from app.models.note import NoteListItem
+from app.services.notes_feed import NotesFeed
+
+
+def make_item(note_id: str, title: str = "Title") -> NoteListItem:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return NoteListItem(id=note_id, title=title, created_at=now, updated_at=now)
+
+
+def sent_frames(websocket):
+    return [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+
+
+class TestNotesFeed:
+    
+    @pytest.fixture
+    def feed(self):
+        return NotesFeed()
+    
+    @pytest.mark.asyncio
+    async def test_subscribe_sends_current_list(self, feed):
+        """Test that a subscriber first receives the full notes list"""
+        feed.bind(asyncio.get_running_loop())
+        websocket = AsyncMock()
+        await feed.subscribe(websocket, lambda: [make_item("a")])
+        
+        snapshot = sent_frames(websocket)[0]
+        assert snapshot["type"] == "notes_index"
+        assert snapshot["seq"] == 0
+        assert [note["id"] for note in snapshot["notes"]] == ["a"]
+    
+    @pytest.mark.asyncio
+    async def test_changes_are_merged_into_one_diff(self, feed):
+        """Test that changes made before the loop runs become a single frame"""
+        feed.bind(asyncio.get_running_loop())
+        websocket = AsyncMock()
+        await feed.subscribe(websocket, lambda: [make_item("a"), make_item("b")])
+        
+        feed.publish_added(make_item("c", "draft"))
+        feed.publish_updated(make_item("c", "final"))
+        feed.publish_added(make_item("d"))
+        feed.publish_removed("d")
+        feed.publish_updated(make_item("a", "renamed"))
+        feed.publish_removed("b")
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        
+        frames = sent_frames(websocket)
+        assert len(frames) == 2
+        assert frames[1]["type"] == "notes_diff"
+        assert frames[1]["seq"] == 1
+        assert [(note["id"], note["title"]) for note in frames[1]["added"]] == [("c", "final")]
+        assert [(note["id"], note["title"]) for note in frames[1]["updated"]] == [("a", "renamed")]
+        assert frames[1]["removed"] == ["b"]
+    
+    @pytest.mark.asyncio
+    async def test_publish_from_worker_thread(self, feed):
+        """Test that changes published off the event loop are delivered on it"""
+        feed.bind(asyncio.get_running_loop())
+        websocket = AsyncMock()
+        await feed.subscribe(websocket, list)
+        
+        await asyncio.to_thread(feed.publish_added, make_item("a"))
+        await asyncio.sleep(0.01)
+        
+        assert sent_frames(websocket)[-1]["added"][0]["id"] == "a"
+    
+    @pytest.mark.asyncio
+    async def test_nothing_is_queued_without_subscribers(self, feed):
+        """Test that publishing is a no-op while nobody listens"""
+        feed.bind(asyncio.get_running_loop())
+        feed.publish_added(make_item("a"))
+        
+        assert feed._pending == {}
+        assert feed.seq == {}
@@ -0,0 +1,176 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.auth.firebase_auth import require_admin
+from app.main import app as fastapi_app
+from app.models.note import NoteListItem
+from app.services.note_service import note_service
+from app.services.notes_index import NotesIndex
+
+
+def make_item(note_id, minutes, title=None, owner_uid=None):
+    updated_at = datetime(2024, 1, 1) + timedelta(minutes=minutes)
+    return NoteListItem(
+        id=note_id, title=title or note_id, owner_uid=owner_uid,
+        created_at=updated_at, updated_at=updated_at
+    )
+
+
+class TestNotesIndex:
+    
+    def test_list_is_newest_first(self):
+        """Test that listing walks the index by descending updated_at"""
+        index = NotesIndex()
+        index.load([make_item("a", 1), make_item("b", 3), make_item("c", 2)])
+        
+        assert [item.id for item in index.list()] == ["b", "c", "a"]
+    
+    def test_pagination(self):
+        """Test offset/limit slicing"""
+        index = NotesIndex()
+        index.load([make_item(str(i), i) for i in range(10)])
+        
+        assert [item.id for item in index.list(offset=2, limit=3)] == ["7", "6", "5"]
+        assert [item.id for item in index.list(offset=8, limit=5)] == ["1", "0"]
+        assert index.list(offset=20) == []
+    
+    def test_upsert_moves_updated_note_to_front(self):
+        """Test that an update re-sorts the note instead of duplicating it"""
+        index = NotesIndex()
+        index.load([make_item("a", 1), make_item("b", 2)])
+        
+        index.upsert(make_item("a", 5, title="renamed"))
+        
+        assert [item.id for item in index.list()] == ["a", "b"]
+        assert index.get("a").title == "renamed"
+        assert len(index) == 2
+    
+    def test_remove(self):
+        """Test deleting from the index"""
+        index = NotesIndex()
+        index.load([make_item("a", 1), make_item("b", 2)])
+        
+        index.remove("a")
+        index.remove("missing")
+        
+        assert [item.id for item in index.list()] == ["b"]
+    
+    def test_mutations_before_load_are_ignored(self):
+        """Test that an unloaded index stays empty until loaded"""
+        index = NotesIndex()
+        index.upsert(make_item("a", 1))
+        
+        assert not index.loaded
+        assert len(index) == 0
+    
+    def test_aware_and_naive_timestamps_sort_together(self):
+        """Test that fresh aware timestamps compare with naive UTC ones from SQLite"""
+        index = NotesIndex()
+        aware = NoteListItem(
+            id="aware", title="aware",
+            created_at=datetime(2024, 1, 1, 0, 10, tzinfo=timezone.utc),
+            updated_at=datetime(2024, 1, 1, 0, 10, tzinfo=timezone.utc)
+        )
+        index.load([make_item("naive", 5), aware])
+        
+        assert [item.id for item in index.list()] == ["aware", "naive"]
+    
+    def test_check_consistency(self):
+        """Test that drift against the database is reported"""
+        index = NotesIndex()
+        index.load([make_item("a", 1), make_item("b", 2)])
+        
+        report = index.check_consistency([make_item("a", 1), make_item("c", 3), make_item("b", 4)])
+        
+        assert report["consistent"] is False
+        assert report["missing"] == ["c"]
+        assert report["stale"] == ["b"]
+        assert report["extra"] == []
+
+
+class TestOwnerScopedIndex:
+    
+    def test_list_is_partitioned_by_owner(self):
+        """Test that each user lists only their own notes, and anonymous callers unowned ones"""
+        index = NotesIndex()
+        index.load([
+            make_item("a1", 1, owner_uid="alice"), make_item("b1", 2, owner_uid="bob"),
+            make_item("a2", 3, owner_uid="alice"), make_item("public", 4),
+        ])
+        
+        assert [item.id for item in index.list(owner_uid="alice")] == ["a2", "a1"]
+        assert [item.id for item in index.list(owner_uid="bob")] == ["b1"]
+        assert [item.id for item in index.list()] == ["public"]
+        assert index.list(owner_uid="carol") == []
+    
+    def test_shared_notes_are_merged_in_order(self):
+        """Test that notes shared with a user interleave with their own by updated_at"""
+        index = NotesIndex()
+        index.load(
+            [make_item(f"a{i}", i * 2, owner_uid="alice") for i in range(4)]
+            + [make_item("b", 3, owner_uid="bob")],
+            shares=[("b", "alice")]
+        )
+        
+        assert [item.id for item in index.list(owner_uid="alice")] == ["a3", "a2", "b", "a1", "a0"]
+        assert [item.id for item in index.list(offset=1, limit=2, owner_uid="alice")] == ["a2", "b"]
+        
+        index.unshare("b", "alice")
+        assert "b" not in [item.id for item in index.list(owner_uid="alice")]
+    
+    def test_can_access(self):
+        """Test access for owners, sharees, strangers and unowned notes"""
+        index = NotesIndex()
+        index.load([make_item("b", 1, owner_uid="bob"), make_item("public", 2)])
+        index.share("b", "alice")
+        
+        assert index.can_access("b", "bob")
+        assert index.can_access("b", "alice")
+        assert not index.can_access("b", "carol")
+        assert not index.can_access("b", None)
+        assert index.can_access("public", "carol")
+        assert not index.can_access("missing", "bob")
+    
+    def test_remove_drops_shares(self):
+        """Test that deleting a note forgets who it was shared with"""
+        index = NotesIndex()
+        index.load([make_item("b", 1, owner_uid="bob")], shares=[("b", "alice")])
+        
+        index.remove("b")
+        
+        assert index.list(owner_uid="alice") == []
+        assert index.shared_with("b") == set()
+
+
+class TestIndexConsistencyEndpoint:
+
+    @pytest.fixture
+    def admin(self):
+        fastapi_app.dependency_overrides[require_admin] = lambda: {"uid": "admin"}
+        yield
+        fastapi_app.dependency_overrides.clear()
+
+    def test_requires_authentication(self, client):
+        """Test that anonymous callers can neither read nor repair the index"""
+        assert client.get("/api/v1/admin/notes-index").status_code == 401
+        assert client.post("/api/v1/admin/notes-index/repair").status_code == 401
+
+    def test_index_matches_database_after_mutations(self, client, multiple_notes, admin):
+        """Test that the list index matches the database after mutations"""
+        client.delete(f"/api/v1/notes/{multiple_notes[1]['id']}")
+
+        response = client.get("/api/v1/admin/notes-index")
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report["consistent"] is True
+        assert report["indexed"] == report["database"] == 2
+
+    def test_repair_reloads_a_drifted_index(self, client, multiple_notes, admin):
+        """Test that repair is a POST which reloads an index missing a note"""
+        note_service.index.remove(multiple_notes[0]["id"])
+        assert client.get("/api/v1/admin/notes-index").json()["consistent"] is False
+
+        report = client.post("/api/v1/admin/notes-index/repair").json()
+
+        assert report["repaired"] is True
+        assert client.get("/api/v1/admin/notes-index").json()["consistent"] is True
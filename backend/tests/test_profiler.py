@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from app.auth.firebase_auth import require_admin
+from app.main import app as fastapi_app
+from app.services.profiler_service import ProfilerBusyError, ProfilerService
+
+
+class TestProfilerService:
+    
+    @pytest.mark.asyncio
+    async def test_profile_collects_stacks_and_loop_lag(self):
+        """Test that a short session returns collapsed stacks and lag samples"""
+        profiler = ProfilerService()
+        
+        report = await profiler.profile(0.2, interval=0.005, lag_interval=0.02)
+        
+        assert report["samples"] > 0
+        assert any(line.startswith("MainThread;") for line in report["collapsed"].splitlines())
+        assert len(report["loop_lag_ms"]["samples"]) > 0
+        assert profiler.enabled is False
+    
+    @pytest.mark.asyncio
+    async def test_message_times_recorded_only_while_enabled(self):
+        """Test per-message-type timings are scoped to the session"""
+        profiler = ProfilerService()
+        
+        async def traffic():
+            await asyncio.sleep(0.02)
+            assert profiler.enabled
+            profiler.record_message("content_change", 0.002)
+            profiler.record_message("content_change", 0.004)
+        
+        report, _ = await asyncio.gather(profiler.profile(0.1, lag_interval=0.02), traffic())
+        
+        stats = report["message_handling"]["content_change"]
+        assert stats["count"] == 2
+        assert stats["max_ms"] == 4.0
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_sessions_are_rejected(self):
+        """Test that only one session runs at a time"""
+        profiler = ProfilerService()
+        session = asyncio.create_task(profiler.profile(0.1, lag_interval=0.02))
+        await asyncio.sleep(0.01)
+        
+        with pytest.raises(ProfilerBusyError):
+            await profiler.profile(0.1)
+        await session
+
+
+class TestProfileEndpoint:
+    
+    def test_requires_authentication(self, client):
+        """Test that anonymous callers are rejected"""
+        response = client.post("/api/v1/admin/profile?seconds=0.1")
+        assert response.status_code == 401
+    
+    def test_admin_gets_collapsed_stacks(self, client):
+        """Test the flamegraph-ready output for an admin"""
+        fastapi_app.dependency_overrides[require_admin] = lambda: {"uid": "admin"}
+        try:
+            response = client.post("/api/v1/admin/profile?seconds=0.1&format=collapsed")
+        finally:
+            fastapi_app.dependency_overrides.clear()
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        first_line = response.text.splitlines()[0]
+        assert first_line.rsplit(" ", 1)[1].isdigit()
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from app.services.scheduler import TimerWheel
+
+
+class TestTimerWheel:
+    
+    @pytest.fixture
+    def wheel(self):
+        return TimerWheel(tick=0.005, slots=16)
+    
+    @pytest.mark.asyncio
+    async def test_timer_fires_after_delay(self, wheel):
+        """Test that a scheduled callback runs once its deadline passes"""
+        fired = []
+        wheel.schedule("a", 0.02, lambda: fired.append("a"))
+        
+        assert "a" in wheel
+        await asyncio.sleep(0.05)
+        
+        assert fired == ["a"]
+        assert len(wheel) == 0
+    
+    @pytest.mark.asyncio
+    async def test_reschedule_replaces_timer(self, wheel):
+        """Test that rescheduling a key moves its deadline instead of adding a timer"""
+        fired = []
+        for i in range(50):
+            wheel.schedule("note", 0.02, lambda i=i: fired.append(i))
+        
+        await asyncio.sleep(0.05)
+        
+        assert fired == [49]
+        stats = wheel.stats()
+        assert stats["scheduled"] == 1
+        assert stats["rescheduled"] == 49
+        assert stats["fired"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_cancel(self, wheel):
+        """Test that cancelled timers never fire"""
+        fired = []
+        wheel.schedule("a", 0.01, lambda: fired.append("a"))
+        
+        assert wheel.cancel("a") is True
+        assert wheel.cancel("a") is False
+        await asyncio.sleep(0.03)
+        
+        assert fired == []
+    
+    @pytest.mark.asyncio
+    async def test_delay_longer_than_one_rotation(self, wheel):
+        """Test that timers beyond one wheel rotation wait for their round"""
+        fired = []
+        wheel.schedule("late", 0.12, lambda: fired.append("late"))
+        
+        await asyncio.sleep(0.09)
+        assert fired == []
+        await asyncio.sleep(0.06)
+        assert fired == ["late"]
+    
+    @pytest.mark.asyncio
+    async def test_coroutine_callback_is_awaited(self, wheel):
+        """Test that coroutine callbacks run as a task and can be drained"""
+        done = asyncio.Event()
+        
+        async def callback():
+            done.set()
+        
+        wheel.schedule("coro", 0.01, callback)
+        await asyncio.sleep(0.03)
+        await wheel.drain()
+        
+        assert done.is_set()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import pytest
+from app.main import app as fastapi_app
+from app.services.scheduler import TimerWheel
+from app.services.spectators import SpectatorHub, spectators
+from app.websocket_manager import manager
+
+
+def parse_events(data: bytes) -> list:
+    """SSE frames as dicts of their fields, comments and retry hints left out"""
+    events = []
+    for block in data.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "event" in fields:
+            fields["data"] = json.loads(fields["data"])
+            events.append(fields)
+    return events
+
+
+def snapshot_of(note_id: str):
+    async def snapshot():
+        return {"type": "snapshot", "note_id": note_id, "content": "start"}
+    return snapshot
+
+
+async def sse_request(path: str, events: int, headers=()) -> tuple:
+    """Drive the app over raw ASGI and hang up once ``events`` frames arrived"""
+    status, body, done = {}, bytearray(), asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.update(code=message["status"], headers=dict(message["headers"]))
+        elif message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+            if len(parse_events(bytes(body))) >= events:
+                done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"test"), *headers],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    await asyncio.wait_for(fastapi_app(scope, receive, send), 5)
+    return status, parse_events(bytes(body))
+
+
+class TestSpectatorHub:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_then_live_events(self):
+        """Test that a spectator gets the snapshot, then room messages in order"""
+        hub = SpectatorHub()
+        stream = hub.stream("note-1", snapshot_of("note-1"))
+        assert await stream.__anext__() == b"retry: 2000\n\n"
+        [snapshot] = parse_events(await stream.__anext__())
+        assert snapshot["event"] == "snapshot"
+
+        hub.publish("note-1", {"type": "content_change", "content": "a"})
+        hub.publish("note-1", {"type": "cursor_position", "position": 1})
+        hub.publish("note-1", {"type": "content_change", "content": "ab"})
+
+        events = parse_events(await stream.__anext__())
+        assert [event["data"]["content"] for event in events] == ["a", "ab"]
+        assert events[-1]["id"].endswith("-2")
+        await stream.aclose()
+        assert not hub.watching("note-1")
+
+    @pytest.mark.asyncio
+    async def test_spectators_share_encoded_frames(self):
+        """Test that every spectator is handed the same bytes object"""
+        hub = SpectatorHub()
+        streams = [hub.stream("note-1", snapshot_of("note-1")) for _ in range(3)]
+        snapshots = []
+        for stream in streams:
+            await stream.__anext__()
+            snapshots.append(await stream.__anext__())
+
+        hub.publish("note-1", {"type": "content_change", "content": "shared"})
+        frames = [await stream.__anext__() for stream in streams]
+
+        assert all(frame is frames[0] for frame in frames)
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+        assert hub.stats()["snapshots_encoded"] == 1
+        for stream in streams:
+            await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_resume_from_last_event_id(self):
+        """Test that a reconnect continues after the last event it saw"""
+        hub = SpectatorHub()
+        keeper = hub.stream("note-1", snapshot_of("note-1"))
+        await keeper.__anext__()
+        await keeper.__anext__()
+        for content in ("a", "ab", "abc"):
+            hub.publish("note-1", {"type": "content_change", "content": content})
+        first_id = parse_events(await keeper.__anext__())[0]["id"]
+
+        resumed = hub.stream("note-1", snapshot_of("note-1"), last_event_id=first_id)
+        await resumed.__anext__()
+        events = parse_events(await resumed.__anext__())
+
+        assert [event["data"]["content"] for event in events] == ["ab", "abc"]
+        assert hub.stats()["resumed"] == 1
+        await resumed.aclose()
+        await keeper.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unknown_or_expired_ids_get_a_snapshot(self):
+        """Test that a spectator the buffer cannot serve starts from a snapshot"""
+        hub = SpectatorHub(buffer_size=2)
+        keeper = hub.stream("note-1", snapshot_of("note-1"))
+        await keeper.__anext__()
+        await keeper.__anext__()
+        for content in ("a", "ab", "abc"):
+            hub.publish("note-1", {"type": "content_change", "content": content})
+
+        # Fell behind the two buffered events
+        [resync] = parse_events(await keeper.__anext__())
+        assert resync["event"] == "snapshot"
+        assert hub.stats()["resyncs"] == 1
+
+        stale = hub.stream("note-1", snapshot_of("note-1"), last_event_id="deadbeef-1")
+        await stale.__anext__()
+        assert parse_events(await stale.__anext__())[0]["event"] == "snapshot"
+        await stale.aclose()
+        await keeper.aclose()
+
+    @pytest.mark.asyncio
+    async def test_idle_streams_get_keepalives(self):
+        """Test that the room heartbeat sends a comment when nothing happens"""
+        wheel = TimerWheel()
+        hub = SpectatorHub(heartbeat=0.01, timer_wheel=wheel)
+        stream = hub.stream("note-1", snapshot_of("note-1"))
+        await stream.__anext__()
+        await stream.__anext__()
+
+        assert await asyncio.wait_for(stream.__anext__(), 1) == b": keepalive\n\n"
+        assert ("sse-heartbeat", "note-1") in wheel
+        await stream.aclose()
+        assert len(wheel) == 0
+
+
+class TestNoteStreamEndpoint:
+
+    def test_unknown_note_is_404(self, client):
+        """Test that only existing notes can be watched"""
+        assert client.get("/api/v1/notes/missing/stream").status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_room_broadcasts_reach_spectators(self, client, created_note):
+        """Test that an HTTP spectator gets the snapshot and then a live edit"""
+        note_id = created_note["id"]
+        path = f"/api/v1/notes/{note_id}/stream"
+
+        async def edit():
+            while not spectators.watching(note_id):
+                await asyncio.sleep(0.01)
+            await manager.broadcast_to_room(note_id, {"type": "content_change", "note_id": note_id, "content": "live"})
+
+        (status, events), _ = await asyncio.gather(sse_request(path, events=2), edit())
+
+        assert status["code"] == 200
+        assert status["headers"][b"content-type"].startswith(b"text/event-stream")
+        assert events[0]["event"] == "snapshot"
+        assert events[0]["data"]["content"] == created_note["content"]
+        assert events[1]["data"]["content"] == "live"
+        assert not spectators.watching(note_id)
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import time
+from app.main import app as fastapi_app
+from app.seed import seed_initial_data
+from app.services.note_service import note_service
+
+IMPORT_PROBE = """
+import sys
+import app.main
+import app.database
+print("firebase_admin" in sys.modules, app.database._engine is None)
+"""
+
+
+def wait_until_ready(client, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline, "warm-up did not finish"
+        time.sleep(0.01)
+
+
+class TestColdStart:
+
+    def test_import_defers_firebase_and_engine(self):
+        """Test that importing the app neither loads the Firebase SDK nor builds the engine"""
+        result = subprocess.run([sys.executable, "-c", IMPORT_PROBE], capture_output=True, text=True, check=True)
+        assert result.stdout.split() == ["False", "True"]
+
+    def test_seed_only_runs_on_an_empty_database(self, client):
+        """Test that seeding checks for existing notes instead of listing them"""
+        seed_initial_data()
+        seed_initial_data()
+
+        assert note_service.has_notes()
+        assert len(client.get("/api/v1/notes").json()) == 1
+
+
+class TestReadiness:
+
+    def test_ready_after_startup(self, client):
+        """Test that /ready turns 200 once the startup warm-up has finished"""
+        wait_until_ready(client)
+        assert client.get("/ready").json() == {"status": "ready"}
+
+    def test_not_ready_while_starting_or_stopping(self, client):
+        """Test that /ready answers 503 while /health still reports the process as up"""
+        wait_until_ready(client)
+        for status in ("starting", "stopping"):
+            fastapi_app.state.status = status
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json() == {"status": status}
+            assert client.get("/health").status_code == 200
@@ -0,0 +1,71 @@
+import json
+from unittest.mock import AsyncMock
+from app.services.traffic_recorder import TrafficRecorder
+
+
+def read_trace(path):
+    with open(path) as trace:
+        return [json.loads(line) for line in trace]
+
+
+class TestTrafficRecorder:
+    
+    def test_disabled_without_path(self):
+        """Test that the recorder is a no-op unless a trace path is configured"""
+        recorder = TrafficRecorder()
+        recorder.record_join(AsyncMock(), "note", "Alice")
+        
+        assert recorder.enabled is False
+        assert recorder.recorded == 0
+    
+    def test_records_join_message_and_leave(self, tmp_path):
+        """Test that a session becomes compact, ordered trace lines"""
+        path = tmp_path / "trace.ndjson"
+        recorder = TrafficRecorder(str(path), redact=False)
+        websocket = AsyncMock()
+        
+        recorder.record_join(websocket, "note-1", "Alice")
+        recorder.record_message(websocket, "note-1", {
+            "type": "content_change", "content": "Hello", "user_name": "Alice", "timestamp": "now"
+        })
+        recorder.record_leave(websocket, "note-1")
+        recorder.close()
+        
+        join, message, leave = read_trace(path)
+        assert join["event"] == "join" and join["user"] == "Alice" and join["room"] == "note-1"
+        assert message["message"] == {"type": "content_change", "content": "Hello"}
+        assert leave["event"] == "leave"
+        assert join["conn"] == message["conn"] == leave["conn"]
+        assert join["t"] <= message["t"] <= leave["t"]
+    
+    def test_redaction_keeps_only_sizes_and_pseudonyms(self, tmp_path):
+        """Test that redacted traces carry no note text, user names or note ids"""
+        path = tmp_path / "trace.ndjson"
+        recorder = TrafficRecorder(str(path), redact=True)
+        websocket = AsyncMock()
+        
+        recorder.record_join(websocket, "secret-note", "Alice")
+        recorder.record_message(websocket, "secret-note", {"type": "content_change", "content": "Top secret"})
+        recorder.close()
+        
+        raw = path.read_text()
+        assert "Top secret" not in raw and "Alice" not in raw and "secret-note" not in raw
+        
+        join, message = read_trace(path)
+        assert message["message"]["content"] == len("Top secret")
+        assert join["room"] == message["room"]
+    
+    def test_trace_file_rotates(self, tmp_path):
+        """Test that the trace is capped by size with numbered backups"""
+        path = tmp_path / "trace.ndjson"
+        recorder = TrafficRecorder(str(path), max_bytes=2048, backups=2, redact=False)
+        websocket = AsyncMock()
+        
+        recorder.record_join(websocket, "note", "Alice")
+        for i in range(200):
+            recorder.record_message(websocket, "note", {"type": "cursor_position", "position": i})
+        recorder.close()
+        
+        assert (tmp_path / "trace.ndjson.1").exists()
+        assert (tmp_path / "trace.ndjson.2").exists()
+        assert not (tmp_path / "trace.ndjson.3").exists()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.websocket_manager import BATCH_MAX_MESSAGES, ConnectionManager
+from app.services.scheduler import TimerWheel
+
+
+def make_websocket():
+    websocket = AsyncMock()
+    websocket.send_text = AsyncMock()
+    return websocket
+
+
+def sent_frames(websocket):
+    return [json.loads(call.args[0]) for call in websocket.send_text.call_args_list]
+
+
+class TestOutboundBatching:
+    
+    @pytest.fixture
+    def manager(self):
+        return ConnectionManager(timer_wheel=TimerWheel(tick=0.005))
+    
+    def test_uses_the_given_timer_wheel(self):
+        """Test that batch timers go on an injected wheel even while it is empty"""
+        wheel = TimerWheel()
+        assert ConnectionManager(timer_wheel=wheel).scheduler is wheel
+    
+    @pytest.mark.asyncio
+    async def test_plain_clients_receive_immediately(self, manager):
+        """Test that clients without batching still get one frame per message"""
+        sender, receiver = make_websocket(), make_websocket()
+        await manager.connect(sender, "note", "Alice")
+        await manager.connect(receiver, "note", "Bob")
+        
+        for i in range(3):
+            await manager.broadcast_to_room("note", {"type": "cursor_position", "position": i}, exclude_websocket=sender)
+        
+        assert [frame["position"] for frame in sent_frames(receiver)] == [0, 1, 2]
+        sender.send_text.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_batching_client_gets_one_coalesced_frame(self, manager):
+        """Test that a burst becomes one array frame with superseded content collapsed"""
+        sender, receiver = make_websocket(), make_websocket()
+        await manager.connect(sender, "note", "Alice")
+        await manager.connect(receiver, "note", "Bob", batch=True)
+        
+        for i in range(3):
+            await manager.broadcast_to_room("note", {"type": "content_change", "content": f"v{i}"}, exclude_websocket=sender)
+        await manager.broadcast_to_room("note", {"type": "typing_indicator", "is_typing": True}, exclude_websocket=sender)
+        
+        receiver.send_text.assert_not_called()
+        await asyncio.sleep(0.05)
+        
+        frames = sent_frames(receiver)
+        assert len(frames) == 1
+        assert frames[0] == [
+            {"type": "content_change", "content": "v2"},
+            {"type": "typing_indicator", "is_typing": True}
+        ]
+        assert manager.stats["collapsed_messages"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_batch_respects_sender_exclusion(self, manager):
+        """Test that a batching sender does not receive its own messages"""
+        alice, bob = make_websocket(), make_websocket()
+        await manager.connect(alice, "note", "Alice", batch=True)
+        await manager.connect(bob, "note", "Bob", batch=True)
+        
+        await manager.broadcast_to_room("note", {"type": "content_change", "content": "from alice"}, exclude_websocket=alice)
+        await manager.broadcast_to_room("note", {"type": "content_change", "content": "from bob"}, exclude_websocket=bob)
+        await manager.flush_room("note")
+        
+        assert sent_frames(alice) == [{"type": "content_change", "content": "from bob"}]
+        assert sent_frames(bob) == [{"type": "content_change", "content": "from alice"}]
+    
+    @pytest.mark.asyncio
+    async def test_size_cap_flushes_early(self, manager):
+        """Test that reaching the size cap sends the batch without waiting"""
+        sender, receiver = make_websocket(), make_websocket()
+        await manager.connect(sender, "note", "Alice")
+        await manager.connect(receiver, "note", "Bob", batch=True)
+        
+        for i in range(BATCH_MAX_MESSAGES):
+            await manager.broadcast_to_room("note", {"type": "cursor_position", "position": i}, exclude_websocket=sender)
+        
+        frames = sent_frames(receiver)
+        assert len(frames) == 1
+        assert len(frames[0]) == BATCH_MAX_MESSAGES
+
+
+class TestMultiRoomConnections:
+    
+    @pytest.fixture
+    def manager(self):
+        return ConnectionManager(timer_wheel=TimerWheel(tick=0.005))
+    
+    @pytest.mark.asyncio
+    async def test_one_connection_in_many_rooms(self, manager):
+        """Test that a single socket receives broadcasts from every room it joined"""
+        websocket = make_websocket()
+        await manager.accept(websocket, "Alice")
+        manager.join(websocket, "a")
+        manager.join(websocket, "b")
+        
+        await manager.broadcast_to_room("a", {"type": "cursor_position", "note_id": "a"})
+        await manager.broadcast_to_room("b", {"type": "cursor_position", "note_id": "b"})
+        
+        assert [frame["note_id"] for frame in sent_frames(websocket)] == ["a", "b"]
+        assert manager.counts() == {"connections": 1, "subscriptions": 2, "rooms": 2}
+    
+    @pytest.mark.asyncio
+    async def test_leave_keeps_other_rooms(self, manager):
+        """Test that leaving one room keeps the connection and its other rooms"""
+        websocket = make_websocket()
+        await manager.accept(websocket, "Alice", batch=True)
+        manager.join(websocket, "a")
+        manager.join(websocket, "b")
+        
+        assert manager.leave(websocket, "a") is True
+        assert manager.leave(websocket, "a") is False
+        
+        assert not manager.has_room("a")
+        assert manager.get_rooms(websocket) == {"b"}
+        assert manager.get_room_users("b") == ["Alice"]
+        assert websocket in manager.batching_connections
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_leaves_every_room(self, manager):
+        """Test that disconnecting without a room forgets the connection entirely"""
+        websocket = make_websocket()
+        await manager.accept(websocket, "Alice")
+        manager.join(websocket, "a")
+        manager.join(websocket, "b")
+        
+        manager.disconnect(websocket)
+        
+        assert manager.counts() == {"connections": 0, "subscriptions": 0, "rooms": 0}
+        assert websocket not in manager.connection_users
@@ -1,14 +1,16 @@
 import pytest
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
+from app.models.messages import ContentChange
 from app.services.websocket_service import WebSocketService
+from app.services.scheduler import TimerWheel
 
 
 class TestWebSocketService:
     
     @pytest.fixture
     def websocket_service(self):
-        return WebSocketService()
+        return WebSocketService(timer_wheel=TimerWheel())
     
     @pytest.fixture
     def mock_websocket(self):
@@ -81,11 +83,7 @@ class TestWebSocketService:
     @pytest.mark.asyncio
     async def test_content_change_broadcasting(self, websocket_service, mock_websocket):
         """Test that content changes are broadcast to other users"""
-        message_data = {
-            "type": "content_change",
-            "content": "New content",
-            "timestamp": "2024-01-01T00:00:00Z"
-        }
+        message = ContentChange(content="New content")
         
         with patch('app.services.websocket_service.manager') as mock_manager:
             # Make the broadcast_to_room method async
@@ -95,7 +93,8 @@ class TestWebSocketService:
                 websocket=mock_websocket,
                 note_id="test-note-id",
                 user_name="test-user",
-                message_data=message_data
+                message=message,
+                timestamp="2024-01-01T00:00:00Z"
             )
             
             # Should broadcast to other users
@@ -109,4 +108,33 @@ class TestWebSocketService:
             assert broadcast_note_id == "test-note-id"
             assert broadcast_message["type"] == "content_change"
             assert broadcast_message["content"] == "New content"
-            assert broadcast_message["user_name"] == "test-user"
\ No newline at end of file
+            assert broadcast_message["user_name"] == "test-user"
+    
+    @pytest.mark.asyncio
+    async def test_flush_pending_updates(self, websocket_service, mock_websocket):
+        """Test that pending debounced updates are persisted on flush"""
+        message = ContentChange(content="Unsaved content")
+        
+        with patch('app.services.websocket_service.manager') as mock_manager, \
+             patch('app.services.websocket_service.note_service') as mock_note_service:
+            mock_manager.broadcast_to_room = AsyncMock()
+            
+            await websocket_service._handle_content_change(
+                websocket=mock_websocket,
+                note_id="test-note-id",
+                user_name="test-user",
+                message=message,
+                timestamp="2024-01-01T00:00:00Z"
+            )
+            flushed = await websocket_service.flush_pending_updates()
+            
+            assert flushed == 1
+            mock_note_service.update_note.assert_called_once()
+            assert mock_note_service.update_note.call_args[0][1].content == "Unsaved content"
+            assert websocket_service._pending_updates == {}
+            assert len(websocket_service.scheduler) == 0
+    
+    def test_uses_the_given_timer_wheel(self):
+        """Test that an injected wheel is used even while it is empty (and so falsy)"""
+        wheel = TimerWheel()
+        assert WebSocketService(timer_wheel=wheel).scheduler is wheel
@@ -63,6 +63,9 @@ class TestWebSocketEndpoints:
         note_id = created_note["id"]
         
         with client.websocket_connect(f"/ws/{note_id}?user_name=TestUser") as websocket:
+            snapshot = json.loads(websocket.receive_text())
+            assert snapshot["type"] == "snapshot"
+            
             # Send invalid JSON
             websocket.send_text("invalid json")
             
@@ -81,6 +84,9 @@ class TestWebSocketEndpoints:
         note_id = created_note["id"]
         
         with client.websocket_connect(f"/ws/{note_id}?user_name=TestUser") as websocket:
+            snapshot = json.loads(websocket.receive_text())
+            assert snapshot["type"] == "snapshot"
+            
             # Send unknown message type
             message = {
                 "type": "unknown_type",
@@ -96,4 +102,180 @@ class TestWebSocketEndpoints:
                 assert error_data["type"] == "error"
                 assert "Unknown message type" in error_data["message"]
             except:
-                pass
\ No newline at end of file
+                pass
+    
+    def test_websocket_snapshot_on_join(self, client, created_note):
+        """Test that a joining client immediately receives the note content"""
+        note_id = created_note["id"]
+        
+        with client.websocket_connect(f"/ws/{note_id}?user_name=TestUser") as websocket:
+            snapshot = json.loads(websocket.receive_text())
+            
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["note_id"] == note_id
+            assert snapshot["title"] == created_note["title"]
+            assert snapshot["content"] == created_note["content"]
+            assert snapshot["revision"] == 0
+            assert snapshot["saved"] is True
+            assert snapshot["users"] == ["TestUser"]
+    
+    def test_websocket_snapshot_includes_unsaved_edits(self, client, created_note):
+        """Test that a late joiner sees edits still inside the debounce window"""
+        note_id = created_note["id"]
+        
+        with client.websocket_connect(f"/ws/{note_id}?user_name=Alice") as alice:
+            alice.receive_text()  # snapshot
+            alice.send_text(json.dumps({"type": "content_change", "content": "Fresh edit"}))
+            # Messages are handled in order, so the error reply means the edit was applied
+            alice.send_text(json.dumps({"type": "barrier"}))
+            assert json.loads(alice.receive_text())["type"] == "error"
+            
+            with client.websocket_connect(f"/ws/{note_id}?user_name=Bob") as bob:
+                snapshot = json.loads(bob.receive_text())
+                
+                assert snapshot["content"] == "Fresh edit"
+                assert snapshot["revision"] == 1
+                assert snapshot["users"] == ["Alice", "Bob"]
+                
+                joined = json.loads(alice.receive_text())
+                assert joined["type"] == "user_joined"
+                assert joined["user_name"] == "Bob"
+    
+    def test_failed_snapshot_still_cleans_up(self, client, created_note, monkeypatch):
+        """Test that a socket whose join snapshot fails is taken out of the room"""
+        from app.services.websocket_service import websocket_service
+        from app.websocket_manager import manager
+        
+        async def broken_snapshot(websocket, note_id):
+            raise RuntimeError("socket went away")
+        monkeypatch.setattr(websocket_service, "send_snapshot", broken_snapshot)
+        
+        note_id = created_note["id"]
+        with client.websocket_connect(f"/ws/{note_id}?user_name=Ghost"):
+            pass
+        
+        assert not manager.has_room(note_id)
+        assert note_id not in websocket_service._room_state
+
+
+class TestMultiplexedWebSocket:
+    
+    def test_subscribe_sends_snapshot_per_note(self, client, multiple_notes):
+        """Test that each subscription is acknowledged with that note's snapshot"""
+        with client.websocket_connect("/ws?user_name=TestUser") as websocket:
+            for note in multiple_notes:
+                websocket.send_text(json.dumps({"type": "subscribe", "note_id": note["id"]}))
+                snapshot = json.loads(websocket.receive_text())
+                
+                assert snapshot["type"] == "snapshot"
+                assert snapshot["note_id"] == note["id"]
+                assert snapshot["content"] == note["content"]
+                assert snapshot["users"] == ["TestUser"]
+    
+    def test_frames_are_tagged_with_note_id(self, client, multiple_notes):
+        """Test that one socket receives edits from several rooms, tagged by note"""
+        first, second = multiple_notes[0]["id"], multiple_notes[1]["id"]
+        
+        with client.websocket_connect("/ws?user_name=Dashboard") as dashboard:
+            for note_id in (first, second):
+                dashboard.send_text(json.dumps({"type": "subscribe", "note_id": note_id}))
+                dashboard.receive_text()  # snapshot
+            
+            for note_id in (first, second):
+                with client.websocket_connect(f"/ws/{note_id}?user_name=Editor") as editor:
+                    editor.receive_text()  # snapshot
+                    assert json.loads(dashboard.receive_text())["type"] == "user_joined"
+                    
+                    editor.send_text(json.dumps({"type": "cursor_position", "position": 7}))
+                    message = json.loads(dashboard.receive_text())
+                    assert message["type"] == "cursor_position"
+                    assert message["note_id"] == note_id
+                    assert message["position"] == 7
+                
+                left = json.loads(dashboard.receive_text())
+                assert left["type"] == "user_left"
+                assert left["note_id"] == note_id
+    
+    def test_messages_require_subscription(self, client, created_note):
+        """Test that messages for a note the socket has not subscribed to are rejected"""
+        note_id = created_note["id"]
+        
+        with client.websocket_connect("/ws?user_name=TestUser") as websocket:
+            websocket.send_text(json.dumps({"type": "cursor_position", "note_id": note_id, "position": 1}))
+            error = json.loads(websocket.receive_text())
+            
+            assert error["type"] == "error"
+            assert error["note_id"] == note_id
+            assert "Not subscribed" in error["message"]
+    
+    def test_unsubscribe_stops_delivery(self, client, multiple_notes):
+        """Test that an unsubscribed room no longer counts the connection"""
+        first, second = multiple_notes[0]["id"], multiple_notes[1]["id"]
+        
+        with client.websocket_connect("/ws?user_name=TestUser") as websocket:
+            for note_id in (first, second):
+                websocket.send_text(json.dumps({"type": "subscribe", "note_id": note_id}))
+                websocket.receive_text()  # snapshot
+            
+            websocket.send_text(json.dumps({"type": "unsubscribe", "note_id": first}))
+            assert json.loads(websocket.receive_text()) == {"type": "unsubscribed", "note_id": first}
+            
+            connections = client.get("/metrics").json()["connections"]
+            assert connections["connections"] == 1
+            assert connections["subscriptions"] == 1
+            
+            with client.websocket_connect(f"/ws/{first}?user_name=Editor") as editor:
+                snapshot = json.loads(editor.receive_text())
+                assert snapshot["users"] == ["Editor"]
+
+
+class TestNotesIndexFeed:
+    
+    def test_rest_changes_stream_as_diffs(self, client, created_note):
+        """Test that REST create, update and delete reach list subscribers without polling"""
+        with client.websocket_connect("/ws/notes/index") as feed:
+            snapshot = json.loads(feed.receive_text())
+            assert snapshot["type"] == "notes_index"
+            assert [note["id"] for note in snapshot["notes"]] == [created_note["id"]]
+            
+            new_note = client.post("/api/v1/notes", json={"title": "Pushed", "content": "x"}).json()
+            diff = json.loads(feed.receive_text())
+            assert diff["type"] == "notes_diff"
+            assert [note["id"] for note in diff["added"]] == [new_note["id"]]
+            
+            client.put(f"/api/v1/notes/{created_note['id']}", json={"title": "Renamed"})
+            diff = json.loads(feed.receive_text())
+            assert diff["updated"][0]["title"] == "Renamed"
+            
+            client.delete(f"/api/v1/notes/{new_note['id']}")
+            diff = json.loads(feed.receive_text())
+            assert diff["removed"] == [new_note["id"]]
+    
+    def test_multiplexed_index_subscription(self, client, created_note):
+        """Test that a multiplexed connection can carry the notes-list channel"""
+        with client.websocket_connect("/ws?user_name=Sidebar") as websocket:
+            websocket.send_text(json.dumps({"type": "subscribe_index"}))
+            assert json.loads(websocket.receive_text())["type"] == "notes_index"
+            
+            client.put(f"/api/v1/notes/{created_note['id']}", json={"title": "Renamed"})
+            diff = json.loads(websocket.receive_text())
+            assert diff["type"] == "notes_diff"
+            assert diff["updated"][0]["id"] == created_note["id"]
+    
+    def test_rest_update_reaches_open_room(self, client, created_note):
+        """Test that a REST content update is pushed to editors of the note"""
+        note_id = created_note["id"]
+        
+        with client.websocket_connect(f"/ws/{note_id}?user_name=Editor") as editor:
+            editor.receive_text()  # snapshot
+            
+            client.put(f"/api/v1/notes/{note_id}", json={"content": "Changed over REST"})
+            message = json.loads(editor.receive_text())
+            
+            assert message["type"] == "note_updated"
+            assert message["note_id"] == note_id
+            assert message["content"] == "Changed over REST"
+            assert message["revision"] == 1
+            
+            with client.websocket_connect(f"/ws/{note_id}?user_name=Late") as late:
+                assert json.loads(late.receive_text())["content"] == "Changed over REST"
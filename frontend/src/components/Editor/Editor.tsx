@@ -105,6 +105,19 @@ export default function Editor({
         lastSentContentRef.current = newContent;
       }
     },
+    onSnapshot: (snapshotContent) => {
+      // The server's room state includes edits that are not saved yet
+      if (snapshotContent !== content) {
+        console.log('📸 Syncing editor with room snapshot');
+        isUpdatingFromRemote.current = true;
+        setContent(snapshotContent);
+        lastSentContentRef.current = snapshotContent;
+
+        setTimeout(() => {
+          isUpdatingFromRemote.current = false;
+        }, 100);
+      }
+    },
     onTypingChange: (isTyping, senderUserName) => {
       console.log('⌨️  Typing change:', { isTyping, sender: senderUserName, currentUser: userName });
       
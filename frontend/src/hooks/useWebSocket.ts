@@ -11,6 +11,7 @@ interface UseWebSocketOptions {
   onUserLeft?: (userName: string) => void;
   onConnectionChange?: (connected: boolean) => void;
   onContentSaved?: () => void;
+  onSnapshot?: (content: string) => void;
 }
 
 export function useWebSocket(options: UseWebSocketOptions) {
@@ -43,7 +44,7 @@ export function useWebSocket(options: UseWebSocketOptions) {
           currentUser: options.userName
         });
         
-        if (data.content !== undefined && data.user_name && options.onContentChange) {
+        if (typeof data.content === 'string' && data.user_name && options.onContentChange) {
           // Always pass the message to the Editor - let Editor decide what to do
           options.onContentChange(data.content, data.user_name);
         }
@@ -70,6 +71,14 @@ export function useWebSocket(options: UseWebSocketOptions) {
         }
       };
 
+      wsRef.current.onSnapshot = (data: WebSocketMessage) => {
+        console.log('📸 Room snapshot received, revision:', data.revision);
+        setConnectedUsers(data.users ?? []);
+        if (typeof data.content === 'string') {
+          options.onSnapshot?.(data.content);
+        }
+      };
+
       wsRef.current.onContentSaved = () => {
         console.log('💾 Content saved event received in hook');
         options.onContentSaved?.();
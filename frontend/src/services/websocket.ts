@@ -1,6 +1,11 @@
+import { authService } from './auth';
+
 export interface WebSocketMessage {
-  type: 'content_change' | 'cursor_position' | 'typing_indicator' | 'user_joined' | 'user_left' | 'content_saved';
-  content?: string;
+  type: 'content_change' | 'cursor_position' | 'typing_indicator' | 'user_joined' | 'user_left' | 'content_saved' | 'snapshot' | 'note_updated';
+  content?: string | null;
+  title?: string | null;
+  revision?: number;
+  users?: string[];
   position?: number;
   is_typing?: boolean;
   user_name?: string;
@@ -22,23 +27,28 @@ export class WebSocketService {
   public onTypingIndicator: ((data: WebSocketMessage) => void) | null = null;
   public onConnectionChange: ((connected: boolean) => void) | null = null;
   public onContentSaved: (() => void) | null = null;
+  public onSnapshot: ((data: WebSocketMessage) => void) | null = null;
 
   constructor(serverUrl: string, userName: string = 'Anonymous') {
     this.serverUrl = serverUrl;
     this.userName = userName;
   }
 
-  connect(noteId: string): Promise<void> {
+  async connect(noteId: string): Promise<void> {
+    // Notes with an owner only accept sockets from the owner and users it is shared with
+    const token = await authService.getIdToken();
+
     return new Promise((resolve, reject) => {
       if (this.ws && this.ws.readyState === WebSocket.OPEN) {
         this.disconnect();
       }
 
       this.noteId = noteId;
-      const wsUrl = `${this.serverUrl.replace('http', 'ws')}/ws/${noteId}?user_name=${encodeURIComponent(this.userName)}`;
+      const baseUrl = `${this.serverUrl.replace('http', 'ws')}/ws/${noteId}?user_name=${encodeURIComponent(this.userName)}&batch=true`;
       
-      console.log('🔌 Connecting to WebSocket:', wsUrl);
-      this.ws = new WebSocket(wsUrl);
+      // Log without the ID token: it is a bearer credential
+      console.log('🔌 Connecting to WebSocket:', baseUrl);
+      this.ws = new WebSocket(token ? `${baseUrl}&token=${encodeURIComponent(token)}` : baseUrl);
 
       this.ws.onopen = () => {
         console.log('✅ WebSocket connected');
@@ -50,8 +60,13 @@ export class WebSocketService {
 
       this.ws.onmessage = (event) => {
         try {
-          const data: WebSocketMessage = JSON.parse(event.data);
-          this.handleMessage(data);
+          const data: WebSocketMessage | WebSocketMessage[] = JSON.parse(event.data);
+          // With batching enabled the server may coalesce several messages into one frame
+          if (Array.isArray(data)) {
+            data.forEach(message => this.handleMessage(message));
+          } else {
+            this.handleMessage(data);
+          }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
@@ -90,6 +105,15 @@ export class WebSocketService {
       case 'typing_indicator':
         this.onTypingIndicator?.(data);
         break;
+      case 'snapshot':
+        this.onSnapshot?.(data);
+        break;
+      case 'note_updated':
+        // Saved through the REST API by someone outside the room
+        if (data.content != null) {
+          this.onContentChange?.({ ...data, user_name: data.user_name ?? 'API' });
+        }
+        break;
       case 'content_saved':
         console.log('🎉 Content saved message received!');
         this.onContentSaved?.();